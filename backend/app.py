@@ -1,43 +1,107 @@
 from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from transformers import pipeline
-import torch
-import json
 import os
 from geopy.geocoders import Nominatim
-import requests
 # from phi.agent import Agent
 # from phi.model.google import Gemini
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import logging
 from pydantic import BaseModel, ValidationError
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 import traceback
 import jwt
 import uuid
 from werkzeug.utils import secure_filename
-import time
-import queue
 import hashlib
-import csv
-import io
 
 import database
+import export
+import ingest
+from auth import Authenticator
+from jobs import JobManager, RetryLater
+from clustering import HotspotClusterIndex, cluster_reports
+from corroboration import CorroborationIndex, Item, score_pair
+from events import EventHub, SqliteEventTransport, sse_frame
+from geocoding import Gazetteer, ReverseGeocoder
+from media import ProcessedUpload, UploadProcessor
+from summaries import ChatCompletionsProvider, GeminiProvider, SummaryService, template_summary
+from stream_server import StreamRoute, create_stream_app, start_in_background
+from inference import ClipImageEngine, MicroBatcher, ModelRegistry, ModelWarming, ZeroShotTextEngine, load_rgb_image
+from inference_cache import InferenceCache, content_hash, model_version, normalize_text
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'bluesignal-secret-key'
-CORS(app, origins=["http://localhost:5173", "http://localhost:3000", "http://localhost:3001"])
+CORS_ORIGINS = ["http://localhost:5173", "http://localhost:3000", "http://localhost:3001"]
+CORS(app, origins=CORS_ORIGINS)
 
 UPLOAD_FOLDER = 'uploads'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Uploaded photos are stored as a display copy, a classifier-size copy and a thumbnail (see media.py).
+UPLOAD_DISPLAY_SIZE = int(os.getenv("UPLOAD_DISPLAY_SIZE", "1280"))
+UPLOAD_MODEL_SIZE = int(os.getenv("UPLOAD_MODEL_SIZE", "224"))
+UPLOAD_THUMBNAIL_SIZE = int(os.getenv("UPLOAD_THUMBNAIL_SIZE", "320"))
+# Bulk feed uploads and their checkpoints; kept outside the publicly served uploads folder.
+INGEST_FOLDER = os.getenv("INGEST_FOLDER", "ingest")
+os.makedirs(INGEST_FOLDER, exist_ok=True)
+# Rows fetched from the cursor per chunk of a streamed export.
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
 app.static_folder = 'uploads'
 app.add_url_rule('/uploads/<path:filename>', endpoint='uploaded_file', view_func=lambda filename: app.send_static_file(filename))
 
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY", "get your own api key")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "get your own api key")
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-70b-versatile")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")
+# The next summary provider is started when the previous one has not answered after
+# SUMMARY_HEDGE_SECONDS; after SUMMARY_DEADLINE_SECONDS a template summary is used.
+SUMMARY_HEDGE_SECONDS = float(os.getenv("SUMMARY_HEDGE_SECONDS", "3"))
+SUMMARY_DEADLINE_SECONDS = float(os.getenv("SUMMARY_DEADLINE_SECONDS", "8"))
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "8"))
+# "async" stores a template summary at once and swaps in the LLM summary when it arrives,
+# "sync" waits for the LLM (up to the deadline), "offline" only uses templates.
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "async").lower()
+SUMMARY_REFINE_WORKERS = int(os.getenv("SUMMARY_REFINE_WORKERS", "2"))
+
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "10"))
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "16"))
+INFERENCE_TIMEOUT_SECONDS = float(os.getenv("INFERENCE_TIMEOUT_SECONDS", "60"))
+# "background" serves requests at once and loads models in parallel threads,
+# "lazy" loads each model on first use, "eager" blocks startup until all are loaded.
+MODEL_LOADING = os.getenv("MODEL_LOADING", "background").lower()
+MODEL_LOAD_WORKERS = int(os.getenv("MODEL_LOAD_WORKERS", "2"))
+INFERENCE_CACHE_PATH = os.getenv("INFERENCE_CACHE_PATH", "inference_cache.db")
+INFERENCE_CACHE_SIZE = int(os.getenv("INFERENCE_CACHE_SIZE", "10000"))
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "4"))
+# A post whose models are still loading is requeued instead of stored with a "Pipeline Error" classification.
+ENRICHMENT_RETRIES = int(os.getenv("ENRICHMENT_RETRIES", "10"))
+ENRICHMENT_RETRY_SECONDS = float(os.getenv("ENRICHMENT_RETRY_SECONDS", "30"))
+SSE_BUFFER_SIZE = int(os.getenv("SSE_BUFFER_SIZE", "256"))
+SSE_REPLAY_SIZE = int(os.getenv("SSE_REPLAY_SIZE", "1000"))
+SSE_KEEPALIVE_SECONDS = 25
+# "memory" keeps events inside this process; "sqlite" shares them between worker processes via the event_log table.
+EVENT_BACKEND = os.getenv("EVENT_BACKEND", "memory").lower()
+EVENT_POLL_INTERVAL_MS = float(os.getenv("EVENT_POLL_INTERVAL_MS", "100"))
+EVENT_LOG_RETENTION_SECONDS = float(os.getenv("EVENT_LOG_RETENTION_SECONDS", "3600"))
+STREAM_SERVER_HOST = os.getenv("STREAM_SERVER_HOST", "127.0.0.1")
+STREAM_SERVER_PORT = int(os.getenv("STREAM_SERVER_PORT", "0"))
+CORROBORATION_RADIUS_KM = float(os.getenv("CORROBORATION_RADIUS_KM", "2"))
+CORROBORATION_WINDOW_HOURS = float(os.getenv("CORROBORATION_WINDOW_HOURS", "6"))
+# A new report is verified when a recent report or social post corroborates it or scores at least this much.
+CORROBORATION_VERIFY_SCORE = float(os.getenv("CORROBORATION_VERIFY_SCORE", "0.7"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# "online" asks Nominatim (cached, rate limited, gazetteer fallback); "offline" only uses the gazetteer.
+GEOCODE_MODE = os.getenv("GEOCODE_MODE", "online").lower()
+GEOCODE_GAZETTEER = os.getenv("GEOCODE_GAZETTEER", "gazetteer.csv")
+GEOCODE_PRECISION = int(os.getenv("GEOCODE_PRECISION", "3"))
+GEOCODE_RATE_PER_SECOND = float(os.getenv("GEOCODE_RATE_PER_SECOND", "1"))
+GEOCODE_MAX_WAIT_SECONDS = float(os.getenv("GEOCODE_MAX_WAIT_SECONDS", "2"))
+GEOCODE_TIMEOUT_SECONDS = float(os.getenv("GEOCODE_TIMEOUT_SECONDS", "5"))
 
 logger.info(f"Google API Key loaded: {'Yes' if GOOGLE_API_KEY else 'No'}")
 logger.info(f"Groq API Key loaded: {'Yes' if GROQ_API_KEY else 'No'}")
@@ -90,15 +154,177 @@ class APIResponse(BaseModel):
     data: Optional[Dict] = None
     error: Optional[str] = None
 
-text_classifier = None
-flood_classifier = None
-image_classifier = None
-geolocator = None
+NLI_MODEL = "typeform/distilbert-base-uncased-mnli"
+CLIP_MODEL = "openai/clip-vit-base-patch32"
+
+URGENCY_LABELS = ["Urgent Panic", "Alert Caution", "Safe Normal"]
+
+FLOOD_TYPE_LABELS = [
+    "Urban Flooding",
+    "River Overflow",
+    "Flash Flood",
+    "Drainage Failure",
+    "Heavy Rain Accumulation",
+    "Dam or Levee Breach",
+    "Sewer Backup",
+    "Groundwater Rise",
+    "Landslide-Induced Flooding",
+    "Coastal Storm Surge",
+    "Other/Unknown Flood"
+]
+
+TEXT_LABEL_SETS = {
+    'urgency': URGENCY_LABELS,
+    'flood_type': FLOOD_TYPE_LABELS
+}
+
+IMAGE_LABEL_CLASSES = {
+    "severe urban flooding with shoulder-level stagnant water on streets": "Urban Flooding (Severe, Stagnant)",
+    "severe urban flooding with streets and vehicles submerged": "Urban Flooding (Severe)",
+    "moderate street flooding with pooled rainwater": "Urban Flooding (Moderate)",
+    "flash flood with rapid water flow in streets": "Flash Flood",
+    "river overflow flooding nearby neighborhoods": "River Overflow",
+    "drainage failure causing waterlogging": "Drainage Failure",
+    "heavy rain accumulation on roads and low-lying areas": "Heavy Rain Accumulation",
+    "dam or levee breach with downstream flooding": "Dam or Levee Breach",
+    "sewer backup causing localized flooding": "Sewer Backup",
+    "groundwater rise flooding basements": "Groundwater Rise",
+    "landslide-induced flooding with mud and water": "Landslide-Induced Flooding",
+    "coastal storm surge flooding coastal roads": "Coastal Storm Surge",
+    "normal street scene with no flooding": "No Flooding"
+}
+
+IMAGE_LABELS = list(IMAGE_LABEL_CLASSES.keys())
+
+VERIFICATION_LABELS = ["positive agreement", "negative disagreement"]
+
+TEXT_HYPOTHESIS_TEMPLATE = "This example is {}."
+IMAGE_HYPOTHESIS_TEMPLATE = "This is a photo of {}."
+
+text_cache_version = model_version(NLI_MODEL, TEXT_HYPOTHESIS_TEMPLATE, TEXT_LABEL_SETS)
+image_cache_version = model_version(CLIP_MODEL, IMAGE_HYPOTHESIS_TEMPLATE, IMAGE_LABELS)
+
+def load_clip_engine() -> ClipImageEngine:
+    engine = ClipImageEngine(CLIP_MODEL, IMAGE_HYPOTHESIS_TEMPLATE)
+    engine.set_labels(IMAGE_LABELS)
+    return engine
+
+# Every model is loaded once, by initialize_models() or on first use; request paths never load weights.
+model_registry = ModelRegistry(max_workers=MODEL_LOAD_WORKERS)
+model_registry.register('nli', lambda: ZeroShotTextEngine(NLI_MODEL, TEXT_HYPOTHESIS_TEMPLATE))
+model_registry.register('clip', load_clip_engine)
+
+text_batcher = None
+image_batcher = None
 report_agent = None
 verification_agent = None
 
-hotspot_listeners = []
-post_listeners = []
+def create_event_transport():
+    if EVENT_BACKEND == 'memory':
+        return None
+    if EVENT_BACKEND == 'sqlite':
+        return SqliteEventTransport(
+            database.get_connection,
+            poll_interval=EVENT_POLL_INTERVAL_MS / 1000.0,
+            retention_seconds=EVENT_LOG_RETENTION_SECONDS
+        )
+    raise ValueError(f"Unknown EVENT_BACKEND: {EVENT_BACKEND}")
+
+# Empty INFERENCE_CACHE_PATH keeps the cache in memory only.
+inference_cache = InferenceCache(INFERENCE_CACHE_PATH or None, max_memory_entries=INFERENCE_CACHE_SIZE)
+
+geolocator = Nominatim(user_agent="flood_detection_app/1.0", timeout=GEOCODE_TIMEOUT_SECONDS)
+
+def nominatim_reverse(lat: float, lon: float) -> Optional[Dict]:
+    location = geolocator.reverse(f"{lat},{lon}")
+    if not location:
+        return None
+    return {'address': location.address, 'latitude': location.latitude, 'longitude': location.longitude}
+
+def load_gazetteer() -> Optional[Gazetteer]:
+    try:
+        return Gazetteer.load(GEOCODE_GAZETTEER)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"No offline gazetteer ({GEOCODE_GAZETTEER}): {e}")
+        return None
+
+geocoder = ReverseGeocoder(
+    None if GEOCODE_MODE == 'offline' else nominatim_reverse, inference_cache, gazetteer=load_gazetteer(),
+    precision=GEOCODE_PRECISION, rate_per_second=GEOCODE_RATE_PER_SECOND, max_wait_seconds=GEOCODE_MAX_WAIT_SECONDS
+)
+
+def create_summary_providers() -> List:
+    providers = []
+    if SUMMARY_MODE == 'offline':
+        return providers
+    if GROQ_API_KEY:
+        providers.append(ChatCompletionsProvider('groq', GROQ_API_URL, GROQ_API_KEY, GROQ_MODEL, pool_size=SUMMARY_WORKERS))
+    if GOOGLE_API_KEY:
+        providers.append(GeminiProvider(GOOGLE_API_KEY, GEMINI_MODEL, base_url=GEMINI_BASE_URL or None))
+    return providers
+
+summary_service = SummaryService(
+    create_summary_providers(), hedge_after_seconds=SUMMARY_HEDGE_SECONDS,
+    deadline_seconds=SUMMARY_DEADLINE_SECONDS, max_workers=SUMMARY_WORKERS
+)
+
+upload_processor = UploadProcessor(
+    UPLOAD_FOLDER, display_size=UPLOAD_DISPLAY_SIZE, model_size=UPLOAD_MODEL_SIZE, thumbnail_size=UPLOAD_THUMBNAIL_SIZE
+)
+
+event_hub = EventHub(buffer_size=SSE_BUFFER_SIZE, replay_size=SSE_REPLAY_SIZE, transport=create_event_transport())
+
+# Location names clients send when the user typed none; posts with coordinates get geocoded instead.
+PLACEHOLDER_LOCATIONS = ('Unknown Location', 'Current Location')
+ENRICHMENT_STAGES = ['geocoding', 'text_classification', 'corroboration', 'image_classification', 'summary', 'saving', 'notifying']
+# Summary refinements wait on LLM APIs; their own pool keeps them from delaying enrichment.
+# Job records are also saved to the database, so a status poll can reach any worker process.
+job_manager = JobManager(max_workers=ENRICHMENT_WORKERS, pool_sizes={'summary_refinement': SUMMARY_REFINE_WORKERS},
+                         store=database.save_job)
+hotspot_clusters = HotspotClusterIndex()
+corroboration_index = CorroborationIndex(
+    radius_km=CORROBORATION_RADIUS_KM, window_hours=CORROBORATION_WINDOW_HOURS,
+    urgent_levels=URGENCY_LABELS[:2]
+)
+
+def index_hotspot_event(event):
+    # Fed from the hub rather than the request path so reports created by other workers are indexed too.
+    if event.channel == 'hotspots':
+        report = event.payload()['data']
+        if not hotspot_clusters.add(report):
+            # A re-published report (e.g. its summary was replaced): keep the newer copy.
+            hotspot_clusters.refresh(report)
+        corroboration_index.add(Item.from_report(report))
+
+def load_corroboration_items(since_epoch: float) -> List[Item]:
+    since = datetime.utcfromtimestamp(since_epoch).strftime('%Y-%m-%d %H:%M:%S')
+    items = [Item.from_report(report) for report in database.get_reports_for_map(since=since)]
+    items.extend(Item.from_social_post(post) for post in database.get_social_posts_since(since))
+    return items
+
+def find_corroboration(item: Item, top_k: int = 5) -> List[Dict]:
+    corroboration_index.ensure_loaded(load_corroboration_items)
+    return corroboration_index.corroborate(item, top_k=top_k)
+
+def is_corroborated(matches: List[Dict]) -> bool:
+    return any(m['corroborates'] or m['score'] >= CORROBORATION_VERIFY_SCORE for m in matches)
+
+event_hub.add_listener(index_hotspot_event)
+
+authenticator = Authenticator(
+    app.config['SECRET_KEY'], database.get_user_by_username,
+    ttl_seconds=AUTH_CACHE_TTL_SECONDS, max_entries=AUTH_CACHE_SIZE
+)
+
+def invalidate_user(username: str):
+    """Drop ``username`` from the auth cache of every worker (relayed over the event hub)."""
+    event_hub.publish('users', {'type': 'user_changed', 'username': username}, key=username)
+
+def on_user_event(event):
+    if event.channel == 'users':
+        authenticator.invalidate_user(event.payload()['username'])
+
+event_hub.add_listener(on_user_event)
 
 def hash_password(password: str) -> str:
     """Simple password hashing using SHA256"""
@@ -108,29 +334,30 @@ def verify_password(password: str, hashed: str) -> bool:
     """Verify password against hash"""
     return hash_password(password) == hashed
 
-def initialize_models():
-    global text_classifier, flood_classifier, image_classifier, geolocator, report_agent, verification_agent
+def initialize_models(mode: str = MODEL_LOADING) -> bool:
+    """Start the inference batchers and load the models according to ``mode``.
+    
+    "eager" returns once every model is loaded (False if one failed), "background"
+    starts parallel loads and returns at once, "lazy" loads each model when first needed.
+    """
+    global text_batcher, image_batcher, report_agent, verification_agent
     
     try:
-        logger.info("Loading AI models...")
-        try:
-            torch.set_num_threads(max(1, torch.get_num_threads()))
-        except Exception:
-            pass
-        
-        text_classifier = pipeline(
-            "zero-shot-classification",
-            model="typeform/distilbert-base-uncased-mnli"
+        logger.info(f"Initializing AI models ({mode} loading)...")
+        text_batcher = MicroBatcher(
+            "text",
+            lambda texts: model_registry.get('nli').classify_batch(texts, TEXT_LABEL_SETS),
+            max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms=INFERENCE_BATCH_WINDOW_MS
         )
-        flood_classifier = pipeline(
-            "zero-shot-classification",
-            model="typeform/distilbert-base-uncased-mnli"
+        image_batcher = MicroBatcher(
+            "image",
+            lambda images: model_registry.get('clip').classify_batch(images, IMAGE_LABELS),
+            max_batch_size=INFERENCE_MAX_BATCH_SIZE,
+            max_wait_ms=INFERENCE_BATCH_WINDOW_MS
         )
-        image_classifier = pipeline(
-            "zero-shot-image-classification",
-            model="openai/clip-vit-base-patch32"
-        )
-        geolocator = Nominatim(user_agent="flood_detection_app/1.0")
+        inference_cache.retain('text', [text_cache_version])
+        inference_cache.retain('image', [image_cache_version])
         
         # Gemini agent initialization commented out - requires phi-agent package
         # gemini_model = Gemini(id="gemini-1.5-flash", api_key=GOOGLE_API_KEY)
@@ -140,106 +367,144 @@ def initialize_models():
         report_agent = None
         verification_agent = None
         
-        logger.info("All models loaded successfully!")
+        if mode == 'eager':
+            model_registry.load_all()
+            logger.info("All models loaded successfully!")
+        elif mode == 'background':
+            model_registry.start_loading()
         return True
     except Exception as e:
         logger.error(f"Error initializing models: {str(e)}")
         return False
 
+def model_warming_response(name: str):
+    """503 "warming" response while model ``name`` is not ready (starting a lazy load), else None."""
+    if model_registry.ready(name):
+        return None
+    model_registry.start_loading([name])
+    return warming_response(name)
+
+def warming_response(name: str):
+    state = model_registry.state(name)
+    response = jsonify(APIResponse(
+        status="warming" if state != 'failed' else "error",
+        error=f"Model '{name}' is {state}; retry shortly"
+    ).model_dump())
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+def _top_classification(ranked) -> ClassificationResult:
+    label, score = ranked[0]
+    return ClassificationResult(class_name=label, confidence=round(float(score), 3))
+
+def run_batched(batcher: MicroBatcher, model_name: str, item):
+    # Only cache misses get here, so cached results are served even while a model is warming.
+    # Raises ModelWarming if the model is still loading after INFERENCE_TIMEOUT_SECONDS.
+    model_registry.wait(model_name, INFERENCE_TIMEOUT_SECONDS)
+    return batcher(item, timeout=INFERENCE_TIMEOUT_SECONDS)
+
+def score_text(text: str) -> Dict[str, List]:
+    """Urgency and flood-type scores for ``text``; identical (normalized) texts hit the cache."""
+    if text_batcher is None:
+        raise RuntimeError("text_batcher not initialized")
+    digest = content_hash(normalize_text(text).encode('utf-8'))
+    return inference_cache.get_or_compute(
+        'text', text_cache_version, digest,
+        lambda: run_batched(text_batcher, 'nli', text)
+    )
+
+def score_texts(texts: List[str]) -> List[Dict[str, List]]:
+    """``score_text`` for many texts; cache misses share batched forward passes."""
+    if text_batcher is None:
+        raise RuntimeError("text_batcher not initialized")
+    digests = [content_hash(normalize_text(text).encode('utf-8')) for text in texts]
+    results = [inference_cache.get('text', text_cache_version, digest) for digest in digests]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        model_registry.wait('nli', INFERENCE_TIMEOUT_SECONDS)
+    # Queue one batch at a time so interactive requests never wait behind a whole bulk load.
+    step = text_batcher.max_batch_size
+    for start in range(0, len(missing), step):
+        window = missing[start:start + step]
+        futures = [text_batcher.submit(texts[i]) for i in window]
+        for i, future in zip(window, futures):
+            scores = future.result(timeout=INFERENCE_TIMEOUT_SECONDS)
+            results[i] = inference_cache.put('text', text_cache_version, digests[i], scores)
+    return results
+
+def score_image(image, digest: Optional[str] = None) -> List:
+    """CLIP label ranking for an image, cached by a hash of its encoded bytes.
+    
+    ``image`` is a path, encoded bytes or a decoded PIL image; pass the ``digest``
+    of the original upload with a decoded image (or to skip hashing a path).
+    """
+    if image_batcher is None:
+        raise RuntimeError("image_batcher not initialized")
+    if digest is None:
+        if isinstance(image, str):
+            with open(image, 'rb') as f:
+                image = f.read()
+        digest = content_hash(image)
+    return inference_cache.get_or_compute(
+        'image', image_cache_version, digest,
+        lambda: run_batched(image_batcher, 'clip', load_rgb_image(image))
+    )
+
+def classify_text_report(text: str) -> Tuple[ClassificationResult, ClassificationResult]:
+    """Urgency and flood type for one text, scored in a single NLI forward pass."""
+    try:
+        scores = score_text(text)
+        return _top_classification(scores['urgency']), _top_classification(scores['flood_type'])
+    except ModelWarming:
+        raise
+    except Exception as e:
+        logger.error(f"Error in text classification: {str(e)}")
+        error = ClassificationResult(class_name="Pipeline Error", confidence=0.0)
+        return error, error
+
 def classify_urgency(text: str) -> ClassificationResult:
     try:
-        if text_classifier is None:
-            raise RuntimeError("text_classifier not initialized")
-        labels = ["Urgent Panic", "Alert Caution", "Safe Normal"]
-        result = text_classifier(text, labels)
-        return ClassificationResult(
-            class_name=result['labels'][0],
-            confidence=round(float(result['scores'][0]), 3)
-        )
+        scores = score_text(text)
+        return _top_classification(scores['urgency'])
+    except ModelWarming:
+        raise
     except Exception as e:
         logger.error(f"Error in urgency classification: {str(e)}")
         return ClassificationResult(class_name="Pipeline Error", confidence=0.0)
 
 def classify_flood_type(text: str) -> ClassificationResult:
     try:
-        if flood_classifier is None:
-            raise RuntimeError("flood_classifier not initialized")
-        labels = [
-            "Urban Flooding",
-            "River Overflow",
-            "Flash Flood",
-            "Drainage Failure",
-            "Heavy Rain Accumulation",
-            "Dam or Levee Breach",
-            "Sewer Backup",
-            "Groundwater Rise",
-            "Landslide-Induced Flooding",
-            "Coastal Storm Surge",
-            "Other/Unknown Flood"
-        ]
-        result = flood_classifier(text, labels)
-        return ClassificationResult(
-            class_name=result['labels'][0],
-            confidence=round(float(result['scores'][0]), 3)
-        )
+        scores = score_text(text)
+        return _top_classification(scores['flood_type'])
+    except ModelWarming:
+        raise
     except Exception as e:
         logger.error(f"Error in flood classification: {str(e)}")
         return ClassificationResult(class_name="Pipeline Error", confidence=0.0)
 
-def classify_flood_image(image_path: str) -> ImageClassificationResult:
+def classify_flood_image(image, digest: Optional[str] = None) -> ImageClassificationResult:
     try:
-        if image_classifier is None:
-            raise RuntimeError("image_classifier not initialized")
-        labels = [
-            "severe urban flooding with shoulder-level stagnant water on streets",
-            "severe urban flooding with streets and vehicles submerged",
-            "moderate street flooding with pooled rainwater",
-            "flash flood with rapid water flow in streets",
-            "river overflow flooding nearby neighborhoods",
-            "drainage failure causing waterlogging",
-            "heavy rain accumulation on roads and low-lying areas",
-            "dam or levee breach with downstream flooding",
-            "sewer backup causing localized flooding",
-            "groundwater rise flooding basements",
-            "landslide-induced flooding with mud and water",
-            "coastal storm surge flooding coastal roads",
-            "normal street scene with no flooding"
-        ]
-        result = image_classifier(image_path, candidate_labels=labels)
-        class_mapping = {
-            "severe urban flooding with shoulder-level stagnant water on streets": "Urban Flooding (Severe, Stagnant)",
-            "severe urban flooding with streets and vehicles submerged": "Urban Flooding (Severe)",
-            "moderate street flooding with pooled rainwater": "Urban Flooding (Moderate)",
-            "flash flood with rapid water flow in streets": "Flash Flood",
-            "river overflow flooding nearby neighborhoods": "River Overflow",
-            "drainage failure causing waterlogging": "Drainage Failure",
-            "heavy rain accumulation on roads and low-lying areas": "Heavy Rain Accumulation",
-            "dam or levee breach with downstream flooding": "Dam or Levee Breach",
-            "sewer backup causing localized flooding": "Sewer Backup",
-            "groundwater rise flooding basements": "Groundwater Rise",
-            "landslide-induced flooding with mud and water": "Landslide-Induced Flooding",
-            "coastal storm surge flooding coastal roads": "Coastal Storm Surge",
-            "normal street scene with no flooding": "No Flooding"
-        }
-        top_prediction = result[0]['label']
-        confidence = result[0]['score']
+        result = score_image(image, digest)
+        top_prediction, confidence = result[0]
         return ImageClassificationResult(
-            type=class_mapping.get(top_prediction, "Unknown"),
+            type=IMAGE_LABEL_CLASSES.get(top_prediction, "Unknown"),
             confidence=round(float(confidence), 3),
             prediction=top_prediction
         )
+    except ModelWarming:
+        raise
     except Exception as e:
         logger.error(f"Error in image classification: {str(e)}")
         return ImageClassificationResult(type="Pipeline Error", confidence=0.0, prediction="error")
 
 def get_location_from_coordinates(lat: float, lon: float) -> Optional[LocationInfo]:
     try:
-        location = geolocator.reverse(f"{lat},{lon}")
+        location = geocoder.reverse(lat, lon)
         if location:
             return LocationInfo(
-                address=location.address,
-                latitude=location.latitude,
-                longitude=location.longitude
+                address=location['address'],
+                latitude=location['latitude'],
+                longitude=location['longitude']
             )
         return None
     except Exception as e:
@@ -253,8 +518,7 @@ def process_social_media_data(tweets_data: List[Dict]) -> Optional[Dict]:
         
         latest_tweet = tweets_data[0]
         
-        urgency_result = classify_urgency(latest_tweet['text'])
-        flood_result = classify_flood_type(latest_tweet['text'])
+        urgency_result, flood_result = classify_text_report(latest_tweet['text'])
         
         return {
             'text': latest_tweet['text'],
@@ -289,14 +553,10 @@ def verify_data_with_agent(citizen_data: Dict, social_data: Dict) -> bool:
         verification_text = str(response.content).strip()
         logger.info(f"Verification agent response: {verification_text}")
         
-        verification_classifier = pipeline("zero-shot-classification", 
-                                        model="typeform/distilbert-base-uncased-mnli")
-        labels = ["positive agreement", "negative disagreement"]
-        classification_result = verification_classifier(verification_text, labels)
-        
-        is_positive = classification_result['labels'][0] == "positive agreement"
-        confidence = classification_result['scores'][0]
-        logger.info(f"Verification classification: {classification_result['labels'][0]} (confidence: {confidence:.3f})")
+        scores = model_registry.get('nli').classify(verification_text, {'agreement': VERIFICATION_LABELS})
+        label, confidence = scores['agreement'][0]
+        is_positive = label == "positive agreement"
+        logger.info(f"Verification classification: {label} (confidence: {confidence:.3f})")
         
         return is_positive
         
@@ -306,159 +566,292 @@ def verify_data_with_agent(citizen_data: Dict, social_data: Dict) -> bool:
 
 def generate_report_with_agent(citizen_data: Dict) -> str:
     try:
-        if GROQ_API_KEY:
-            try:
-                headers = {
-                    'Authorization': f'Bearer {GROQ_API_KEY}',
-                    'Content-Type': 'application/json'
-                }
-                system_prompt = (
-                    "You are a disaster response analyst. Write a concise (≤90 words), "
-                    "professional flood situation summary with: 1) Situation & severity, 2) Likely impact, "
-                    "3) Immediate recommended actions. Avoid fluff, no emojis."
-                )
-                user_prompt = (
-                    f"Citizen text: {citizen_data.get('text_report','')}\n"
-                    f"Urgency: {citizen_data.get('urgency_classification',{}).get('class_name','Unknown')}\n"
-                    f"Hazard: {citizen_data.get('flood_classification',{}).get('class_name','Unknown')}\n"
-                    f"Location: {citizen_data.get('location',{}).get('address','Unknown')}\n"
-                    "Summarize clearly for decision-makers."
-                )
-                payload = {
-                    'model': 'llama-3.1-70b-versatile',
-                    'messages': [
-                        {'role': 'system', 'content': system_prompt},
-                        {'role': 'user', 'content': user_prompt}
-                    ],
-                    'temperature': 0.2,
-                    'max_tokens': 180
-                }
-                resp = requests.post(
-                    'https://api.groq.com/openai/v1/chat/completions',
-                    headers=headers,
-                    json=payload,
-                    timeout=20
-                )
-                if resp.ok:
-                    data = resp.json()
-                    content = data.get('choices',[{}])[0].get('message',{}).get('content','')
-                    if content:
-                        return content.strip()
-                    logger.warning('Groq response missing content, falling back.')
-                else:
-                    logger.error(f"Groq API error {resp.status_code}: {resp.text}")
-            except Exception as ge:
-                    logger.error(f"Groq call failed: {ge}")
-
-        if GOOGLE_API_KEY:
-            try:
-                from google import genai
-                from google.genai import types as genai_types
-
-                client = genai.Client(api_key=GOOGLE_API_KEY)
-                system_instruction = (
-                    "You are a disaster response analyst. Write a concise (≤90 words), "
-                    "professional flood situation summary with: 1) Situation & severity, 2) Likely impact, "
-                    "3) Immediate recommended actions. Avoid fluff, no emojis."
-                )
-                contents = (
-                    f"Citizen text: {citizen_data.get('text_report','')}\n"
-                    f"Urgency: {citizen_data.get('urgency_classification',{}).get('class_name','Unknown')}\n"
-                    f"Hazard: {citizen_data.get('flood_classification',{}).get('class_name','Unknown')}\n"
-                    f"Location: {citizen_data.get('location',{}).get('address','Unknown')}\n"
-                    "Summarize clearly for decision-makers."
-                )
-                response = client.models.generate_content(
-                    model="gemini-2.5-flash",
-                    config=genai_types.GenerateContentConfig(system_instruction=system_instruction),
-                    contents=contents
-                )
-                txt = getattr(response, 'text', None)
-                if txt:
-                    return txt.strip()
-                logger.warning('Gemini client response missing text, falling back.')
-            except Exception as ge:
-                logger.error(f"Gemini client call failed: {ge}")
-
-        return "Issue: AI summary generation unavailable."
+        summary, source = summary_service.summarize(citizen_data)
+        logger.info(f"Summary generated by {source}")
+        return summary
     except Exception as e:
         logger.error(f"Report generation error: {e}")
         return "Issue: AI summary generation error."
 
 def fallback_verification(citizen_data: Dict, social_data: Dict) -> bool:
     try:
-        citizen_text = citizen_data['text_report'].lower()
-        social_text = social_data['text'].lower()
-        
-        flood_keywords = ['flood', 'flooding', 'water', 'inundation', 'submerged', 'overflow']
-        street_keywords = ['street', 'road', 'sidewalk', 'pavement', 'highway']
-        building_keywords = ['building', 'house', 'shop', 'office', 'structure']
+        citizen = Item('report', None, citizen_data['text_report'],
+                       flood_type=citizen_data['flood_classification']['class_name'],
+                       urgency=citizen_data['urgency_classification']['class_name'])
+        social = Item('social', None, social_data['text'],
+                      flood_type=social_data['flood_type']['class_name'],
+                      urgency=social_data['urgency']['class_name'])
+        score, components, corroborates = score_pair(
+            citizen, social, corroboration_index.radius_km, corroboration_index.window_seconds,
+            corroboration_index.urgent_levels
+        )
+        logger.info(f"Fallback verification - score {score}: {components}")
+        return corroborates
         
-        citizen_has_flood = any(keyword in citizen_text for keyword in flood_keywords)
-        citizen_has_street = any(keyword in citizen_text for keyword in street_keywords)
-        citizen_has_building = any(keyword in citizen_text for keyword in building_keywords)
+    except Exception as e:
+        logger.error(f"Fallback verification error: {e}")
+        return False
+
+def notify_hotspot(report: Dict):
+    event_hub.publish('hotspots', {'type': 'hotspot', 'data': report}, key=report.get('id'))
+
+def notify_post(post: Optional[Dict]):
+    if not post:
+        return
+    event_hub.publish('posts', {'type': 'post', 'data': post}, key=post.get('id'))
+
+KEEPALIVE_FRAME = sse_frame({'type': 'keepalive'})
+
+SSE_HEADERS = {
+    'Content-Type': 'text/event-stream',
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no'
+}
+
+def stream_resume_args():
+    """Resume point of an SSE client: (Last-Event-ID header or last_event_id param, since param)."""
+    raw_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(raw_id) if raw_id else None
+    except ValueError:
+        last_event_id = None
+    since = request.args.get('since')
+    return last_event_id, parse_timestamp_arg(since) if since else None
+
+def latest_posts():
+    """Posts stream snapshot: the first feed page, like GET /api/posts; older posts are paged by cursor."""
+    return database.get_all_posts_with_votes(database.DEFAULT_PAGE_SIZE)
+
+def stream_channel(channel: str, snapshot_loader, delta_loader, last_event_id: Optional[int] = None, since: Optional[str] = None):
+    """SSE generator for one channel, then shared event frames until the client disconnects.
+    
+    A client reconnecting with a Last-Event-ID still covered by the hub's replay log
+    only gets the events it missed; with ``since`` it gets the rows changed after that
+    time as a 'delta'; otherwise it gets a full 'snapshot'.
+    """
+    subscription, replay, position = event_hub.subscribe(channel, last_event_id)
+    try:
+        try:
+            if replay is not None:
+                for event in replay:
+                    yield event.frame
+            elif since:
+                yield sse_frame({'type': 'delta', 'data': delta_loader(since) or []}, position)
+            else:
+                yield sse_frame({'type': 'snapshot', 'data': snapshot_loader() or []}, position)
+        except Exception as e:
+            logger.error(f"Snapshot error on {channel}: {e}")
         
-        social_has_flood = any(keyword in social_text for keyword in flood_keywords)
-        social_has_street = any(keyword in social_text for keyword in street_keywords)
-        social_has_building = any(keyword in social_text for keyword in building_keywords)
+        while True:
+            event = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+            yield event.frame if event else KEEPALIVE_FRAME
+    finally:
+        subscription.close()
+
+def refine_report_summary(job, report: Dict, summary_input: Dict) -> Dict:
+    """Replace a report's template summary with an LLM one and re-publish the report."""
+    job.stage('summary')
+    summary, source = summary_service.summarize(summary_input)
+    if source == 'template':
+        return {'report_id': report['id'], 'replaced': False}
+    database.update_report_summary(report['id'], summary)
+    notify_hotspot(dict(report, ai_summary=summary))
+    logger.info(f"Report {report['id']} summary replaced by {source}")
+    return {'report_id': report['id'], 'replaced': True, 'source': source}
+
+def needs_geocoding(latitude: Optional[float], longitude: Optional[float], location_name: Optional[str]) -> bool:
+    return latitude is not None and longitude is not None and (not location_name or location_name in PLACEHOLDER_LOCATIONS)
+
+def enrich_post(job, post_id: int, user_id: int, title: str, description: str, upload: Optional[ProcessedUpload],
+                latitude: Optional[float], longitude: Optional[float], location_name: str) -> Dict:
+    """Background enrichment for a new post: classify, summarize, store the report and notify listeners."""
+    try:
+        logger.info(f"Starting AI processing pipeline for post {post_id}...")
+        if needs_geocoding(latitude, longitude, location_name):
+            job.stage('geocoding')
+            location = get_location_from_coordinates(latitude, longitude)
+            if location:
+                location_name = location.address
+                database.update_post_location(post_id, location_name)
+        job.stage('text_classification')
+        urgency_result, flood_result = classify_text_report(description)
+        logger.info(f"Text classification - Urgency: {urgency_result.class_name}, Flood: {flood_result.class_name}")
         
-        citizen_urgency = citizen_data['urgency_classification']['class_name']
-        social_urgency = social_data['urgency']['class_name']
-        urgency_match = citizen_urgency in ['Severe Flooding', 'Moderate Waterlogging'] and social_urgency in ['Severe Flooding', 'Moderate Waterlogging']
+        job.stage('corroboration')
+        try:
+            corroboration = find_corroboration(Item(
+                'report', None, f"{title} {description}", latitude, longitude, None,
+                flood_result.class_name, urgency_result.class_name, location_name
+            ))
+        except Exception as e:
+            logger.error(f"Corroboration error: {e}")
+            corroboration = []
         
-        citizen_flood = citizen_data['flood_classification']['class_name']
-        social_flood = social_data['flood_type']['class_name']
+        image_result = None
+        if upload:
+            job.stage('image_classification')
+            image_result = classify_flood_image(upload.model_image(), upload.digest)
         
-        related_floods = {
-            'Urban Flooding': ['Street Flooding', 'Drainage Failure', 'Heavy Rain Accumulation'],
-            'Street Flooding': ['Urban Flooding', 'Drainage Failure', 'Heavy Rain Accumulation'],
-            'River Overflow': ['Flash Flood', 'Heavy Rain Accumulation'],
-            'Flash Flood': ['River Overflow', 'Heavy Rain Accumulation']
+        job.stage('summary')
+        verified = is_corroborated(corroboration)
+        summary_input = {
+            'text_report': description,
+            'flood_classification': flood_result.model_dump(),
+            'urgency_classification': urgency_result.model_dump(),
+            'image_classification': image_result.model_dump() if image_result else None,
+            'location': {'address': location_name}
         }
+        refine_summary = SUMMARY_MODE == 'async' and bool(summary_service.providers)
+        if SUMMARY_MODE == 'sync':
+            ai_summary = generate_report_with_agent(summary_input)
+        else:
+            ai_summary = template_summary(summary_input)
         
-        flood_match = (
-            citizen_flood == social_flood or
-            citizen_flood in related_floods.get(social_flood, []) or
-            social_flood in related_floods.get(citizen_flood, [])
-        )
-        
-        keyword_match = (
-            (citizen_has_flood and social_has_flood) or
-            (citizen_has_street and social_has_street) or
-            (citizen_has_building and social_has_building)
+        job.stage('saving')
+        report_id = database.create_report(
+            post_id, user_id, urgency_result.class_name,
+            flood_result.class_name, urgency_result.confidence, verified,
+            ai_summary, latitude, longitude, location_name
         )
+        status = 'verified' if verified else 'pending'
+        database.update_post_status(post_id, status)
+        logger.info(f"AI processing complete - Post ID: {post_id}, Report ID: {report_id}")
         
-        verification_result = (flood_match or keyword_match) and urgency_match
-        logger.info(f"Fallback verification - Flood: {flood_match}, Keyword: {keyword_match}, Urgency: {urgency_match}")
+        job.stage('notifying')
+        try:
+            report = {
+                'id': report_id,
+                'post_id': post_id,
+                'title': title,
+                'description': description,
+                'urgency_level': urgency_result.class_name,
+                'flood_type': flood_result.class_name,
+                'ai_summary': ai_summary,
+                'latitude': latitude,
+                'longitude': longitude,
+                'location_name': location_name,
+                'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+                'verified': verified,
+                'status': status
+            }
+            notify_hotspot(report)
+            notify_post(database.get_post_by_id(post_id))
+        except Exception as e:
+            logger.error(f"Error notifying listeners: {e}")
         
-        return verification_result
+        summary_job_id = None
+        if refine_summary:
+            summary_job_id = job_manager.submit(
+                'summary_refinement', refine_report_summary, report, summary_input,
+                stages=['summary'], owner_id=user_id
+            )
         
-    except Exception as e:
-        logger.error(f"Fallback verification error: {e}")
-        return False
+        return {
+            'post_id': post_id,
+            'report_id': report_id,
+            'urgency': urgency_result.class_name,
+            'flood_type': flood_result.class_name,
+            'verified': verified,
+            'ai_summary': ai_summary,
+            'summary_job_id': summary_job_id,
+            'image_classification': image_result.model_dump() if image_result else None,
+            'corroboration': corroboration
+        }
+    except ModelWarming as e:
+        if job.retries_left:
+            raise RetryLater(str(e), ENRICHMENT_RETRY_SECONDS) from e
+        database.update_post_status(post_id, 'failed')
+        raise
+    except Exception:
+        database.update_post_status(post_id, 'failed')
+        raise
+
+def page_args():
+    """Read ``limit`` and ``cursor`` query params for keyset-paginated endpoints."""
+    try:
+        limit = int(request.args.get('limit', database.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    limit = max(1, min(limit, database.MAX_PAGE_SIZE))
+    after = request.args.get('cursor') or None
+    if after:
+        database.decode_cursor(after)
+    return limit, after
+
+def parse_timestamp_arg(value: str) -> str:
+    """ISO-8601 or epoch-seconds query value to the UTC 'YYYY-MM-DD HH:MM:SS' form SQLite stores."""
+    try:
+        dt = datetime.utcfromtimestamp(float(value))
+    except ValueError:
+        try:
+            dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f"Invalid timestamp: {value}")
+        if dt.tzinfo:
+            dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.strftime('%Y-%m-%d %H:%M:%S')
+
+def map_filter_args() -> Dict:
+    """Viewport and time-window filters for map queries.
+    
+    bbox=min_lng,min_lat,max_lng,max_lat; since/until as ISO-8601 or epoch seconds,
+    or hours=N for the last N hours; optional limit.
+    """
+    bbox = None
+    if request.args.get('bbox'):
+        try:
+            bbox = tuple(float(v) for v in request.args['bbox'].split(','))
+        except ValueError:
+            bbox = ()
+        if len(bbox) != 4 or bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+            raise ValueError('bbox must be min_lng,min_lat,max_lng,max_lat')
+    
+    since = request.args.get('since')
+    until = request.args.get('until')
+    hours = request.args.get('hours')
+    if hours:
+        try:
+            since = (datetime.utcnow() - timedelta(hours=float(hours))).strftime('%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            raise ValueError('hours must be a number')
+    elif since:
+        since = parse_timestamp_arg(since)
+    if until:
+        until = parse_timestamp_arg(until)
+    
+    limit = None
+    if request.args.get('limit'):
+        try:
+            limit = max(1, int(request.args['limit']))
+        except ValueError:
+            raise ValueError('limit must be an integer')
+    return {'bbox': bbox, 'since': since, 'until': until, 'limit': limit}
 
 def token_required(f):
     from functools import wraps
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get('Authorization')
-        if not token:
-            return jsonify({'error': 'No token provided'}), 401
-        try:
-            token = token.split(' ')[1]
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-            current_user = database.get_user_by_username(data['username'])
-            if not current_user:
-                return jsonify({'error': 'User not found'}), 401
-            return f(current_user, *args, **kwargs)
-        except:
-            return jsonify({'error': 'Invalid token'}), 401
+        current_user, error = authenticator.authenticate_header(request.headers.get('Authorization'))
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+        return f(current_user, *args, **kwargs)
     return decorated
 
 @app.route('/api/health', methods=['GET'])
 def health():
+    """Liveness: the process is up and serving, whether or not models are loaded."""
     return jsonify({'status': 'success', 'message': 'API is running'})
 
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """Readiness: 200 once every model is loaded, 503 with per-model state until then."""
+    is_ready = model_registry.ready()
+    return jsonify({
+        'status': 'ready' if is_ready else 'warming',
+        'models': {name: info['state'] for name, info in model_registry.stats().items()}
+    }), 200 if is_ready else 503
+
 @app.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.json
@@ -475,6 +868,7 @@ def register():
     user_id = database.create_user(username, email, hashed_password, role, full_name)
     
     if user_id:
+        invalidate_user(username)
         return jsonify({'message': 'User registered', 'user_id': user_id}), 201
     return jsonify({'error': 'Registration failed'}), 500
 
@@ -487,6 +881,7 @@ def login():
     user = database.get_user_by_username(username)
     if not user or not verify_password(password, user['password']):
         return jsonify({'error': 'Invalid credentials'}), 401
+    authenticator.cache_user(user)
     
     token = jwt.encode({
         'username': user['username'],
@@ -511,7 +906,7 @@ def create_post(current_user):
         return jsonify({'error': 'Unauthorized'}), 403
     
     media_url = None
-    image_path = None
+    upload = None
     if request.content_type and 'multipart/form-data' in request.content_type:
         form = request.form
         title = form.get('title', 'Flood Report')
@@ -521,11 +916,11 @@ def create_post(current_user):
         location_name = form.get('location_name', 'Unknown Location')
         file = request.files.get('image')
         if file and file.filename:
-            filename = f"{uuid.uuid4().hex}_{secure_filename(file.filename)}"
-            save_path = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(save_path)
-            image_path = save_path
-            media_url = f"/uploads/{filename}"
+            try:
+                upload = upload_processor.process(file.read())
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            media_url = f"/uploads/{upload.filename}"
     else:
         data = request.json or {}
         title = data.get('title', 'Flood Report')
@@ -535,13 +930,6 @@ def create_post(current_user):
         location_name = data.get('location_name', 'Unknown Location')
         media_url = data.get('media_url')
     
-    logger.info("Starting AI processing pipeline...")
-    
-    urgency_result = classify_urgency(description)
-    flood_result = classify_flood_type(description)
-    
-    logger.info(f"Text classification - Urgency: {urgency_result.class_name}, Flood: {flood_result.class_name}")
-    
     post_id = database.create_post(
         current_user['id'], title, description, media_url, latitude, longitude, location_name
     )
@@ -549,75 +937,97 @@ def create_post(current_user):
     if not post_id:
         return jsonify({'error': 'Failed to create post'}), 500
     
-    verified = True
-    ai_summary = generate_report_with_agent({
-        'text_report': description,
-        'flood_classification': flood_result.model_dump(),
-        'urgency_classification': urgency_result.model_dump(),
-        'location': {'address': location_name}
-    })
-    image_result = None
-    if image_path:
-        image_result = classify_flood_image(image_path)
+    notify_post(database.get_post_by_id(post_id))
     
-    report_id = database.create_report(
-        post_id, current_user['id'], urgency_result.class_name, 
-        flood_result.class_name, urgency_result.confidence, verified, 
-        ai_summary, latitude, longitude, location_name
+    job_id = job_manager.submit(
+        'post_enrichment', enrich_post,
+        post_id, current_user['id'], title, description, upload,
+        latitude, longitude, location_name,
+        stages=[stage for stage in ENRICHMENT_STAGES
+                if (stage != 'image_classification' or upload)
+                and (stage != 'geocoding' or needs_geocoding(latitude, longitude, location_name))],
+        owner_id=current_user['id'], retries=ENRICHMENT_RETRIES
     )
+    logger.info(f"Post {post_id} queued for AI processing (job {job_id})")
     
-    database.update_post_status(post_id, 'verified' if verified else 'pending')
-    
-    logger.info(f"AI processing complete - Post ID: {post_id}, Report ID: {report_id}")
+    return jsonify({
+        'message': 'Post accepted for processing',
+        'post_id': post_id,
+        'job_id': job_id,
+        'status': 'processing',
+        'status_url': f"/api/jobs/{job_id}",
+        'thumbnail_url': f"/uploads/{os.path.basename(upload.thumbnail_path)}" if upload else None
+    }), 202
 
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@token_required
+def get_job_status(current_user, job_id):
+    job = job_manager.get(job_id)
+    record = job.to_dict() if job else database.get_job(job_id)
+    if not record:
+        return jsonify({'error': 'Job not found'}), 404
+    if record['owner_id'] != current_user['id'] and current_user['role'] != 'authority':
+        return jsonify({'error': 'Unauthorized'}), 403
+    return jsonify({'job': record})
+
+def index_social_posts(posts: List[Dict]):
+    for post in posts:
+        corroboration_index.add(Item.from_social_post(post))
+
+def run_ingest(job, path: str, restart: bool = False) -> Dict:
+    job.stage('ingesting')
+    return ingest.ingest_file(path, score_texts, restart=restart, progress=lambda stats: job.update(**stats),
+                              on_insert=index_social_posts)
+
+@app.route('/api/auth/authority/reports/<int:report_id>/corroboration', methods=['GET'])
+@token_required
+def get_report_corroboration(current_user, report_id):
+    """Recent reports and social posts near a report, scored by how well they corroborate it."""
+    if current_user['role'] != 'authority':
+        return jsonify({'error': 'Unauthorized'}), 403
+    report = database.get_report_by_id(report_id)
+    if not report:
+        return jsonify({'error': 'Report not found'}), 404
     try:
-        payload = {
-            'type': 'hotspot',
-            'data': {
-                'id': report_id,
-                'post_id': post_id,
-                'title': title,
-                'description': description,
-                'urgency_level': urgency_result.class_name,
-                'flood_type': flood_result.class_name,
-                'ai_summary': ai_summary,
-                'latitude': latitude,
-                'longitude': longitude,
-                'location_name': location_name,
-                'status': 'verified' if verified else 'pending'
-            }
-        }
-        for q in list(hotspot_listeners):
-            try:
-                q.put_nowait(payload)
-            except Exception:
-                pass
-    except Exception as e:
-        logger.error(f"Error notifying listeners: {e}")
-    
-    try:
-        post_payload = {
-            'type': 'post',
-            'data': database.get_post_by_id(post_id)
-        }
-        for q in list(post_listeners):
-            try:
-                q.put_nowait(post_payload)
-            except Exception:
-                pass
-    except Exception as e:
-        logger.error(f"Error notifying post listeners: {e}")
+        top_k = max(1, min(int(request.args.get('limit', 10)), 100))
+    except ValueError:
+        return jsonify({'error': 'Invalid limit'}), 400
+    return jsonify({'report_id': report_id, 'matches': find_corroboration(Item.from_report(report), top_k)})
+
+@app.route('/api/auth/authority/social/ingest', methods=['POST'])
+@token_required
+def ingest_social_feed(current_user):
+    """Bulk-ingest an uploaded JSON array / NDJSON feed in the background.
 
+    Upload the feed as ``file`` (multipart), or resume an earlier upload with
+    ``{"file": "<name>"}``; add ``"restart": true`` to ignore its checkpoint.
+    """
+    if current_user['role'] != 'authority':
+        return jsonify({'error': 'Unauthorized'}), 403
+    if text_batcher is None:
+        return jsonify({'error': 'Models not loaded'}), 503
+
+    upload = request.files.get('file')
+    if upload and upload.filename:
+        filename = f"{uuid.uuid4().hex}_{secure_filename(upload.filename)}"
+        upload.save(os.path.join(INGEST_FOLDER, filename))
+        restart = False
+    else:
+        data = request.get_json(silent=True) or {}
+        filename = secure_filename(data.get('file') or '')
+        restart = bool(data.get('restart'))
+        if not filename or not os.path.isfile(os.path.join(INGEST_FOLDER, filename)):
+            return jsonify({'error': 'Upload a feed as "file" or name a previous upload'}), 400
+
+    job_id = job_manager.submit(
+        'ingest', run_ingest, os.path.join(INGEST_FOLDER, filename), restart,
+        stages=['ingesting'], owner_id=current_user['id']
+    )
     return jsonify({
-        'message': 'Post created successfully',
-        'post_id': post_id,
-        'report_id': report_id,
-        'urgency': urgency_result.class_name,
-        'flood_type': flood_result.class_name,
-        'verified': verified,
-        'ai_summary': ai_summary,
-        'image_classification': image_result.model_dump() if image_result else None
-    })
+        'job_id': job_id,
+        'file': filename,
+        'status_url': f"/api/jobs/{job_id}"
+    }), 202
 
 @app.route('/api/auth/citizen/posts', methods=['GET'])
 @token_required
@@ -625,164 +1035,128 @@ def get_citizen_posts(current_user):
     if current_user['role'] != 'citizen':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    posts = database.get_posts_by_user(current_user['id'])
-    return jsonify({'posts': posts})
+    try:
+        limit, after = page_args()
+        posts = database.get_posts_by_user(current_user['id'], limit, after)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'posts': posts, 'next_cursor': database.next_cursor(posts, limit)})
 
 @app.route('/api/auth/authority/hotspots', methods=['GET'])
 @token_required
 def get_hotspots(current_user):
     if current_user['role'] != 'authority':
         return jsonify({'error': 'Unauthorized'}), 403
-    reports = database.get_reports_for_map()
+    try:
+        filters = map_filter_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    reports = database.get_reports_for_map(**filters)
     return jsonify({'hotspots': reports})
 
+@app.route('/api/auth/authority/hotspots/clusters', methods=['GET'])
+@token_required
+def get_hotspot_clusters(current_user):
+    if current_user['role'] != 'authority':
+        return jsonify({'error': 'Unauthorized'}), 403
+    try:
+        zoom = int(request.args.get('zoom', 10))
+        filters = map_filter_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    zoom = max(hotspot_clusters.min_zoom, min(hotspot_clusters.max_zoom, zoom))
+    if filters['since'] or filters['until'] or filters['limit']:
+        # The incremental index holds every report, so windowed requests are clustered from a query.
+        reports = database.get_reports_for_map(**filters)
+        clusters = cluster_reports(reports, zoom, filters['bbox'], hotspot_clusters.cell_pixels)
+    else:
+        hotspot_clusters.ensure_loaded(database.get_reports_for_map)
+        clusters = hotspot_clusters.clusters(zoom, filters['bbox'])
+    return jsonify({'zoom': zoom, 'clusters': clusters})
+
 @app.route('/api/auth/authority/hotspots/stream', methods=['GET'])
 def hotspots_stream():
     """SSE stream for real-time hotspots. Expects JWT as query param 'token'."""
-    token = request.args.get('token')
-    if not token:
-        return jsonify({'error': 'No token provided'}), 401
-    try:
-        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        user = database.get_user_by_username(data['username'])
-        if not user or user['role'] != 'authority':
-            return jsonify({'error': 'Unauthorized'}), 403
-    except Exception:
-        return jsonify({'error': 'Invalid token'}), 401
+    user, error = authenticator.authenticate_query(request.args.get('token'), 'authority')
+    if error:
+        return jsonify({'error': error[0]}), error[1]
 
-    def event_stream():
-        q = queue.Queue()
-        hotspot_listeners.append(q)
-        try:
-            snapshot = database.get_reports_for_map() or []
-            yield f"data: {json.dumps({'type': 'snapshot', 'data': snapshot})}\n\n"
-        except Exception as e:
-            logger.error(f"Snapshot error: {e}")
-
-        try:
-            while True:
-                try:
-                    msg = q.get(timeout=25)
-                    yield f"data: {json.dumps(msg)}\n\n"
-                except queue.Empty:
-                    yield "data: {\"type\": \"keepalive\"}\n\n"
-        finally:
-            try:
-                hotspot_listeners.remove(q)
-            except ValueError:
-                pass
-
-    headers = {
-        'Content-Type': 'text/event-stream',
-        'Cache-Control': 'no-cache',
-        'Connection': 'keep-alive',
-        'X-Accel-Buffering': 'no'
-    }
-    return Response(stream_with_context(event_stream()), headers=headers)
+    try:
+        last_event_id, since = stream_resume_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    stream = stream_channel(
+        'hotspots',
+        database.get_reports_for_map,
+        database.get_reports_updated_since,
+        last_event_id, since
+    )
+    return Response(stream_with_context(stream), headers=SSE_HEADERS)
 
 @app.route('/api/posts', methods=['GET'])
 @token_required
 def get_all_posts(current_user):
-    posts = database.get_all_posts_with_votes()
-    return jsonify({'posts': posts})
+    try:
+        limit, after = page_args()
+        posts = database.get_all_posts_with_votes(limit, after)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'posts': posts, 'next_cursor': database.next_cursor(posts, limit)})
 
 @app.route('/api/auth/authority/reports/export', methods=['GET'])
 def export_reports():
-    """Export reports (no user details) as JSON or CSV. Auth via JWT token query param."""
-    token = request.args.get('token')
+    """Stream reports (no user details) as json, ndjson, csv or parquet. Auth via JWT token query param.
+    
+    Accepts the map filters (bbox, since/until or hours, limit) plus urgency=<level>[,<level>...];
+    gzip=1 compresses the download.
+    """
     fmt = request.args.get('format', 'json').lower()
-    if not token:
-        return jsonify({'error': 'No token provided'}), 401
-    try:
-        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        user = database.get_user_by_username(data['username'])
-        if not user or user['role'] != 'authority':
-            return jsonify({'error': 'Unauthorized'}), 403
-    except Exception:
-        return jsonify({'error': 'Invalid token'}), 401
-
-    raw = database.get_all_reports()
-    export_rows = []
-    for r in raw:
-        export_rows.append({
-            'report_id': r.get('id'),
-            'post_id': r.get('post_id'),
-            'title': r.get('title'),
-            'description': r.get('description'),
-            'urgency_level': r.get('urgency_level'),
-            'flood_type': r.get('flood_type'),
-            'confidence_score': r.get('confidence_score'),
-            'verified': r.get('verified'),
-            'ai_summary': r.get('ai_summary'),
-            'latitude': r.get('latitude'),
-            'longitude': r.get('longitude'),
-            'location_name': r.get('location_name'),
-            'created_at': r.get('created_at')
-        })
-
-    if fmt == 'csv':
-        if not export_rows:
-            csv_data = ''
-        else:
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=list(export_rows[0].keys()))
-            writer.writeheader()
-            writer.writerows(export_rows)
-            csv_data = output.getvalue()
-        headers = {
-            'Content-Type': 'text/csv',
-            'Content-Disposition': 'attachment; filename="reports.csv"'
-        }
-        return Response(csv_data, headers=headers)
-    else:
-        headers = {
-            'Content-Type': 'application/json',
-            'Content-Disposition': 'attachment; filename="reports.json"'
-        }
-        return Response(json.dumps(export_rows, ensure_ascii=False), headers=headers)
-
-@app.route('/api/posts/stream', methods=['GET'])
-def posts_stream():
-    token = request.args.get('token')
-    if not token:
-        return jsonify({'error': 'No token provided'}), 401
+    user, error = authenticator.authenticate_query(request.args.get('token'), 'authority')
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+    if fmt not in export.FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(export.FORMATS)}"}), 400
+    if fmt == 'parquet' and not export.parquet_available():
+        return jsonify({'error': 'Parquet export requires pyarrow on the server'}), 501
     try:
-        data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
-        user = database.get_user_by_username(data['username'])
-        if not user:
-            return jsonify({'error': 'Unauthorized'}), 403
-    except Exception:
-        return jsonify({'error': 'Invalid token'}), 401
-
-    def event_stream():
-        q = queue.Queue()
-        post_listeners.append(q)
-        try:
-            snapshot = database.get_all_posts_with_votes() or []
-            yield f"data: {json.dumps({'type': 'snapshot', 'data': snapshot})}\n\n"
-        except Exception as e:
-            logger.error(f"Post snapshot error: {e}")
-
-        try:
-            while True:
-                try:
-                    msg = q.get(timeout=25)
-                    yield f"data: {json.dumps(msg)}\n\n"
-                except queue.Empty:
-                    yield "data: {\"type\": \"keepalive\"}\n\n"
-        finally:
-            try:
-                post_listeners.remove(q)
-            except ValueError:
-                pass
+        filters = map_filter_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    urgency = [u.strip() for u in request.args.get('urgency', '').split(',') if u.strip()]
+    if set(urgency) - set(URGENCY_LABELS):
+        return jsonify({'error': f"urgency must be among {', '.join(URGENCY_LABELS)}"}), 400
 
+    encoder, content_type, extension = export.FORMATS[fmt]
+    chunks = database.iter_reports_for_export(urgency=urgency, chunk_size=EXPORT_CHUNK_SIZE, **filters)
+    body = encoder(database.EXPORT_COLUMNS, chunks)
+    filename = f"reports.{extension}"
+    if request.args.get('gzip', '').lower() in ('1', 'true', 'yes'):
+        body = export.gzip_stream(body)
+        content_type, filename = 'application/gzip', f"{filename}.gz"
     headers = {
-        'Content-Type': 'text/event-stream',
-        'Cache-Control': 'no-cache',
-        'Connection': 'keep-alive',
+        'Content-Type': content_type,
+        'Content-Disposition': f'attachment; filename="{filename}"',
         'X-Accel-Buffering': 'no'
     }
-    return Response(stream_with_context(event_stream()), headers=headers)
+    return Response(stream_with_context(body), headers=headers)
+
+@app.route('/api/posts/stream', methods=['GET'])
+def posts_stream():
+    user, error = authenticator.authenticate_query(request.args.get('token'))
+    if error:
+        return jsonify({'error': error[0]}), error[1]
+
+    try:
+        last_event_id, since = stream_resume_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    stream = stream_channel(
+        'posts',
+        latest_posts,
+        database.get_posts_since,
+        last_event_id, since
+    )
+    return Response(stream_with_context(stream), headers=SSE_HEADERS)
 
 @app.route('/api/posts/<int:post_id>/vote', methods=['POST'])
 @token_required
@@ -810,18 +1184,26 @@ def get_user_profile_by_username(current_user, username):
     if not user:
         return jsonify({'error': 'User not found'}), 404
     
-    profile = database.get_user_profile(user['id'])
+    try:
+        limit, after = page_args()
+        profile = database.get_user_profile(user['id'], limit, after)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     if profile:
-        return jsonify({'user': profile})
+        return jsonify({'user': profile, 'next_cursor': database.next_cursor(profile['posts'], limit)})
     else:
         return jsonify({'error': 'Failed to load profile'}), 500
 
 @app.route('/api/users/<int:user_id>', methods=['GET'])
 @token_required
 def get_user_profile_by_id(current_user, user_id):
-    profile = database.get_user_profile(user_id)
+    try:
+        limit, after = page_args()
+        profile = database.get_user_profile(user_id, limit, after)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     if profile:
-        return jsonify({'user': profile})
+        return jsonify({'user': profile, 'next_cursor': database.next_cursor(profile['posts'], limit)})
     else:
         return jsonify({'error': 'User not found'}), 404
 
@@ -835,9 +1217,12 @@ def classify_text():
                 error="Text field is required"
             ).dict()), 400
         
+        warming = model_warming_response('nli')
+        if warming:
+            return warming
+        
         text = data['text']
-        urgency = classify_urgency(text)
-        flood_type = classify_flood_type(text)
+        urgency, flood_type = classify_text_report(text)
         
         return jsonify(APIResponse(
             status="success",
@@ -848,6 +1233,8 @@ def classify_text():
             }
         ).model_dump())
         
+    except ModelWarming:
+        return warming_response('nli')
     except Exception as e:
         logger.error(f"Text classification error: {str(e)}")
         return jsonify(APIResponse(
@@ -872,12 +1259,18 @@ def classify_image():
                 error="Image file not found"
             ).dict()), 404
         
+        warming = model_warming_response('clip')
+        if warming:
+            return warming
+        
         result = classify_flood_image(image_path)
         return jsonify(APIResponse(
             status="success",
             data=result.model_dump()
         ).model_dump())
         
+    except ModelWarming:
+        return warming_response('clip')
     except Exception as e:
         logger.error(f"Image classification error: {str(e)}")
         return jsonify(APIResponse(
@@ -885,6 +1278,46 @@ def classify_image():
             error=str(e)
         ).dict()), 500
 
+@app.route('/api/metrics/inference', methods=['GET'])
+def inference_metrics():
+    """Queue depth, batch size and latency stats of the inference batchers, cache hit rates and upload dedupe counts."""
+    return jsonify({
+        'text': text_batcher.metrics() if text_batcher else None,
+        'image': image_batcher.metrics() if image_batcher else None,
+        'cache': inference_cache.stats(),
+        'uploads': upload_processor.stats()
+    })
+
+@app.route('/api/metrics/models', methods=['GET'])
+def model_metrics():
+    """Load time and memory footprint of every registered model."""
+    return jsonify({'models': model_registry.stats()})
+
+@app.route('/api/metrics/streams', methods=['GET'])
+def stream_metrics():
+    """Subscriber, published and dropped event counts per SSE channel."""
+    return jsonify({
+        'backend': EVENT_BACKEND,
+        'transport': event_hub.transport.stats() if event_hub.transport else None,
+        'channels': event_hub.stats(),
+        'async_subscribers': stream_app.broadcaster.count()
+    })
+
+@app.route('/api/metrics/geocoding', methods=['GET'])
+def geocoding_metrics():
+    """Cache hits, coalesced lookups, provider calls and gazetteer fallbacks of the reverse geocoder."""
+    return jsonify(geocoder.stats())
+
+@app.route('/api/metrics/summaries', methods=['GET'])
+def summary_metrics():
+    """Provider wins and errors, hedged and coalesced requests, template fallbacks and latency of summaries."""
+    return jsonify(summary_service.stats())
+
+@app.route('/api/metrics/auth', methods=['GET'])
+def auth_metrics():
+    """Hit rates of the token and user caches."""
+    return jsonify(authenticator.stats())
+
 @app.route('/api/test', methods=['GET'])
 def test_route():
     return jsonify(APIResponse(
@@ -893,6 +1326,25 @@ def test_route():
         data={"timestamp": datetime.now().isoformat()}
     ).model_dump())
 
+STREAM_ROUTES = {
+    '/api/auth/authority/hotspots/stream': StreamRoute(
+        'hotspots', 'authority',
+        database.get_reports_for_map,
+        database.get_reports_updated_since
+    ),
+    '/api/posts/stream': StreamRoute(
+        'posts', None,
+        latest_posts,
+        database.get_posts_since
+    )
+}
+
+# ASGI app serving the SSE endpoints from coroutines; started next to Flask when STREAM_SERVER_PORT is set.
+stream_app = create_stream_app(
+    event_hub, STREAM_ROUTES, authenticator.authenticate_query, parse_timestamp_arg,
+    allowed_origins=CORS_ORIGINS, buffer_size=SSE_BUFFER_SIZE, keepalive_seconds=SSE_KEEPALIVE_SECONDS
+)
+
 if __name__ == '__main__':
     logger.info("Initializing BlueSignal backend...")
     database.init_db()
@@ -901,18 +1353,30 @@ if __name__ == '__main__':
     if not initialize_models():
         logger.error("Failed to initialize models. Exiting...")
         exit(1)
+    if MODEL_LOADING != 'eager':
+        logger.info("Models are loading in the background; see /api/ready")
     
     logger.info("Available endpoints:")
     logger.info("- POST /api/auth/register - User registration")
     logger.info("- POST /api/auth/login - User login")
     logger.info("- POST /api/auth/citizen/posts - Create citizen post")
+    logger.info("- GET /api/jobs/<job_id> - Post processing job status")
     logger.info("- GET /api/auth/citizen/posts - Get citizen posts")
     logger.info("- GET /api/auth/authority/hotspots - Get flood hotspots")
+    logger.info("- GET /api/auth/authority/hotspots/clusters - Clustered hotspots by zoom level")
     logger.info("- GET /api/auth/authority/reports - Get all reports")
     logger.info("- POST /api/classify/text - Text classification")
     logger.info("- POST /api/classify/image - Image classification")
+    logger.info("- GET /api/metrics/inference - Inference batching metrics")
     logger.info("- GET /api/health - Health check")
+    logger.info("- GET /api/ready - Readiness (models loaded)")
     logger.info("- GET /api/test - Test endpoint")
     
+    # debug=True runs this module twice: a reloader parent that only watches files and the
+    # child that serves requests. Events are published in the child, so the streams must be
+    # served from there; the parent binding the port would only ever send snapshots.
+    if STREAM_SERVER_PORT and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_in_background(stream_app, STREAM_SERVER_HOST, STREAM_SERVER_PORT)
+    
     logger.info("Starting Flask server on http://127.0.0.1:5000")
     app.run(host='127.0.0.1', port=5000, debug=True)
\ No newline at end of file
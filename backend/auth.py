@@ -0,0 +1,144 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import jwt
+
+logger = logging.getLogger(__name__)
+
+AuthResult = Tuple[Optional[Dict], Optional[Tuple[str, int]]]
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries also expire after a per-entry deadline."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None):
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+class Authenticator:
+    """Resolves JWTs to user records, caching both the decoded claims and the users.
+
+    Decoded tokens are kept until their own ``exp`` (capped at ``ttl_seconds``)
+    and users for ``ttl_seconds``, so repeat requests with the same token cost
+    no database round trip. Call ``invalidate_user`` whenever a user changes.
+    """
+
+    def __init__(self, secret_key: str, user_loader: Callable[[str], Optional[Dict]],
+                 ttl_seconds: float = 60, max_entries: int = 10000, algorithms=('HS256',)):
+        self.secret_key = secret_key
+        self.user_loader = user_loader
+        self.algorithms = list(algorithms)
+        self.tokens = TTLCache(max_entries, ttl_seconds)
+        self.users = TTLCache(max_entries, ttl_seconds)
+
+    def decode(self, token: str) -> Dict:
+        """Claims of ``token``; raises ``jwt.InvalidTokenError`` when it is invalid or expired."""
+        claims = self.tokens.get(token)
+        if claims is None:
+            claims = jwt.decode(token, self.secret_key, algorithms=self.algorithms)
+            expires_in = claims['exp'] - time.time() if 'exp' in claims else None
+            self.tokens.put(token, claims, expires_in)
+        return claims
+
+    def get_user(self, username: str) -> Optional[Dict]:
+        user = self.users.get(username)
+        if user is None:
+            user = self.user_loader(username)
+            if user is None:
+                return None
+            self.users.put(username, user)
+        return dict(user)
+
+    def cache_user(self, user: Dict):
+        """Prime the cache with a user record just read from the database (e.g. at login)."""
+        self.users.put(user['username'], dict(user))
+
+    def invalidate_user(self, username: Optional[str] = None):
+        """Drop one cached user, or every cached user when ``username`` is None."""
+        if username is None:
+            self.users.clear()
+        else:
+            self.users.pop(username)
+
+    def authenticate(self, token: Optional[str], role: Optional[str] = None,
+                     missing_user: Tuple[str, int] = ('User not found', 401)) -> AuthResult:
+        """Returns ``(user, None)`` or ``(None, (error, status))``."""
+        if not token:
+            return None, ('No token provided', 401)
+        try:
+            claims = self.decode(token)
+            user = self.get_user(claims['username'])
+        except Exception:
+            return None, ('Invalid token', 401)
+        if not user:
+            return None, missing_user
+        if role and user['role'] != role:
+            return None, ('Unauthorized', 403)
+        return user, None
+
+    def authenticate_header(self, header: Optional[str], role: Optional[str] = None) -> AuthResult:
+        """Like ``authenticate`` for an ``Authorization: Bearer <token>`` header."""
+        if not header:
+            return None, ('No token provided', 401)
+        parts = header.split(' ')
+        if len(parts) < 2:
+            return None, ('Invalid token', 401)
+        return self.authenticate(parts[1], role)
+
+    def authenticate_query(self, token: Optional[str], role: Optional[str] = None) -> AuthResult:
+        """Like ``authenticate`` for a ``?token=`` query param (SSE and export links).
+
+        These endpoints answer 403 rather than 401 when the token's user no longer exists.
+        """
+        return self.authenticate(token, role, missing_user=('Unauthorized', 403))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {'tokens': self.tokens.stats(), 'users': self.users.stats()}
@@ -0,0 +1,159 @@
+import math
+import threading
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Web-map tiles are 256px wide and span 360 / 2**zoom degrees of longitude.
+TILE_PIXELS = 256
+
+
+class _Cell:
+    __slots__ = ('count', 'sum_lat', 'sum_lng', 'min_lat', 'max_lat', 'min_lng', 'max_lng',
+                 'urgency', 'flood_type', 'latest')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_lat = 0.0
+        self.sum_lng = 0.0
+        self.min_lat = self.min_lng = math.inf
+        self.max_lat = self.max_lng = -math.inf
+        self.urgency: Counter = Counter()
+        self.flood_type: Counter = Counter()
+        self.latest: Optional[Dict] = None
+
+    def add(self, report: Dict, lat: float, lng: float):
+        self.count += 1
+        self.sum_lat += lat
+        self.sum_lng += lng
+        self.min_lat = min(self.min_lat, lat)
+        self.max_lat = max(self.max_lat, lat)
+        self.min_lng = min(self.min_lng, lng)
+        self.max_lng = max(self.max_lng, lng)
+        self.urgency[report.get('urgency_level') or 'Unknown'] += 1
+        self.flood_type[report.get('flood_type') or 'Unknown'] += 1
+        if self.latest is None or (report.get('created_at') or '') >= (self.latest.get('created_at') or ''):
+            self.latest = report
+
+
+class HotspotClusterIndex:
+    """Grid clustering of map reports for every zoom level, maintained incrementally.
+
+    Each zoom level buckets reports into square cells of ``cell_pixels`` screen
+    pixels. Adding a report updates one cell per zoom level, so clusters never
+    need to be recomputed from scratch.
+    """
+
+    def __init__(self, min_zoom: int = 0, max_zoom: int = 18, cell_pixels: int = 64):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.cell_pixels = cell_pixels
+        self._cells: Dict[int, Dict[Tuple[int, int], _Cell]] = {z: {} for z in range(min_zoom, max_zoom + 1)}
+        self._report_ids = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+
+    def cell_size(self, zoom: int) -> float:
+        return 360.0 / (2 ** zoom) * self.cell_pixels / TILE_PIXELS
+
+    def _clamp_zoom(self, zoom: int) -> int:
+        return max(self.min_zoom, min(self.max_zoom, zoom))
+
+    def add(self, report: Dict) -> bool:
+        """Add one report; returns False for duplicates and reports without coordinates."""
+        lat, lng = report.get('latitude'), report.get('longitude')
+        if lat is None or lng is None:
+            return False
+        lat, lng = float(lat), float(lng)
+        with self._lock:
+            report_id = report.get('id')
+            if report_id is not None:
+                if report_id in self._report_ids:
+                    return False
+                self._report_ids.add(report_id)
+            for zoom, cells in self._cells.items():
+                size = self.cell_size(zoom)
+                key = (math.floor(lng / size), math.floor(lat / size))
+                cell = cells.get(key)
+                if cell is None:
+                    cell = cells[key] = _Cell()
+                cell.add(report, lat, lng)
+        return True
+
+    def refresh(self, report: Dict) -> bool:
+        """Swap in a newer copy of an already indexed report; returns False if it is not indexed."""
+        lat, lng = report.get('latitude'), report.get('longitude')
+        report_id = report.get('id')
+        if lat is None or lng is None or report_id is None:
+            return False
+        lat, lng = float(lat), float(lng)
+        with self._lock:
+            if report_id not in self._report_ids:
+                return False
+            for zoom, cells in self._cells.items():
+                size = self.cell_size(zoom)
+                cell = cells.get((math.floor(lng / size), math.floor(lat / size)))
+                if cell is not None and cell.latest is not None and cell.latest.get('id') == report_id:
+                    cell.latest = report
+        return True
+
+    def ensure_loaded(self, loader: Callable[[], Iterable[Dict]]):
+        """Populate the index from ``loader()`` the first time it is needed."""
+        if self._loaded:
+            return
+        # Callers wait for the first load; add() stays available meanwhile and skips duplicates.
+        with self._load_lock:
+            if self._loaded:
+                return
+            for report in loader():
+                self.add(report)
+            self._loaded = True
+
+    def clusters(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None) -> List[Dict]:
+        """Clusters at ``zoom``, optionally limited to bbox=(min_lng, min_lat, max_lng, max_lat)."""
+        zoom = self._clamp_zoom(zoom)
+        size = self.cell_size(zoom)
+        with self._lock:
+            cells = self._cells[zoom]
+            if bbox:
+                min_lng, min_lat, max_lng, max_lat = bbox
+                x0, x1 = math.floor(min_lng / size), math.floor(max_lng / size)
+                y0, y1 = math.floor(min_lat / size), math.floor(max_lat / size)
+                if (x1 - x0 + 1) * (y1 - y0 + 1) < len(cells):
+                    keys = [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) in cells]
+                else:
+                    keys = [k for k in cells if x0 <= k[0] <= x1 and y0 <= k[1] <= y1]
+            else:
+                keys = list(cells)
+            return [self._serialize(zoom, key, cells[key]) for key in keys]
+
+    @staticmethod
+    def _serialize(zoom: int, key: Tuple[int, int], cell: _Cell) -> Dict:
+        return {
+            'id': f"{zoom}/{key[0]}/{key[1]}",
+            'count': cell.count,
+            'latitude': round(cell.sum_lat / cell.count, 6),
+            'longitude': round(cell.sum_lng / cell.count, 6),
+            'bbox': [cell.min_lng, cell.min_lat, cell.max_lng, cell.max_lat],
+            'urgency_level': cell.urgency.most_common(1)[0][0],
+            'flood_type': cell.flood_type.most_common(1)[0][0],
+            'urgency_counts': dict(cell.urgency),
+            'flood_type_counts': dict(cell.flood_type),
+            'report': cell.latest if cell.count == 1 else None
+        }
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'reports': len(self._report_ids),
+                'cells': {zoom: len(cells) for zoom, cells in self._cells.items()}
+            }
+
+
+def cluster_reports(reports: Iterable[Dict], zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None,
+                    cell_pixels: int = 64) -> List[Dict]:
+    """One-off clusters of ``reports`` at ``zoom``, for report sets the shared index does not keep (e.g. a time window)."""
+    index = HotspotClusterIndex(min_zoom=zoom, max_zoom=zoom, cell_pixels=cell_pixels)
+    for report in reports:
+        index.add(report)
+    return index.clusters(zoom, bbox)
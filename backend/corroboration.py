@@ -0,0 +1,295 @@
+import math
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+RELATED_FLOOD_TYPES = {
+    'Urban Flooding': ['Street Flooding', 'Drainage Failure', 'Heavy Rain Accumulation'],
+    'Street Flooding': ['Urban Flooding', 'Drainage Failure', 'Heavy Rain Accumulation'],
+    'River Overflow': ['Flash Flood', 'Heavy Rain Accumulation'],
+    'Flash Flood': ['River Overflow', 'Heavy Rain Accumulation']
+}
+
+# Keyword concepts; a token belongs to a concept when it starts with one of its stems.
+KEYWORD_CONCEPTS = {
+    'flood': ('flood', 'water', 'inundat', 'submerg', 'overflow'),
+    'street': ('street', 'road', 'sidewalk', 'pavement', 'highway'),
+    'building': ('building', 'house', 'shop', 'office', 'structure')
+}
+
+URGENT_LEVELS = ('Urgent Panic', 'Alert Caution')
+
+STOPWORDS = frozenset(
+    'the and for are but not you all any can her was one our out has have had this that with from they will '
+    'been were what when your into near over very just there their them then than also some more such'.split()
+)
+
+KM_PER_DEGREE = 111.32
+
+# Weights of the score components; each component is in [0, 1].
+WEIGHTS = {'flood_type': 0.3, 'keywords': 0.3, 'distance': 0.2, 'recency': 0.1, 'urgency': 0.1}
+
+
+def related_flood_types(flood_type: Optional[str]) -> Set[str]:
+    related = set(RELATED_FLOOD_TYPES.get(flood_type, ()))
+    related.update(t for t, others in RELATED_FLOOD_TYPES.items() if flood_type in others)
+    return related
+
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    return {t for t in re.findall(r'[a-z]+', (text or '').lower()) if len(t) > 2 and t not in STOPWORDS}
+
+
+def concepts(tokens: Iterable[str]) -> Set[str]:
+    found = set()
+    for token in tokens:
+        for concept, stems in KEYWORD_CONCEPTS.items():
+            if token.startswith(stems):
+                found.add(concept)
+    return found
+
+
+def to_epoch(value) -> Optional[float]:
+    """Epoch seconds from a number, datetime, ISO-8601 or SQLite 'YYYY-MM-DD HH:MM:SS' (UTC) string."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+class Item:
+    """A citizen report or social post prepared for matching."""
+
+    __slots__ = ('key', 'kind', 'record_id', 'text', 'latitude', 'longitude', 'timestamp',
+                 'flood_type', 'urgency', 'tokens', 'concepts', 'places')
+
+    def __init__(self, kind: str, record_id, text: str, latitude=None, longitude=None, timestamp=None,
+                 flood_type: Optional[str] = None, urgency: Optional[str] = None, location_name: Optional[str] = None):
+        self.key = (kind, record_id)
+        self.kind = kind
+        self.record_id = record_id
+        self.text = text or ''
+        self.latitude = float(latitude) if latitude is not None else None
+        self.longitude = float(longitude) if longitude is not None else None
+        self.timestamp = to_epoch(timestamp) or time.time()
+        self.flood_type = flood_type
+        self.urgency = urgency
+        self.tokens = tokenize(text)
+        self.concepts = concepts(self.tokens)
+        self.places = tokenize(location_name)
+
+    @property
+    def located(self) -> bool:
+        return self.latitude is not None and self.longitude is not None
+
+    @classmethod
+    def from_report(cls, report: Dict) -> 'Item':
+        return cls('report', report.get('id'), f"{report.get('title') or ''} {report.get('description') or ''}",
+                   report.get('latitude'), report.get('longitude'), report.get('created_at'),
+                   report.get('flood_type'), report.get('urgency_level'), report.get('location_name'))
+
+    @classmethod
+    def from_social_post(cls, post: Dict) -> 'Item':
+        return cls('social', post.get('content_hash') or post.get('id'), post.get('text'),
+                   post.get('latitude'), post.get('longitude'), post.get('posted_at') or post.get('date'),
+                   post.get('flood_type'), post.get('urgency_level'), post.get('location_name') or post.get('location'))
+
+    def to_dict(self) -> Dict:
+        return {
+            'kind': self.kind,
+            'id': self.record_id,
+            'text': self.text.strip(),
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'timestamp': self.timestamp,
+            'flood_type': self.flood_type,
+            'urgency_level': self.urgency
+        }
+
+
+def score_pair(query: Item, candidate: Item, radius_km: float, window_seconds: float,
+               urgent_levels: Iterable[str] = URGENT_LEVELS) -> Tuple[float, Dict[str, float], bool]:
+    """Score how well ``candidate`` corroborates ``query``.
+
+    Returns ``(score, components, corroborates)``. ``corroborates`` keeps the rule
+    of the old pairwise check: matching flood type or shared keyword concepts,
+    and both items urgent.
+    """
+    if query.flood_type and query.flood_type == candidate.flood_type:
+        type_score = 1.0
+    elif candidate.flood_type in related_flood_types(query.flood_type):
+        type_score = 0.6
+    else:
+        type_score = 0.0
+
+    union = query.tokens | candidate.tokens
+    overlap = len(query.tokens & candidate.tokens) / len(union) if union else 0.0
+    shared_concepts = query.concepts & candidate.concepts
+    keyword_score = min(1.0, 0.5 * len(shared_concepts) / max(1, len(query.concepts)) + overlap)
+
+    if query.located and candidate.located:
+        distance = haversine_km(query.latitude, query.longitude, candidate.latitude, candidate.longitude)
+        distance_score = max(0.0, 1.0 - distance / radius_km)
+    else:
+        distance_score = 0.5 if query.places & candidate.places else 0.0
+
+    recency_score = max(0.0, 1.0 - abs(query.timestamp - candidate.timestamp) / window_seconds)
+    urgent = query.urgency in urgent_levels and candidate.urgency in urgent_levels
+
+    components = {
+        'flood_type': type_score,
+        'keywords': round(keyword_score, 3),
+        'distance': round(distance_score, 3),
+        'recency': round(recency_score, 3),
+        'urgency': 1.0 if urgent else 0.0
+    }
+    score = sum(WEIGHTS[name] * value for name, value in components.items())
+    return round(score, 4), components, bool((type_score or shared_concepts) and urgent)
+
+
+class CorroborationIndex:
+    """Finds recent reports and social posts that corroborate a new report.
+
+    Items are bucketed by time and, when they have coordinates, by a lat/lng
+    grid; an inverted index maps (place-name token, keyword concept, time
+    bucket) to items so posts that only name a location can still be matched.
+    A query only touches the buckets inside its space/time window plus the
+    postings of its own keywords, so its cost depends on the local density of
+    items rather than the total number indexed.
+    """
+
+    def __init__(self, radius_km: float = 2.0, window_hours: float = 6.0, retention_hours: float = 48.0,
+                 urgent_levels: Iterable[str] = URGENT_LEVELS):
+        self.radius_km = radius_km
+        self.window_seconds = window_hours * 3600
+        self.retention_seconds = retention_hours * 3600
+        self.bucket_seconds = self.window_seconds
+        self.cell_degrees = radius_km / KM_PER_DEGREE
+        self.urgent_levels = tuple(urgent_levels)
+        self._items: Dict[Tuple, Item] = {}
+        self._buckets: Dict[int, Set[Tuple]] = {}
+        self._cells: Dict[Tuple[int, int, int], Set[Tuple]] = {}
+        self._terms: Dict[Tuple[str, int], Set[Tuple]] = {}
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    @staticmethod
+    def _terms_of(item: Item) -> Set[str]:
+        # Place-name token + keyword concept pairs: how items without coordinates are found.
+        return {f"{place}:{concept}" for place in item.places for concept in item.concepts}
+
+    def add(self, item: Item) -> bool:
+        """Index ``item``; returns False when it is already indexed or too old to keep."""
+        if item.timestamp < time.time() - self.retention_seconds:
+            return False
+        with self._lock:
+            if item.key in self._items:
+                return False
+            self._items[item.key] = item
+            bucket = self._bucket(item.timestamp)
+            self._buckets.setdefault(bucket, set()).add(item.key)
+            if item.located:
+                self._cells.setdefault((*self._cell(item.latitude, item.longitude), bucket), set()).add(item.key)
+            for term in self._terms_of(item):
+                self._terms.setdefault((term, bucket), set()).add(item.key)
+            self._evict()
+        return True
+
+    def _evict(self):
+        cutoff = self._bucket(time.time() - self.retention_seconds)
+        for bucket in [b for b in self._buckets if b < cutoff]:
+            for key in self._buckets.pop(bucket):
+                item = self._items.pop(key)
+                if item.located:
+                    cell = (*self._cell(item.latitude, item.longitude), bucket)
+                    self._cells.get(cell, set()).discard(key)
+                    if not self._cells.get(cell):
+                        self._cells.pop(cell, None)
+                for term in self._terms_of(item):
+                    postings = self._terms.get((term, bucket))
+                    if postings is not None:
+                        postings.discard(key)
+                        if not postings:
+                            del self._terms[(term, bucket)]
+
+    def ensure_loaded(self, loader: Callable[[float], Iterable[Item]]):
+        """Populate from ``loader(since_epoch)`` the first time the index is used."""
+        if self._loaded:
+            return
+        # Callers wait for the first load; add() stays available meanwhile and skips duplicates.
+        with self._load_lock:
+            if self._loaded:
+                return
+            for item in loader(time.time() - self.retention_seconds):
+                self.add(item)
+            self._loaded = True
+
+    def _candidates(self, query: Item) -> Set[Tuple]:
+        first = self._bucket(query.timestamp - self.window_seconds)
+        last = self._bucket(query.timestamp + self.window_seconds)
+        keys: Set[Tuple] = set()
+        if query.located:
+            row, col = self._cell(query.latitude, query.longitude)
+            # Longitude cells shrink towards the poles; widen the column range to still cover the radius.
+            cols = math.ceil(1 / max(0.01, math.cos(math.radians(query.latitude))))
+            for bucket in range(first, last + 1):
+                for r in range(row - 1, row + 2):
+                    for c in range(col - cols, col + cols + 1):
+                        keys.update(self._cells.get((r, c, bucket), ()))
+        for term in self._terms_of(query):
+            for bucket in range(first, last + 1):
+                keys.update(self._terms.get((term, bucket), ()))
+        keys.discard(query.key)
+        return keys
+
+    def corroborate(self, query: Item, top_k: int = 10, min_score: float = 0.3) -> List[Dict]:
+        """Best-scoring items within the radius and time window of ``query``, best first."""
+        with self._lock:
+            candidates = [self._items[key] for key in self._candidates(query)]
+        matches = []
+        for candidate in candidates:
+            if query.located and candidate.located and \
+                    haversine_km(query.latitude, query.longitude, candidate.latitude, candidate.longitude) > self.radius_km:
+                continue
+            if abs(query.timestamp - candidate.timestamp) > self.window_seconds:
+                continue
+            score, components, corroborates = score_pair(
+                query, candidate, self.radius_km, self.window_seconds, self.urgent_levels
+            )
+            if score >= min_score:
+                matches.append(dict(candidate.to_dict(), score=score, components=components, corroborates=corroborates))
+        matches.sort(key=lambda match: match['score'], reverse=True)
+        return matches[:top_k]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'items': len(self._items),
+                'time_buckets': len(self._buckets),
+                'cells': len(self._cells),
+                'terms': len(self._terms)
+            }
@@ -1,18 +1,433 @@
 import sqlite3
 import json
 import logging
+import base64
+import os
+import queue
+import threading
 
 logger = logging.getLogger(__name__)
 
+DB_PATH = os.getenv('BLUESIGNAL_DB', 'bluesignal.db')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+JOB_RETENTION_HOURS = float(os.getenv('JOB_RETENTION_HOURS', '24'))
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+CONNECTION_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-16000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+    f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}'
+)
+
+class PooledConnection:
+    """Proxy around a pooled sqlite3 connection; close() hands it back to the pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self._conn.commit()
+        else:
+            self._conn.rollback()
+        return False
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(conn)
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """Fixed-size pool of tuned SQLite connections shared by all request threads.
+
+    Connections are created lazily up to ``size`` and reused LIFO so the most
+    recently used (warmest) connection goes out first. Writes open with
+    ``BEGIN IMMEDIATE`` so concurrent writers queue on ``busy_timeout`` instead
+    of failing with "database is locked" when upgrading a read lock.
+    """
+
+    def __init__(self, path, size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT):
+        self.path = path
+        self.size = max(1, size)
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000.0,
+            isolation_level='IMMEDIATE',
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def acquire(self):
+        if os.getpid() != self._pid:
+            self._reset_after_fork()
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = None
+            with self._lock:
+                if self._created < self.size:
+                    self._created += 1
+                    create = True
+                else:
+                    create = False
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError(f'Connection pool exhausted ({self.size} connections in use)')
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        if os.getpid() != self._pid:
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logger.warning(f"Discarding broken pooled connection: {e}")
+            with self._lock:
+                self._created -= 1
+            return
+        self._idle.put(conn)
+
+    def _reset_after_fork(self):
+        # Connections must not cross a fork; start a fresh pool in the child.
+        with self._lock:
+            self._idle = queue.LifoQueue()
+            self._created = 0
+            self._pid = os.getpid()
+
+    def close_all(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._created -= 1
+
+    def stats(self):
+        with self._lock:
+            return {'size': self.size, 'created': self._created, 'idle': self._idle.qsize()}
+
+_pool = ConnectionPool(DB_PATH)
+
 def get_connection():
-    conn = sqlite3.connect('bluesignal.db', check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+    return _pool.acquire()
 
-def init_db():
-    conn = get_connection()
-    cursor = conn.cursor()
-    
+def pool_stats():
+    return _pool.stats()
+
+# Feed and profile queries are keyset-paginated on (created_at, id): params end
+# with the cursor's (created_at, id) and a LIMIT, where -1 means no limit.
+FEED_QUERY = '''
+    SELECT p.*, u.username, u.authenticity_score
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    WHERE (p.created_at, p.id) < (?, ?)
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT ?
+'''
+
+USER_POSTS_QUERY = '''
+    SELECT p.*, u.username FROM posts p
+    JOIN users u ON p.user_id = u.id
+    WHERE p.user_id = ? AND (p.created_at, p.id) < (?, ?)
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT ?
+'''
+
+PROFILE_POSTS_QUERY = '''
+    SELECT p.*
+    FROM posts p
+    WHERE p.user_id = ? AND (p.created_at, p.id) < (?, ?)
+    ORDER BY p.created_at DESC, p.id DESC
+    LIMIT ?
+'''
+
+REPORTS_QUERY = '''
+    SELECT r.*, p.title, p.description, p.media_url, p.status, u.username
+    FROM reports r
+    JOIN posts p ON r.post_id = p.id
+    JOIN users u ON r.user_id = u.id
+    ORDER BY r.created_at DESC
+'''
+
+POSTS_SINCE_QUERY = '''
+    SELECT p.*, u.username, u.authenticity_score
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    WHERE p.updated_at >= ?
+    ORDER BY p.updated_at DESC, p.id DESC
+'''
+
+RTREE_BBOX_WHERE = '''g.max_lat >= ? AND g.min_lat <= ? AND g.max_lng >= ? AND g.min_lng <= ?
+      AND r.latitude BETWEEN ? AND ? AND r.longitude BETWEEN ? AND ?'''
+
+# Margin around a viewport for the rtree prefilter; float32 rounding at 180 degrees is ~1.5e-5.
+RTREE_MARGIN_DEGREES = 1e-4
+
+def _bbox_params(bbox):
+    """RTREE_BBOX_WHERE params for bbox=(min_lng, min_lat, max_lng, max_lat)."""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    m = RTREE_MARGIN_DEGREES
+    return (min_lat - m, max_lat + m, min_lng - m, max_lng + m, min_lat, max_lat, min_lng, max_lng)
+
+MAP_COLUMNS = '''
+    r.id,
+    r.post_id,
+    p.title,
+    p.description,
+    r.urgency_level,
+    r.flood_type,
+    r.verified,
+    r.ai_summary,
+    r.latitude,
+    r.longitude,
+    r.location_name,
+    r.created_at,
+    p.status
+'''
+
+# Map queries take (since, until, limit); the bbox variant is prefixed with the
+# _bbox_params() of the viewport and is driven by the reports_rtree index
+# (CROSS JOIN pins the join order so the planner cannot start from created_at).
+# The rtree stores 32-bit floats, so it is only a coarse prefilter on widened
+# bounds; the exact coordinates on reports decide.
+MAP_QUERY = f'''
+    SELECT {MAP_COLUMNS}
+    FROM reports r
+    JOIN posts p ON r.post_id = p.id
+    WHERE r.created_at >= ? AND r.created_at <= ?
+    ORDER BY r.created_at DESC
+    LIMIT ?
+'''
+
+MAP_BBOX_QUERY = f'''
+    SELECT {MAP_COLUMNS}
+    FROM reports_rtree g
+    CROSS JOIN reports r ON r.id = g.id
+    JOIN posts p ON r.post_id = p.id
+    WHERE {RTREE_BBOX_WHERE}
+      AND r.created_at >= ? AND r.created_at <= ?
+    ORDER BY r.created_at DESC
+    LIMIT ?
+'''
+
+# Hotspot deltas: reports created or changed (summary refined, post status) since a time.
+MAP_UPDATED_QUERY = f'''
+    SELECT {MAP_COLUMNS}
+    FROM reports r
+    JOIN posts p ON r.post_id = p.id
+    WHERE r.updated_at >= ?
+    ORDER BY r.updated_at DESC, r.id DESC
+'''
+
+ALL_TIME = ('0000-00-00 00:00:00', '9999-12-31 23:59:59')
+
+# Hot read paths checked by check_query_plans(): name -> (sql, sample params).
+FIRST_PAGE = ('9999-12-31 23:59:59', 2 ** 63 - 1)
+
+HOT_QUERIES = {
+    'feed': (FEED_QUERY, (*FIRST_PAGE, DEFAULT_PAGE_SIZE)),
+    'user_posts': (USER_POSTS_QUERY, (1, *FIRST_PAGE, DEFAULT_PAGE_SIZE)),
+    'profile_posts': (PROFILE_POSTS_QUERY, (1, *FIRST_PAGE, DEFAULT_PAGE_SIZE)),
+    'posts_since': (POSTS_SINCE_QUERY, ('2024-01-01 00:00:00',)),
+    'reports': (REPORTS_QUERY, ()),
+    'map': (MAP_QUERY, (*ALL_TIME, -1)),
+    'map_bbox': (MAP_BBOX_QUERY, (*_bbox_params((72.7, 18.9, 73.1, 19.3)), *ALL_TIME, -1)),
+    'map_updated': (MAP_UPDATED_QUERY, ('2024-01-01 00:00:00',))
+}
+
+# Queries whose result set is already narrowed by an index before sorting.
+SORTED_SUBSET_QUERIES = ('map_bbox',)
+
+# Tables that must never be read with a full scan on a hot path.
+INDEXED_TABLES = ('posts', 'reports', 'votes')
+
+# Ordered schema migrations: (version, description, steps). A step is either a
+# SQL string or a callable taking the cursor. Each version runs in one transaction.
+SCHEMA_MIGRATIONS = [
+    (1, 'Indexes for feed, profile, vote and map queries', [
+        'CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_posts_user_created ON posts (user_id, created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports (created_at)',
+        'CREATE INDEX IF NOT EXISTS idx_reports_post_id ON reports (post_id)',
+        'CREATE INDEX IF NOT EXISTS idx_votes_post_type ON votes (post_id, vote_type)'
+    ]),
+    (2, 'Denormalized vote counters on posts', [
+        lambda cursor: _add_vote_counter_columns(cursor),
+        lambda cursor: backfill_vote_counters(cursor)
+    ]),
+    (3, 'R*Tree spatial index over report coordinates', [
+        'CREATE VIRTUAL TABLE IF NOT EXISTS reports_rtree USING rtree(id, min_lat, max_lat, min_lng, max_lng)',
+        '''INSERT OR REPLACE INTO reports_rtree (id, min_lat, max_lat, min_lng, max_lng)
+           SELECT id, latitude, latitude, longitude, longitude FROM reports
+           WHERE latitude IS NOT NULL AND longitude IS NOT NULL'''
+    ]),
+    (4, 'Classified social media posts from bulk ingestion', [
+        '''CREATE TABLE IF NOT EXISTS social_posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content_hash TEXT NOT NULL UNIQUE,
+            author TEXT,
+            text TEXT NOT NULL,
+            location_name TEXT,
+            media_urls TEXT,
+            posted_at TIMESTAMP,
+            urgency_level TEXT,
+            flood_type TEXT,
+            confidence_score REAL,
+            source TEXT,
+            ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_social_posts_posted_at ON social_posts (posted_at)'
+    ]),
+    (5, 'Index social posts by ingestion time', [
+        'CREATE INDEX IF NOT EXISTS idx_social_posts_ingested_at ON social_posts (ingested_at)'
+    ]),
+    (6, 'Last-change time on posts and reports for stream deltas', [
+        lambda cursor: _add_updated_at_columns(cursor),
+        'UPDATE posts SET updated_at = created_at WHERE updated_at IS NULL',
+        'UPDATE reports SET updated_at = created_at WHERE updated_at IS NULL',
+        'CREATE INDEX IF NOT EXISTS idx_posts_updated_at ON posts (updated_at)',
+        'CREATE INDEX IF NOT EXISTS idx_reports_updated_at ON reports (updated_at)'
+    ]),
+    (7, 'Background job records shared by worker processes', [
+        '''CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            owner_id INTEGER,
+            status TEXT NOT NULL,
+            data TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_jobs_updated_at ON jobs (updated_at)'
+    ])
+]
+
+def get_schema_version(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    row = conn.execute('SELECT MAX(version) FROM schema_migrations').fetchone()
+    return row[0] or 0
+
+def run_migrations(conn=None):
+    """Apply every pending migration in SCHEMA_MIGRATIONS; returns the resulting version."""
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        current = get_schema_version(conn)
+        for version, description, steps in SCHEMA_MIGRATIONS:
+            if version <= current:
+                continue
+            cursor = conn.cursor()
+            try:
+                cursor.execute('BEGIN IMMEDIATE')
+                for step in steps:
+                    if callable(step):
+                        step(cursor)
+                    else:
+                        cursor.execute(step)
+                cursor.execute('INSERT INTO schema_migrations (version, description) VALUES (?, ?)',
+                               (version, description))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                logger.error(f"Schema migration {version} failed: {description}")
+                raise
+            current = version
+            logger.info(f"Applied schema migration {version}: {description}")
+        return current
+    finally:
+        if own:
+            conn.close()
+
+def explain_query_plan(sql, params=(), conn=None):
+    own = conn is None
+    if own:
+        conn = get_connection()
+    try:
+        rows = conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()
+        return [row['detail'] for row in rows]
+    finally:
+        if own:
+            conn.close()
+
+def _table_aliases(sql):
+    aliases = {}
+    tokens = sql.replace(',', ' ').split()
+    for i, token in enumerate(tokens[:-1]):
+        if token.upper() in ('FROM', 'JOIN') and tokens[i + 1] in INDEXED_TABLES:
+            table = tokens[i + 1]
+            aliases[table] = table
+            if i + 2 < len(tokens) and tokens[i + 2].upper() not in ('ON', 'WHERE', 'JOIN', 'LEFT', 'GROUP', 'ORDER', 'LIMIT'):
+                aliases[tokens[i + 2]] = table
+    return aliases
+
+def check_query_plans(conn=None):
+    """Return {query name: [plan lines]} for hot queries that full-scan an indexed table
+    or need a temporary B-tree to sort."""
+    regressions = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = explain_query_plan(sql, params, conn)
+        aliases = _table_aliases(sql)
+        bad = []
+        for detail in plan:
+            words = detail.split()
+            if len(words) >= 2 and words[0] == 'SCAN' and words[1] in aliases and 'INDEX' not in detail:
+                bad.append(detail)
+            elif detail.startswith('USE TEMP B-TREE FOR ORDER BY') and name not in SORTED_SUBSET_QUERIES:
+                bad.append(detail)
+        if bad:
+            regressions[name] = bad
+    return regressions
+
+def create_schema(cursor):
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -74,6 +489,12 @@ def init_db():
             UNIQUE(post_id, user_id)
         )
     ''')
+
+def init_db():
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    create_schema(cursor)
     
     import hashlib
     
@@ -113,6 +534,7 @@ def init_db():
         ''', (user_id, title, description, lat, lng, location, 'verified'))
     
     conn.commit()
+    run_migrations(conn)
     conn.close()
     logger.info("Database initialized with demo data")
 
@@ -146,8 +568,8 @@ def create_post(user_id, title, description, media_url, latitude, longitude, loc
     cursor = conn.cursor()
     try:
         cursor.execute('''
-            INSERT INTO posts (user_id, title, description, media_url, latitude, longitude, location_name)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO posts (user_id, title, description, media_url, latitude, longitude, location_name, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
         ''', (user_id, title, description, media_url, latitude, longitude, location_name))
         conn.commit()
         return cursor.lastrowid
@@ -160,45 +582,84 @@ def create_post(user_id, title, description, media_url, latitude, longitude, loc
 def update_post_status(post_id, status):
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('UPDATE posts SET status = ? WHERE id = ?', (status, post_id))
+    cursor.execute('UPDATE posts SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?', (status, post_id))
+    # The status is also a hotspot map column.
+    cursor.execute('UPDATE reports SET updated_at = CURRENT_TIMESTAMP WHERE post_id = ?', (post_id,))
     conn.commit()
     conn.close()
 
-def get_posts_by_user(user_id):
+def update_post_location(post_id, location_name):
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT p.*, u.username FROM posts p
-        JOIN users u ON p.user_id = u.id
-        WHERE p.user_id = ? ORDER BY p.created_at DESC
-    ''', (user_id,))
+    cursor.execute('UPDATE posts SET location_name = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?', (location_name, post_id))
+    conn.commit()
+    conn.close()
+
+def encode_cursor(row):
+    raw = json.dumps([row['created_at'], row['id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token):
+    """Turn a next_cursor token back into (created_at, id); raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        created_at, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(created_at, str) or not isinstance(row_id, int):
+        raise ValueError('Invalid cursor')
+    return created_at, row_id
+
+def next_cursor(rows, limit):
+    """Cursor for the page after ``rows``, or None when it was the last page."""
+    if not limit or len(rows) < limit:
+        return None
+    return encode_cursor(rows[-1])
+
+def _keyset_params(limit, after):
+    position = decode_cursor(after) if after else FIRST_PAGE
+    return (*position, limit if limit else -1)
+
+def get_posts_by_user(user_id, limit=None, after=None):
+    params = (user_id, *_keyset_params(limit, after))
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(USER_POSTS_QUERY, params)
     posts = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return posts
 
-def get_all_posts_with_votes():
+def get_all_posts_with_votes(limit=None, after=None):
+    params = _keyset_params(limit, after)
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT p.*, u.username, u.authenticity_score,
-               COALESCE(SUM(CASE WHEN v.vote_type = 'up' THEN 1 ELSE 0 END), 0) as upvotes,
-               COALESCE(SUM(CASE WHEN v.vote_type = 'down' THEN 1 ELSE 0 END), 0) as downvotes
-        FROM posts p
-        JOIN users u ON p.user_id = u.id
-        LEFT JOIN votes v ON p.id = v.post_id
-        GROUP BY p.id
-        ORDER BY p.created_at DESC
-    ''')
+    cursor.execute(FEED_QUERY, params)
+    posts = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return posts
+
+def get_posts_since(since):
+    """Feed rows created or changed at or after ``since`` ('YYYY-MM-DD HH:MM:SS' UTC), most recently changed first."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(POSTS_SINCE_QUERY, (since,))
     posts = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return posts
 
+def _vote_deltas(old_type, new_type):
+    up = (new_type == 'up') - (old_type == 'up')
+    down = (new_type == 'down') - (old_type == 'down')
+    return up, down
+
 def vote_post(post_id, user_id, vote_type):
     conn = get_connection()
     cursor = conn.cursor()
     try:
+        cursor.execute('BEGIN IMMEDIATE')
         cursor.execute('SELECT vote_type FROM votes WHERE post_id = ? AND user_id = ?', (post_id, user_id))
         existing_vote = cursor.fetchone()
+        old_type = existing_vote['vote_type'] if existing_vote else None
         
         if existing_vote:
             cursor.execute('UPDATE votes SET vote_type = ?, updated_at = CURRENT_TIMESTAMP WHERE post_id = ? AND user_id = ?', 
@@ -207,15 +668,87 @@ def vote_post(post_id, user_id, vote_type):
             cursor.execute('INSERT INTO votes (post_id, user_id, vote_type) VALUES (?, ?, ?)', 
                          (post_id, user_id, vote_type))
         
+        up, down = _vote_deltas(old_type, vote_type)
+        if up or down:
+            cursor.execute('''
+                UPDATE posts SET upvotes = upvotes + ?, downvotes = downvotes + ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (up, down, post_id))
+        
         conn.commit()
         return True
     except Exception as e:
+        conn.rollback()
         logger.error(f"Error voting on post: {e}")
         return False
     finally:
         conn.close()
 
-def get_user_profile(user_id):
+def backfill_vote_counters(cursor=None):
+    """Recompute posts.upvotes/downvotes from the votes table."""
+    own = cursor is None
+    if own:
+        conn = get_connection()
+        cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            UPDATE posts SET
+                upvotes = (SELECT COUNT(*) FROM votes v WHERE v.post_id = posts.id AND v.vote_type = 'up'),
+                downvotes = (SELECT COUNT(*) FROM votes v WHERE v.post_id = posts.id AND v.vote_type = 'down')
+        ''')
+        updated = cursor.rowcount
+        if own:
+            conn.commit()
+        return updated
+    finally:
+        if own:
+            conn.close()
+
+def check_vote_counters(fix=False):
+    """Compare the denormalized counters with the votes table.
+    
+    Returns the mismatching posts; with fix=True they are corrected in the same transaction.
+    """
+    conn = get_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('BEGIN IMMEDIATE' if fix else 'BEGIN')
+        cursor.execute('''
+            SELECT p.id as post_id, p.upvotes, p.downvotes,
+                   COALESCE(SUM(CASE WHEN v.vote_type = 'up' THEN 1 ELSE 0 END), 0) as actual_upvotes,
+                   COALESCE(SUM(CASE WHEN v.vote_type = 'down' THEN 1 ELSE 0 END), 0) as actual_downvotes
+            FROM posts p
+            LEFT JOIN votes v ON p.id = v.post_id
+            GROUP BY p.id
+            HAVING p.upvotes != actual_upvotes OR p.downvotes != actual_downvotes
+        ''')
+        mismatches = [dict(row) for row in cursor.fetchall()]
+        if fix:
+            cursor.executemany('UPDATE posts SET upvotes = ?, downvotes = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+                               [(m['actual_upvotes'], m['actual_downvotes'], m['post_id']) for m in mismatches])
+        conn.commit()
+        return mismatches
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+def _add_vote_counter_columns(cursor):
+    columns = {row[1] for row in cursor.execute('PRAGMA table_info(posts)').fetchall()}
+    for column in ('upvotes', 'downvotes'):
+        if column not in columns:
+            cursor.execute(f'ALTER TABLE posts ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0')
+
+def _add_updated_at_columns(cursor):
+    # ADD COLUMN cannot default to CURRENT_TIMESTAMP, so inserts set updated_at explicitly.
+    for table in ('posts', 'reports'):
+        columns = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})').fetchall()}
+        if 'updated_at' not in columns:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP')
+
+def get_user_profile(user_id, limit=None, after=None):
+    params = (user_id, *_keyset_params(limit, after))
     conn = get_connection()
     cursor = conn.cursor()
     cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
@@ -223,16 +756,7 @@ def get_user_profile(user_id):
     if user:
         user_dict = dict(user)
         
-        cursor.execute('''
-            SELECT p.*, 
-                   COALESCE(SUM(CASE WHEN v.vote_type = 'up' THEN 1 ELSE 0 END), 0) as upvotes,
-                   COALESCE(SUM(CASE WHEN v.vote_type = 'down' THEN 1 ELSE 0 END), 0) as downvotes
-            FROM posts p
-            LEFT JOIN votes v ON p.id = v.post_id
-            WHERE p.user_id = ?
-            GROUP BY p.id
-            ORDER BY p.created_at DESC
-        ''', (user_id,))
+        cursor.execute(PROFILE_POSTS_QUERY, params)
         posts = [dict(row) for row in cursor.fetchall()]
         user_dict['posts'] = posts
         
@@ -256,12 +780,19 @@ def create_report(post_id, user_id, urgency_level, flood_type, confidence_score,
     cursor = conn.cursor()
     try:
         cursor.execute('''
-            INSERT INTO reports (post_id, user_id, urgency_level, flood_type, confidence_score, verified, ai_summary, latitude, longitude, location_name)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO reports (post_id, user_id, urgency_level, flood_type, confidence_score, verified, ai_summary, latitude, longitude, location_name, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
         ''', (post_id, user_id, urgency_level, flood_type, confidence_score, verified, ai_summary, latitude, longitude, location_name))
+        report_id = cursor.lastrowid
+        if latitude is not None and longitude is not None:
+            cursor.execute('''
+                INSERT INTO reports_rtree (id, min_lat, max_lat, min_lng, max_lng)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (report_id, latitude, latitude, longitude, longitude))
         conn.commit()
-        return cursor.lastrowid
+        return report_id
     except Exception as e:
+        conn.rollback()
         logger.error(f"Error creating report: {e}")
         return None
     finally:
@@ -270,13 +801,7 @@ def create_report(post_id, user_id, urgency_level, flood_type, confidence_score,
 def get_all_reports():
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT r.*, p.title, p.description, p.media_url, p.status, u.username
-        FROM reports r
-        JOIN posts p ON r.post_id = p.id
-        JOIN users u ON r.user_id = u.id
-        ORDER BY r.created_at DESC
-    ''')
+    cursor.execute(REPORTS_QUERY)
     reports = [dict(row) for row in cursor.fetchall()]
     conn.close()
     return reports
@@ -292,27 +817,201 @@ def get_post_by_id(post_id):
     return None
 
 
-def get_reports_for_map():
+EXPORT_COLUMNS = (
+    'report_id', 'post_id', 'title', 'description', 'urgency_level', 'flood_type', 'confidence_score',
+    'verified', 'ai_summary', 'latitude', 'longitude', 'location_name', 'created_at'
+)
+
+def iter_reports_for_export(bbox=None, since=None, until=None, urgency=None, limit=None, chunk_size=1000):
+    """Yield report export rows (tuples in EXPORT_COLUMNS order) in chunks, oldest first.
+    
+    Rows are fetched from the open cursor chunk by chunk, so memory stays flat however
+    many reports match. The pooled connection is held until the generator is exhausted or closed.
+    """
+    where = ['r.created_at >= ?', 'r.created_at <= ?']
+    params = [since or ALL_TIME[0], until or ALL_TIME[1]]
+    source = 'reports r JOIN posts p ON r.post_id = p.id'
+    if bbox:
+        source = 'reports_rtree g CROSS JOIN reports r ON r.id = g.id JOIN posts p ON r.post_id = p.id'
+        where.insert(0, RTREE_BBOX_WHERE)
+        params[0:0] = _bbox_params(bbox)
+    if urgency:
+        where.append(f"r.urgency_level IN ({','.join('?' * len(urgency))})")
+        params.extend(urgency)
+    sql = f'''
+        SELECT r.id, r.post_id, p.title, p.description, r.urgency_level, r.flood_type, r.confidence_score,
+               r.verified, r.ai_summary, r.latitude, r.longitude, r.location_name, r.created_at
+        FROM {source}
+        WHERE {' AND '.join(where)}
+        ORDER BY r.created_at
+        LIMIT ?
+    '''
+    params.append(limit if limit else -1)
+    conn = get_connection()
+    try:
+        cursor = conn.execute(sql, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [tuple(row) for row in rows]
+    finally:
+        conn.close()
+
+def update_report_summary(report_id, ai_summary):
     conn = get_connection()
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT 
-            r.id,
-            r.post_id,
-            p.title,
-            p.description,
-            r.urgency_level,
-            r.flood_type,
-            r.ai_summary,
-            r.latitude,
-            r.longitude,
-            r.location_name,
-            p.status
+    cursor.execute('UPDATE reports SET ai_summary = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?', (ai_summary, report_id))
+    conn.commit()
+    conn.close()
+
+def get_report_by_id(report_id):
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        SELECT {MAP_COLUMNS}
         FROM reports r
         JOIN posts p ON r.post_id = p.id
-        ORDER BY r.created_at DESC
-    ''')
+        WHERE r.id = ?
+    ''', (report_id,))
+    report = cursor.fetchone()
+    conn.close()
+    return dict(report) if report else None
+
+def get_reports_for_map(bbox=None, since=None, until=None, limit=None):
+    """Reports for the hotspot map, newest first.
+    
+    bbox is (min_lng, min_lat, max_lng, max_lat); since/until are 'YYYY-MM-DD HH:MM:SS' UTC strings.
+    """
+    window = (since or ALL_TIME[0], until or ALL_TIME[1], limit if limit else -1)
+    conn = get_connection()
+    cursor = conn.cursor()
+    if bbox:
+        cursor.execute(MAP_BBOX_QUERY, (*_bbox_params(bbox), *window))
+    else:
+        cursor.execute(MAP_QUERY, window)
+    rows = cursor.fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+def get_reports_updated_since(since):
+    """Hotspot map rows created or changed at or after ``since`` ('YYYY-MM-DD HH:MM:SS' UTC)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute(MAP_UPDATED_QUERY, (since,))
     rows = cursor.fetchall()
     conn.close()
     return [dict(row) for row in rows]
 
+def existing_social_hashes(hashes):
+    """The subset of ``hashes`` already stored in social_posts."""
+    hashes = list(hashes)
+    if not hashes:
+        return set()
+    conn = get_connection()
+    try:
+        found = set()
+        # Stay below SQLite's default limit of 999 bound parameters.
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = conn.execute(
+                f"SELECT content_hash FROM social_posts WHERE content_hash IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update(row[0] for row in rows)
+        return found
+    finally:
+        conn.close()
+
+def get_social_posts_since(since):
+    """Social posts ingested at or after ``since`` ('YYYY-MM-DD HH:MM:SS' UTC)."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    cursor.execute('SELECT * FROM social_posts WHERE ingested_at >= ? ORDER BY ingested_at', (since,))
+    posts = [dict(row) for row in cursor.fetchall()]
+    conn.close()
+    return posts
+
+def insert_social_posts(rows):
+    """Bulk insert classified social posts in one transaction; returns how many were new.
+
+    Each row is (content_hash, author, text, location_name, media_urls_json, posted_at,
+    urgency_level, flood_type, confidence_score, source). Duplicate hashes are skipped.
+    """
+    if not rows:
+        return 0
+    conn = get_connection()
+    try:
+        before = conn.total_changes
+        with conn:
+            conn.executemany('''
+                INSERT OR IGNORE INTO social_posts (content_hash, author, text, location_name, media_urls, posted_at,
+                                                    urgency_level, flood_type, confidence_score, source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+        return conn.total_changes - before
+    finally:
+        conn.close()
+
+def save_job(record):
+    """Upsert a job record (``Job.to_dict()``) so any worker process can report it.
+
+    Finished jobs older than JOB_RETENTION_HOURS are pruned when a job finishes.
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO jobs (id, kind, owner_id, status, data, updated_at)
+                VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (record['job_id'], record['kind'], record['owner_id'], record['status'], json.dumps(record, default=str)))
+            if record['status'] in ('completed', 'failed'):
+                conn.execute(
+                    "DELETE FROM jobs WHERE updated_at < datetime('now', ?) AND status IN ('completed', 'failed')",
+                    (f'-{JOB_RETENTION_HOURS} hours',)
+                )
+    finally:
+        conn.close()
+
+def get_job(job_id):
+    """The last saved record of a job, or None."""
+    conn = get_connection()
+    row = conn.execute('SELECT data FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    conn.close()
+    return json.loads(row['data']) if row else None
+
+
+if __name__ == '__main__':
+    import argparse
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='BlueSignal database maintenance')
+    parser.add_argument('command', choices=['migrate', 'explain', 'backfill-votes', 'check-votes'])
+    parser.add_argument('--fix', action='store_true', help='check-votes: repair mismatched counters')
+    args = parser.parse_args()
+
+    conn = get_connection()
+    create_schema(conn.cursor())
+    conn.close()
+
+    if args.command == 'migrate':
+        print(f"Schema version: {run_migrations()}")
+    elif args.command == 'explain':
+        for name, (sql, params) in HOT_QUERIES.items():
+            print(f"{name}:")
+            for detail in explain_query_plan(sql, params):
+                print(f"  {detail}")
+        regressions = check_query_plans()
+        if regressions:
+            print(f"Full table scans or sorts on hot paths: {', '.join(regressions)}")
+            raise SystemExit(1)
+        print("All hot paths use indexes")
+    elif args.command == 'backfill-votes':
+        run_migrations()
+        print(f"Recomputed vote counters for {backfill_vote_counters()} posts")
+    elif args.command == 'check-votes':
+        run_migrations()
+        mismatches = check_vote_counters(fix=args.fix)
+        for m in mismatches:
+            print(f"post {m['post_id']}: stored {m['upvotes']}/{m['downvotes']}, actual {m['actual_upvotes']}/{m['actual_downvotes']}")
+        if mismatches and not args.fix:
+            raise SystemExit(1)
+        print(f"{len(mismatches)} mismatched posts{' repaired' if args.fix else ''}")
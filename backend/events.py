@@ -0,0 +1,376 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DROP_OLDEST = 'drop_oldest'
+COALESCE = 'coalesce'
+
+
+def encode_payload(payload: Any) -> bytes:
+    return json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def frame_from_data(data: bytes, event_id: Optional[int] = None) -> bytes:
+    if event_id is None:
+        return b"data: " + data + b"\n\n"
+    return b"id: " + str(event_id).encode() + b"\ndata: " + data + b"\n\n"
+
+
+def sse_frame(payload: Any, event_id: Optional[int] = None) -> bytes:
+    """Encode one Server-Sent Events message."""
+    return frame_from_data(encode_payload(payload), event_id)
+
+
+class Event:
+    __slots__ = ('id', 'channel', 'data', 'frame', 'key', 'created_at')
+
+    def __init__(self, event_id: int, channel: str, data: bytes, key: Optional[Hashable]):
+        self.id = event_id
+        self.channel = channel
+        self.data = data
+        self.frame = frame_from_data(data, event_id)
+        self.key = key
+        self.created_at = time.time()
+
+    def payload(self) -> Any:
+        return json.loads(self.data)
+
+
+class EventBuffer:
+    """Bounded buffer of pending events for one client.
+
+    When the buffer is full the oldest pending event is dropped. With the
+    coalesce policy an event first replaces a pending one with the same key
+    (e.g. two updates of the same post), so slow clients only see the latest.
+    """
+
+    def __init__(self, maxlen: int, policy: str):
+        self.maxlen = maxlen
+        self.policy = policy
+        self.dropped = 0
+        self.coalesced = 0
+        self._pending: "OrderedDict[Any, Event]" = OrderedDict()
+
+    def push(self, event: Event):
+        slot = (event.channel, event.key) if self.policy == COALESCE and event.key is not None else event.id
+        if slot in self._pending:
+            del self._pending[slot]
+            self.coalesced += 1
+        elif len(self._pending) >= self.maxlen:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+        self._pending[slot] = event
+
+    def pop(self) -> Optional[Event]:
+        if not self._pending:
+            return None
+        return self._pending.popitem(last=False)[1]
+
+    def clear(self):
+        self._pending.clear()
+
+    def __len__(self):
+        return len(self._pending)
+
+
+class Subscription(EventBuffer):
+    """Thread-side subscriber: the SSE generator blocks in ``get`` until an event arrives."""
+
+    def __init__(self, hub: 'EventHub', channel: str, maxlen: int, policy: str):
+        super().__init__(maxlen, policy)
+        self.hub = hub
+        self.channel = channel
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def offer(self, event: Event):
+        with self._cond:
+            if self.closed:
+                return
+            self.push(event)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next pending event, or None when ``timeout`` elapses or the subscription closes."""
+        with self._cond:
+            if not len(self) and not self.closed:
+                self._cond.wait(timeout)
+            return self.pop()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self.clear()
+            self._cond.notify_all()
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """Broadcasts events to SSE subscribers, serializing each event exactly once.
+
+    Every published event gets a monotonically increasing id and is encoded into
+    a single shared ``bytes`` frame that all subscribers on its channel reuse.
+    The last ``replay_size`` events of each channel are kept so reconnecting
+    clients can resume from their ``Last-Event-ID`` instead of a full snapshot.
+
+    Without a ``transport`` events only reach subscribers of this process. With
+    one (e.g. ``SqliteEventTransport``) ``publish`` hands the event to the
+    transport, which assigns the id and delivers it back to every process's hub.
+    """
+
+    def __init__(self, buffer_size: int = 256, policy: str = COALESCE, replay_size: int = 1000,
+                 transport: 'Optional[SqliteEventTransport]' = None):
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.replay_size = replay_size
+        self.transport = transport
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._floor = 0
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._subscribers: Dict[str, set] = {}
+        self._published: Dict[str, int] = {}
+        self._replay: Dict[str, deque] = {}
+        self._evicted_through: Dict[str, int] = {}
+        self._listeners: List[Callable[[Event], None]] = []
+
+    @property
+    def last_event_id(self) -> int:
+        return self._last_id
+
+    def publish(self, channel: str, payload: Any, key: Optional[Hashable] = None) -> Optional[Event]:
+        """Publish ``payload`` on ``channel``; returns the delivered Event, or None when
+        it went to the transport and is delivered by its poller."""
+        data = encode_payload(payload)
+        if self.transport is not None:
+            self._ensure_started()
+            self.transport.publish(channel, data, key)
+            return None
+        with self._lock:
+            return self._deliver_locked(next(self._ids), channel, data, key)
+
+    def deliver(self, event_id: int, channel: str, data: bytes, key: Optional[Hashable] = None) -> Event:
+        """Deliver an event whose id was assigned by the transport. Ids must increase."""
+        with self._lock:
+            return self._deliver_locked(event_id, channel, data, key)
+
+    def _deliver_locked(self, event_id: int, channel: str, data: bytes, key: Optional[Hashable]) -> Event:
+        event = Event(event_id, channel, data, key)
+        self._record(event)
+        # Offer while holding the lock so every subscriber sees ids in order.
+        for subscription in list(self._subscribers.get(channel, ())):
+            try:
+                subscription.offer(event)
+            except Exception as e:
+                logger.error(f"Error delivering event {event_id} on {channel}: {e}")
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(f"Event listener error on {channel}: {e}")
+        return event
+
+    def _ensure_started(self):
+        # Started lazily (and again after a fork) so each worker process runs its own poller.
+        if self.transport is None or self._started_pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._started_pid != os.getpid():
+                self.transport.start(self)
+                self._started_pid = os.getpid()
+
+    def reset_position(self, event_id: int):
+        """Start the id sequence after ``event_id``; older ids can only resume from a snapshot."""
+        with self._lock:
+            self._last_id = self._floor = event_id
+
+    def add_listener(self, listener: Callable[[Event], None]):
+        """Call ``listener(event)`` for every event on every channel, in id order.
+
+        Listeners run while the hub lock is held and must not block.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Event], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _record(self, event: Event):
+        self._last_id = event.id
+        self._published[event.channel] = self._published.get(event.channel, 0) + 1
+        log = self._replay.get(event.channel)
+        if log is None:
+            log = self._replay[event.channel] = deque()
+        if len(log) >= self.replay_size:
+            self._evicted_through[event.channel] = log.popleft().id
+        log.append(event)
+
+    def subscribe(self, channel: str, last_event_id: Optional[int] = None) -> Tuple[Subscription, Optional[List[Event]], int]:
+        """Register a subscriber on ``channel``.
+
+        Returns ``(subscription, replay, position)``. ``replay`` holds the events
+        published after ``last_event_id``, or is None when the client has no id or
+        the gap is no longer covered by the replay log (it needs a snapshot).
+        ``position`` is the id a snapshot taken now should carry.
+        """
+        self._ensure_started()
+        subscription = Subscription(self, channel, self.buffer_size, self.policy)
+        with self._lock:
+            replay, position = self._replay_after(channel, last_event_id)
+            self._subscribers.setdefault(channel, set()).add(subscription)
+            return subscription, replay, position
+
+    def replay(self, channel: str, last_event_id: Optional[int]) -> Tuple[Optional[List[Event]], int]:
+        """``(replay, position)`` as returned by ``subscribe``, without registering a subscriber."""
+        self._ensure_started()
+        with self._lock:
+            return self._replay_after(channel, last_event_id)
+
+    def _replay_after(self, channel: str, last_event_id: Optional[int]) -> Tuple[Optional[List[Event]], int]:
+        if last_event_id is None or last_event_id > self._last_id \
+                or last_event_id < max(self._floor, self._evicted_through.get(channel, 0)):
+            return None, self._last_id
+        return [e for e in self._replay.get(channel, ()) if e.id > last_event_id], self._last_id
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.get(subscription.channel, set()).discard(subscription)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            channels = set(self._subscribers) | set(self._published)
+            return {
+                channel: {
+                    'subscribers': len(self._subscribers.get(channel, ())),
+                    'published': self._published.get(channel, 0),
+                    'replay_log': len(self._replay.get(channel, ())),
+                    'dropped': sum(s.dropped for s in self._subscribers.get(channel, ())),
+                    'coalesced': sum(s.coalesced for s in self._subscribers.get(channel, ()))
+                }
+                for channel in channels
+            }
+
+
+class SqliteEventTransport:
+    """Shares events between worker processes through an ``event_log`` table.
+
+    ``publish`` appends a row; its AUTOINCREMENT rowid is the event id, so ids
+    are global across processes and a client can resume (``Last-Event-ID``)
+    against any worker. Each process polls for rows above its high-water mark
+    and delivers them to its hub in id order. A publish wakes the local poller
+    at once; other processes see it within ``poll_interval`` seconds.
+    """
+
+    def __init__(self, connect: Callable[[], Any], poll_interval: float = 0.1,
+                 retention_seconds: float = 3600, batch_size: int = 500):
+        self.connect = connect
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.batch_size = batch_size
+        self.high_water_mark = 0
+        self.polled = 0
+        self.pruned = 0
+        self._hub: Optional[EventHub] = None
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_prune = 0.0
+
+    def start(self, hub: EventHub):
+        """Prime ``hub`` with the recent log (for replay) and start the poller thread."""
+        self._hub = hub
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS event_log (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        channel TEXT NOT NULL,
+                        key TEXT,
+                        data BLOB NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                ''')
+            newest = conn.execute('SELECT MAX(id) FROM event_log').fetchone()[0] or 0
+        finally:
+            conn.close()
+        self.high_water_mark = max(0, newest - hub.replay_size)
+        hub.reset_position(self.high_water_mark)
+        while self.poll() >= self.batch_size:
+            pass
+        self._thread = threading.Thread(target=self._run, name='event-log-poller', daemon=True)
+        self._thread.start()
+        logger.info(f"Event log transport started at id {self.high_water_mark}")
+
+    def publish(self, channel: str, data: bytes, key: Optional[Hashable] = None):
+        conn = self.connect()
+        try:
+            with conn:
+                conn.execute(
+                    'INSERT INTO event_log (channel, key, data, created_at) VALUES (?, ?, ?, ?)',
+                    (channel, None if key is None else json.dumps(key), data, time.time())
+                )
+        finally:
+            conn.close()
+        self._wake.set()
+
+    def poll(self) -> int:
+        """Deliver rows above the high-water mark; returns how many were read."""
+        conn = self.connect()
+        try:
+            rows = conn.execute(
+                'SELECT id, channel, key, data FROM event_log WHERE id > ? ORDER BY id LIMIT ?',
+                (self.high_water_mark, self.batch_size)
+            ).fetchall()
+        finally:
+            conn.close()
+        for event_id, channel, key, data in rows:
+            self._hub.deliver(event_id, channel, bytes(data), None if key is None else json.loads(key))
+            self.high_water_mark = event_id
+        self.polled += len(rows)
+        return len(rows)
+
+    def prune(self):
+        """Delete rows older than ``retention_seconds`` that this process has already read."""
+        conn = self.connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    'DELETE FROM event_log WHERE id <= ? AND created_at < ?',
+                    (self.high_water_mark, time.time() - self.retention_seconds)
+                )
+                self.pruned += cursor.rowcount
+        finally:
+            conn.close()
+
+    def _run(self):
+        while True:
+            try:
+                if self.poll() >= self.batch_size:
+                    continue
+                now = time.monotonic()
+                if now - self._last_prune > 60:
+                    self._last_prune = now
+                    self.prune()
+            except Exception as e:
+                logger.error(f"Event log poll error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'backend': 'sqlite',
+            'high_water_mark': self.high_water_mark,
+            'polled': self.polled,
+            'pruned': self.pruned
+        }
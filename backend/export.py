@@ -0,0 +1,128 @@
+"""Streaming encoders for report exports.
+
+Each encoder takes the column names and an iterator of row chunks (lists of
+tuples, as yielded by ``database.iter_reports_for_export``) and yields bytes,
+so a response never holds more than one chunk of rows in memory.
+"""
+import csv
+import io
+import json
+import zlib
+from typing import Iterable, Iterator, List, Sequence, Tuple
+
+Chunks = Iterable[List[Tuple]]
+
+
+def encode_csv(columns: Sequence[str], chunks: Chunks) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def encode_ndjson(columns: Sequence[str], chunks: Chunks) -> Iterator[bytes]:
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n' for row in rows).encode('utf-8')
+
+
+def encode_json_array(columns: Sequence[str], chunks: Chunks) -> Iterator[bytes]:
+    separator = '['
+    for rows in chunks:
+        parts = []
+        for row in rows:
+            parts.append(separator)
+            parts.append(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+            separator = ','
+        yield ''.join(parts).encode('utf-8')
+    yield b'[]' if separator == '[' else b']'
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back to the encoder between row groups."""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+def parquet_schema():
+    import pyarrow as pa
+
+    return pa.schema([
+        ('report_id', pa.int64()),
+        ('post_id', pa.int64()),
+        ('title', pa.string()),
+        ('description', pa.string()),
+        ('urgency_level', pa.string()),
+        ('flood_type', pa.string()),
+        ('confidence_score', pa.float64()),
+        ('verified', pa.bool_()),
+        ('ai_summary', pa.string()),
+        ('latitude', pa.float64()),
+        ('longitude', pa.float64()),
+        ('location_name', pa.string()),
+        ('created_at', pa.string())
+    ])
+
+
+def encode_parquet(columns: Sequence[str], chunks: Chunks) -> Iterator[bytes]:
+    """One Parquet row group per chunk. Requires pyarrow (checked by ``parquet_available``)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    verified = columns.index('verified')
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        for rows in chunks:
+            # SQLite stores BOOLEAN as 0/1.
+            rows = [row[:verified] + (None if row[verified] is None else bool(row[verified]),) + row[verified + 1:]
+                    for row in rows]
+            writer.write_table(pa.Table.from_pylist([dict(zip(columns, row)) for row in rows], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def gzip_stream(data: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for block in data:
+        compressed = compressor.compress(block)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# format -> (encoder, content type, file extension)
+FORMATS = {
+    'csv': (encode_csv, 'text/csv', 'csv'),
+    'ndjson': (encode_ndjson, 'application/x-ndjson', 'ndjson'),
+    'json': (encode_json_array, 'application/json', 'json'),
+    'parquet': (encode_parquet, 'application/vnd.apache.parquet', 'parquet')
+}
@@ -0,0 +1,200 @@
+"""Reverse geocoding behind a persistent cache, a rate limiter and an offline gazetteer.
+
+Coordinates are rounded to ``precision`` decimals (3 is roughly a 110 m cell)
+and the rounded pair is the cache key, so nearby reports share one lookup.
+Concurrent lookups of the same cell wait for a single provider call, and
+provider calls go through a token bucket that respects Nominatim's limit of
+about one request per second. When the provider is unavailable, rate limited
+or disabled (offline mode) the nearest place of a local gazetteer is used.
+"""
+import csv
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from corroboration import KM_PER_DEGREE, haversine_km
+
+logger = logging.getLogger(__name__)
+
+Place = Dict[str, object]
+
+
+class TokenBucket:
+    """Allows ``rate_per_second`` acquisitions on average, in bursts of up to ``capacity``."""
+
+    def __init__(self, rate_per_second: float, capacity: float = 1.0):
+        self.rate = rate_per_second
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take one token, waiting up to ``timeout`` seconds (forever when None) for it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class Gazetteer:
+    """Place names and centroids with a nearest-place lookup on a lat/lng grid.
+
+    Files are CSV with ``name,latitude,longitude[,address]`` columns or a JSON
+    list of objects with the same keys.
+    """
+
+    def __init__(self, places: Iterable[Place], cell_degrees: float = 0.1):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Tuple[int, int], List[Place]] = {}
+        self._count = 0
+        for place in places:
+            place = {
+                'name': place['name'],
+                'address': place.get('address') or place['name'],
+                'latitude': float(place['latitude']),
+                'longitude': float(place['longitude'])
+            }
+            self._cells.setdefault(self._cell(place['latitude'], place['longitude']), []).append(place)
+            self._count += 1
+
+    @classmethod
+    def load(cls, path: str) -> 'Gazetteer':
+        with open(path, encoding='utf-8') as f:
+            places = json.load(f) if path.endswith('.json') else list(csv.DictReader(f))
+        gazetteer = cls(places)
+        logger.info(f"Loaded {len(gazetteer)} gazetteer places from {path}")
+        return gazetteer
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees)
+
+    def nearest(self, lat: float, lng: float, max_km: float = 25.0) -> Optional[Place]:
+        """Closest place within ``max_km``, with its ``distance_km``; None if there is none."""
+        row, col = self._cell(lat, lng)
+        rows = math.ceil(max_km / KM_PER_DEGREE / self.cell_degrees)
+        cols = math.ceil(rows / max(0.01, math.cos(math.radians(lat))))
+        best, best_km = None, max_km
+        for r in range(row - rows, row + rows + 1):
+            for c in range(col - cols, col + cols + 1):
+                for place in self._cells.get((r, c), ()):
+                    distance = haversine_km(lat, lng, place['latitude'], place['longitude'])
+                    if distance <= best_km:
+                        best, best_km = place, distance
+        return dict(best, distance_km=round(best_km, 3)) if best else None
+
+
+class ReverseGeocoder:
+    """Coordinates to an address: cache, then ``provider``, then the gazetteer.
+
+    ``provider(lat, lng)`` returns ``{'address', 'latitude', 'longitude'}`` or None
+    and may raise; pass ``provider=None`` to run offline. ``cache`` is an
+    ``InferenceCache`` (namespace 'geocode'); provider answers, including "no
+    address here", are stored under the rounded coordinates. Gazetteer answers
+    are not, so a later online lookup can still improve them.
+    """
+
+    def __init__(self, provider: Optional[Callable[[float, float], Optional[Dict]]], cache,
+                 gazetteer: Optional[Gazetteer] = None, precision: int = 3, rate_per_second: float = 1.0,
+                 max_wait_seconds: float = 2.0, max_distance_km: float = 25.0, version: str = 'nominatim'):
+        self.provider = provider
+        self.cache = cache
+        self.gazetteer = gazetteer
+        self.precision = precision
+        self.max_wait_seconds = max_wait_seconds
+        self.max_distance_km = max_distance_km
+        self.version = f"{version}:{precision}"
+        self.bucket = TokenBucket(rate_per_second)
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {'lookups': 0, 'cache_hits': 0, 'coalesced': 0, 'provider_calls': 0,
+                       'provider_errors': 0, 'rate_limited': 0, 'gazetteer_hits': 0, 'misses': 0}
+
+    @property
+    def offline(self) -> bool:
+        return self.provider is None
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def round(self, lat: float, lng: float) -> Tuple[float, float]:
+        return round(lat, self.precision), round(lng, self.precision)
+
+    def reverse(self, lat: float, lng: float) -> Optional[Place]:
+        """Address for the coordinates with its ``source`` ('nominatim' or 'gazetteer'), or None."""
+        lat, lng = float(lat), float(lng)
+        self._count('lookups')
+        key = '{:.{p}f},{:.{p}f}'.format(*self.round(lat, lng), p=self.precision)
+        cached = None if self.offline else self.cache.get('geocode', self.version, key)
+        if cached is not None:
+            self._count('cache_hits')
+            return dict(cached) if cached.get('address') else self._from_gazetteer(lat, lng)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self._count('coalesced')
+            try:
+                return future.result()
+            except Exception:
+                return self._from_gazetteer(lat, lng)
+
+        try:
+            result = self._resolve(lat, lng, key)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _resolve(self, lat: float, lng: float, key: str) -> Optional[Place]:
+        if self.offline:
+            return self._from_gazetteer(lat, lng)
+        if not self.bucket.acquire(self.max_wait_seconds):
+            self._count('rate_limited')
+            return self._from_gazetteer(lat, lng)
+        self._count('provider_calls')
+        try:
+            found = self.provider(*self.round(lat, lng))
+        except Exception as e:
+            self._count('provider_errors')
+            logger.error(f"Geocoding error: {e}")
+            return self._from_gazetteer(lat, lng)
+        value = self.cache.put('geocode', self.version, key, dict(found, source='nominatim') if found else {'address': None})
+        return dict(value) if value.get('address') else self._from_gazetteer(lat, lng)
+
+    def _from_gazetteer(self, lat: float, lng: float) -> Optional[Place]:
+        place = self.gazetteer.nearest(lat, lng, self.max_distance_km) if self.gazetteer else None
+        if place is None:
+            self._count('misses')
+            return None
+        self._count('gazetteer_hits')
+        return dict(place, source='gazetteer')
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return dict(self._stats, mode='offline' if self.offline else 'online', inflight=len(self._inflight),
+                        gazetteer_places=len(self.gazetteer) if self.gazetteer else 0)
@@ -0,0 +1,408 @@
+import io
+import logging
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# torch, transformers and PIL are imported where they are first needed so that
+# importing this module (and app.py) stays cheap; models load in the background.
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class ModelWarming(TimeoutError):
+    """A model was still loading when the caller stopped waiting for it."""
+
+
+def load_rgb_image(image) -> Any:
+    """Decode a path or encoded bytes (or normalize a PIL image) to RGB."""
+    from PIL import Image
+
+    if isinstance(image, bytes):
+        image = io.BytesIO(image)
+    if not isinstance(image, Image.Image):
+        with Image.open(image) as img:
+            return img.convert('RGB')
+    return image if image.mode == 'RGB' else image.convert('RGB')
+
+
+def module_memory_bytes(module) -> int:
+    """Bytes held by a torch module's parameters and buffers."""
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ZeroShotTextEngine:
+    """Zero-shot NLI classifier that scores several label sets in one forward pass.
+
+    Mirrors the scoring of the transformers ``zero-shot-classification`` pipeline
+    (softmax over the entailment logits of each label set) but loads the model
+    once, tokenizes every hypothesis once and tokenizes each premise once per call.
+    """
+
+    def __init__(self, model_name: str, hypothesis_template: str = "This example is {}."):
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        self.model_name = model_name
+        self.hypothesis_template = hypothesis_template
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model.eval()
+        self.entailment_id = self._find_entailment_id()
+        self._hypothesis_ids: Dict[str, List[int]] = {}
+
+    def memory_bytes(self) -> int:
+        return module_memory_bytes(self.model)
+
+    def _find_entailment_id(self) -> int:
+        for label, idx in self.model.config.label2id.items():
+            if label.lower().startswith("entail"):
+                return idx
+        return -1
+
+    def _hypothesis_tokens(self, label: str) -> List[int]:
+        ids = self._hypothesis_ids.get(label)
+        if ids is None:
+            hypothesis = self.hypothesis_template.format(label)
+            ids = self.tokenizer.encode(hypothesis, add_special_tokens=False)
+            self._hypothesis_ids[label] = ids
+        return ids
+
+    def classify(self, text: str, label_sets: Dict[str, Sequence[str]]) -> Dict[str, List[Tuple[str, float]]]:
+        return self.classify_batch([text], label_sets)[0]
+
+    def classify_batch(self, texts: Sequence[str], label_sets: Dict[str, Sequence[str]]) -> List[Dict[str, List[Tuple[str, float]]]]:
+        """Score every label of every set against every text in a single padded batch.
+
+        Returns one ``{task: [(label, score), ...]}`` dict per text, each list
+        sorted by descending score.
+        """
+        import torch
+
+        if not texts:
+            return []
+
+        labels = [label for task_labels in label_sets.values() for label in task_labels]
+        special = self.tokenizer.num_special_tokens_to_add(pair=True)
+        max_length = self.tokenizer.model_max_length
+
+        sequences = []
+        for text in texts:
+            premise = self.tokenizer.encode(text, add_special_tokens=False)
+            for label in labels:
+                hypothesis = self._hypothesis_tokens(label)
+                budget = max(0, max_length - special - len(hypothesis))
+                sequences.append({
+                    'input_ids': self.tokenizer.build_inputs_with_special_tokens(premise[:budget], hypothesis)
+                })
+
+        encoded = self.tokenizer.pad(sequences, return_tensors='pt')
+        with torch.inference_mode():
+            logits = self.model(**encoded).logits
+        entail_logits = logits[:, self.entailment_id].reshape(len(texts), len(labels))
+
+        results = []
+        for row in entail_logits:
+            scored = {}
+            offset = 0
+            for task, task_labels in label_sets.items():
+                task_scores = row[offset:offset + len(task_labels)].softmax(dim=-1).tolist()
+                offset += len(task_labels)
+                scored[task] = sorted(zip(task_labels, task_scores), key=lambda item: item[1], reverse=True)
+            results.append(scored)
+        return results
+
+
+class ClipImageEngine:
+    """Zero-shot CLIP image classifier with a cached label-embedding matrix.
+
+    The text tower only runs when the label set changes; each request costs one
+    vision pass plus a similarity product against the cached, normalized matrix.
+    """
+
+    def __init__(self, model_name: str, hypothesis_template: str = "This is a photo of {}."):
+        from transformers import CLIPModel, CLIPProcessor
+
+        self.model_name = model_name
+        self.hypothesis_template = hypothesis_template
+        self.processor = CLIPProcessor.from_pretrained(model_name)
+        self.model = CLIPModel.from_pretrained(model_name)
+        self.model.eval()
+        self._lock = threading.Lock()
+        self._labels: Tuple[str, ...] = ()
+        self._text_embeds = None
+
+    def memory_bytes(self) -> int:
+        size = module_memory_bytes(self.model)
+        if self._text_embeds is not None:
+            size += self._text_embeds.numel() * self._text_embeds.element_size()
+        return size
+
+    def set_labels(self, labels: Sequence[str]):
+        """Encode ``labels`` through the text tower unless they are already cached."""
+        import torch
+
+        key = tuple(labels)
+        with self._lock:
+            if key == self._labels and self._text_embeds is not None:
+                return
+            prompts = [self.hypothesis_template.format(label) for label in key]
+            inputs = self.processor(text=prompts, return_tensors='pt', padding=True)
+            with torch.inference_mode():
+                embeds = self.model.get_text_features(**inputs)
+            self._text_embeds = embeds / embeds.norm(dim=-1, keepdim=True)
+            self._labels = key
+            logger.info(f"Cached CLIP text embeddings for {len(key)} labels")
+
+    def classify_batch(self, images: Sequence[Any], labels: Sequence[str] = None) -> List[List[Tuple[str, float]]]:
+        """Rank the cached labels for each image (paths or PIL images) in one vision pass."""
+        import torch
+
+        if labels is not None:
+            self.set_labels(labels)
+        if self._text_embeds is None:
+            raise RuntimeError("CLIP label embeddings not initialized")
+        if not images:
+            return []
+
+        inputs = self.processor(images=[load_rgb_image(image) for image in images], return_tensors='pt')
+        with torch.inference_mode():
+            image_embeds = self.model.get_image_features(pixel_values=inputs['pixel_values'])
+            image_embeds = image_embeds / image_embeds.norm(dim=-1, keepdim=True)
+            logits = self.model.logit_scale.exp() * image_embeds @ self._text_embeds.T
+            probs = logits.softmax(dim=-1).tolist()
+
+        labels = self._labels
+        return [sorted(zip(labels, row), key=lambda item: item[1], reverse=True) for row in probs]
+
+
+class ModelRegistry:
+    """Named, resident model handles.
+
+    Models are loaded once, either all up front (``load_all``), in parallel
+    background threads (``start_loading``), or lazily when first awaited.
+    Request paths call ``get`` (never loads; errors if not ready) or ``wait``
+    (blocks until ready), and can check ``ready`` to answer "warming" instead.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._handles: Dict[str, Any] = {}
+        self._states: Dict[str, str] = {}
+        self._errors: Dict[str, str] = {}
+        self._done: Dict[str, threading.Event] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        with self._lock:
+            self._loaders[name] = loader
+            self._states[name] = PENDING
+            self._done[name] = threading.Event()
+
+    def _claim(self, name: str) -> bool:
+        # Move a pending or failed model to loading; False if someone else has it.
+        with self._lock:
+            if self._states[name] not in (PENDING, FAILED):
+                return False
+            self._states[name] = LOADING
+            self._errors.pop(name, None)
+            self._done[name].clear()
+            return True
+
+    def _load(self, name: str):
+        started = time.perf_counter()
+        try:
+            handle = self._loaders[name]()
+        except Exception as e:
+            with self._lock:
+                self._states[name] = FAILED
+                self._errors[name] = str(e)
+            self._done[name].set()
+            logger.error(f"Failed to load model '{name}': {e}")
+            raise
+        load_seconds = time.perf_counter() - started
+        memory = handle.memory_bytes() if hasattr(handle, 'memory_bytes') else None
+        with self._lock:
+            self._handles[name] = handle
+            self._states[name] = READY
+            self._stats[name] = {
+                'load_seconds': round(load_seconds, 3),
+                'memory_bytes': memory,
+                'memory_mb': round(memory / 2 ** 20, 1) if memory is not None else None,
+                'loaded_at': time.time()
+            }
+        self._done[name].set()
+        logger.info(f"Loaded model '{name}' in {load_seconds:.2f}s")
+
+    def load(self, name: str) -> Any:
+        """Load ``name`` in the calling thread (or wait for a load already running)."""
+        if self._claim(name):
+            self._load(name)
+        return self.wait(name)
+
+    def load_all(self):
+        for name in list(self._loaders):
+            self.load(name)
+
+    def start_loading(self, names: Optional[Iterable[str]] = None):
+        """Load ``names`` (default: all) on background threads, in parallel; returns at once."""
+        for name in list(names or self._loaders):
+            if self._claim(name):
+                with self._lock:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='model-load')
+                self._executor.submit(self._load, name)
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> Any:
+        """Handle of ``name``, starting a background load if nobody has yet."""
+        if self._states[name] != READY:
+            self.start_loading([name])
+            if not self._done[name].wait(timeout):
+                raise ModelWarming(f"Model '{name}' is still loading")
+        if self._states[name] == FAILED:
+            raise RuntimeError(f"Model '{name}' failed to load: {self._errors.get(name)}")
+        return self._handles[name]
+
+    def get(self, name: str) -> Any:
+        handle = self._handles.get(name)
+        if handle is None:
+            raise RuntimeError(f"Model '{name}' is not loaded")
+        return handle
+
+    def ready(self, name: Optional[str] = None) -> bool:
+        """Whether ``name`` (default: every registered model) is loaded."""
+        names = [name] if name else list(self._loaders)
+        return all(self._states.get(n) == READY for n in names)
+
+    def state(self, name: str) -> str:
+        return self._states[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._handles
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                name: dict(self._stats.get(name, {}), state=self._states[name], error=self._errors.get(name))
+                for name in self._loaders
+            }
+
+
+class MicroBatcher:
+    """Funnels concurrent inference calls through one worker thread in small batches.
+
+    Requests that arrive within ``max_wait_ms`` of the first queued item (or
+    until ``max_batch_size`` items are waiting) are handed to ``batch_fn`` as a
+    single list; ``batch_fn`` must return one result per input, in order. When a
+    batch fails its items are retried one by one, so a bad input only fails its own call.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 16, max_wait_ms: float = 10.0, latency_window: int = 1000):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: "queue.Queue[Tuple[Any, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes: Counter = Counter()
+        self._latencies_ms: deque = deque(maxlen=latency_window)
+        self._items = 0
+        self._batches = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._thread = threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True)
+        self._thread.start()
+
+    def submit(self, item: Any) -> Future:
+        future: Future = Future()
+        self._queue.put((item, future, time.monotonic()))
+        depth = self._queue.qsize()
+        with self._lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def __call__(self, item: Any, timeout: float = None) -> Any:
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self) -> List[Tuple[Any, Future, float]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _, _ in batch]
+            try:
+                results = self.batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name} batch returned {len(results)} results for {len(items)} inputs")
+                for (_, future, _), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                logger.error(f"Batch inference error in {self.name}: {e}")
+                with self._lock:
+                    self._errors += 1
+                pending = [entry for entry in batch if not entry[1].done()]
+                if len(pending) > 1:
+                    self._run_singly(pending)
+                else:
+                    for _, future, _ in pending:
+                        future.set_exception(e)
+
+            finished = time.monotonic()
+            with self._lock:
+                self._batches += 1
+                self._items += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                for _, _, enqueued in batch:
+                    self._latencies_ms.append((finished - enqueued) * 1000.0)
+
+    def _run_singly(self, batch: List[Tuple[Any, Future, float]]):
+        for item, future, _ in batch:
+            try:
+                future.set_result(self.batch_fn([item])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            def percentile(p):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2)
+            return {
+                'queue_depth': self._queue.qsize(),
+                'max_queue_depth': self._max_queue_depth,
+                'batches': self._batches,
+                'items': self._items,
+                'errors': self._errors,
+                'avg_batch_size': round(self._items / self._batches, 2) if self._batches else 0.0,
+                'batch_size_histogram': dict(sorted(self._batch_sizes.items())),
+                'latency_ms_p50': percentile(0.50),
+                'latency_ms_p99': percentile(0.99),
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0
+            }
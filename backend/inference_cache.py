@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def model_version(*parts: Any) -> str:
+    """Short fingerprint of everything that determines a model's output (name, template, labels)."""
+    blob = json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def normalize_text(text: str) -> str:
+    # The NLI model is uncased and its tokenizer ignores runs of whitespace.
+    return ' '.join(text.split()).lower()
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class InferenceCache:
+    """Content-addressed cache of model outputs: an in-memory LRU in front of SQLite.
+
+    Entries are keyed by ``(namespace, version, digest)`` where ``digest`` hashes
+    the normalized text or raw image bytes and ``version`` fingerprints the
+    model and label set, so changing either simply stops matching old rows.
+    Values must be JSON-serializable. ``path=None`` keeps the cache in memory only.
+    """
+
+    def __init__(self, path: Optional[str], max_memory_entries: int = 10000, max_disk_entries: int = 500000):
+        self.path = path
+        self.max_memory_entries = max(1, max_memory_entries)
+        self.max_disk_entries = max_disk_entries
+        self._memory: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._writes = 0
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS inference_cache (
+                    namespace TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, version, digest)
+                ) WITHOUT ROWID
+            ''')
+
+    def _count(self, namespace: str, outcome: str):
+        counts = self._stats.setdefault(namespace, {'memory_hits': 0, 'disk_hits': 0, 'misses': 0})
+        counts[outcome] += 1
+
+    def get(self, namespace: str, version: str, digest: str) -> Optional[Any]:
+        key = (namespace, version, digest)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self._count(namespace, 'memory_hits')
+                return self._memory[key]
+            row = None
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute(
+                        'SELECT value FROM inference_cache WHERE namespace = ? AND version = ? AND digest = ?', key
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.error(f"Inference cache read error: {e}")
+            if row is None:
+                self._count(namespace, 'misses')
+                return None
+            value = json.loads(row[0])
+            self._remember(key, value)
+            self._count(namespace, 'disk_hits')
+            return value
+
+    def put(self, namespace: str, version: str, digest: str, value: Any) -> Any:
+        """Store ``value``; returns it in decoded form so cached and fresh results look the same."""
+        key = (namespace, version, digest)
+        encoded = json.dumps(value)
+        value = json.loads(encoded)
+        with self._lock:
+            self._remember(key, value)
+            if self._conn is None:
+                return value
+            try:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO inference_cache (namespace, version, digest, value, created_at) VALUES (?, ?, ?, ?, ?)',
+                    (*key, encoded, time.time())
+                )
+                self._writes += 1
+                if self._writes % 1000 == 0:
+                    self._trim()
+            except sqlite3.Error as e:
+                logger.error(f"Inference cache write error: {e}")
+        return value
+
+    def _remember(self, key: tuple, value: Any):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _trim(self):
+        # Keep the disk store bounded by dropping its oldest rows.
+        excess = self._conn.execute('SELECT COUNT(*) FROM inference_cache').fetchone()[0] - self.max_disk_entries
+        if excess > 0:
+            self._conn.execute('''
+                DELETE FROM inference_cache WHERE (namespace, version, digest) IN (
+                    SELECT namespace, version, digest FROM inference_cache ORDER BY created_at LIMIT ?
+                )
+            ''', (excess,))
+
+    def get_or_compute(self, namespace: str, version: str, digest: str, compute: Callable[[], Any]) -> Any:
+        """Cached value for the key, or ``compute()`` stored under it. Errors are not cached."""
+        value = self.get(namespace, version, digest)
+        if value is None:
+            value = self.put(namespace, version, digest, compute())
+        return value
+
+    def retain(self, namespace: str, versions: Iterable[str]):
+        """Delete disk entries of ``namespace`` written by any other model version."""
+        versions = list(versions)
+        with self._lock:
+            self._memory = OrderedDict((k, v) for k, v in self._memory.items() if k[0] != namespace or k[1] in versions)
+            if self._conn is None:
+                return
+            placeholders = ','.join('?' * len(versions))
+            deleted = self._conn.execute(
+                f'DELETE FROM inference_cache WHERE namespace = ? AND version NOT IN ({placeholders})',
+                (namespace, *versions)
+            ).rowcount
+            if deleted:
+                logger.info(f"Dropped {deleted} stale {namespace} cache entries")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {}
+            for namespace, counts in self._stats.items():
+                lookups = sum(counts.values())
+                hits = counts['memory_hits'] + counts['disk_hits']
+                namespaces[namespace] = dict(counts, hit_rate=round(hits / lookups, 4) if lookups else 0.0)
+            disk_entries = None
+            if self._conn is not None:
+                disk_entries = self._conn.execute('SELECT COUNT(*) FROM inference_cache').fetchone()[0]
+            return {
+                'memory_entries': len(self._memory),
+                'disk_entries': disk_entries,
+                'namespaces': namespaces
+            }
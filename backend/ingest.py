@@ -0,0 +1,239 @@
+"""Bulk ingestion of social media feeds (JSON array or NDJSON) into ``social_posts``.
+
+Records look like the entries of ``demo_social_media.json``. Files are read
+incrementally, classified in batches, deduplicated and written one
+transaction per batch. After each committed batch a checkpoint records the
+byte offset reached, so an interrupted run resumes where it stopped:
+
+    python ingest.py feed.ndjson [--batch-size 256] [--restart]
+"""
+import codecs
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import database
+from inference_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1 << 20
+SOCIAL_POST_COLUMNS = ('content_hash', 'author', 'text', 'location_name', 'media_urls', 'posted_at',
+                       'urgency_level', 'flood_type', 'confidence_score', 'source')
+WHITESPACE = ' \t\r\n'
+
+
+def detect_format(path: str) -> str:
+    """'json' for a JSON array, otherwise 'ndjson'."""
+    with open(path, 'rb') as f:
+        head = f.read(4096).lstrip(codecs.BOM_UTF8).lstrip()
+    return 'json' if head.startswith(b'[') else 'ndjson'
+
+
+def _iter_ndjson(f, offset: int) -> Iterator[Tuple[Optional[Dict], int]]:
+    f.seek(offset)
+    position = offset
+    for line in f:
+        position += len(line)
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield record, position
+
+
+def _iter_json_array(f, offset: int) -> Iterator[Tuple[Optional[Dict], int]]:
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    # A resume offset always lies inside the array; a fresh start has yet to read its '['.
+    in_array = offset > 0
+    if offset == 0 and f.read(len(codecs.BOM_UTF8)) == codecs.BOM_UTF8:
+        offset = len(codecs.BOM_UTF8)
+    f.seek(offset)
+    # ``position`` is the byte offset of buf[0]; resuming starts just after a record.
+    buf, position, eof = '', offset, False
+
+    def fill():
+        nonlocal buf, eof
+        chunk = f.read(CHUNK_SIZE)
+        eof = not chunk
+        buf += utf8.decode(chunk, final=eof)
+
+    while True:
+        stripped = buf.lstrip(WHITESPACE + ',' if in_array else WHITESPACE)
+        position += len(buf) - len(stripped)  # whitespace and commas are single bytes
+        buf = stripped
+        if not buf:
+            if eof:
+                return
+            fill()
+            continue
+        if not in_array:
+            if buf[0] != '[':
+                raise ValueError('Expected a JSON array of records')
+            buf, position, in_array = buf[1:], position + 1, True
+            continue
+        if buf[0] == ']':
+            return
+        try:
+            record, end = decoder.raw_decode(buf)
+        except ValueError:
+            if eof:
+                raise
+            fill()
+            continue
+        position += len(buf[:end].encode('utf-8'))
+        buf = buf[end:]
+        yield record, position
+
+
+def iter_records(path: str, offset: int = 0) -> Iterator[Tuple[Optional[Dict], int]]:
+    """Yield ``(record, offset_after_record)``; ``record`` is None for unparsable NDJSON lines."""
+    reader = _iter_json_array if detect_format(path) == 'json' else _iter_ndjson
+    with open(path, 'rb') as f:
+        yield from reader(f, offset)
+
+
+def record_hash(record: Dict) -> str:
+    """Identity of a post: its platform id when present, else author, date and normalized text."""
+    if record.get('id') is not None:
+        key = ['id', str(record['id'])]
+    else:
+        key = [record.get('user'), record.get('date'), normalize_text(record['text'])]
+    return hashlib.sha256(json.dumps(key).encode('utf-8')).hexdigest()
+
+
+def load_checkpoint(checkpoint_path: str, path: str) -> Optional[Dict]:
+    try:
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get('path') != os.path.abspath(path) or checkpoint.get('size', 0) > os.path.getsize(path):
+        logger.warning(f"Ignoring checkpoint {checkpoint_path}: it belongs to another file")
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_path: str, checkpoint: Dict):
+    tmp_path = f"{checkpoint_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def ingest_file(path: str, classify_batch: Callable[[List[str]], List[Dict[str, List]]],
+                batch_size: int = 256, checkpoint_path: Optional[str] = None, restart: bool = False,
+                source: Optional[str] = None, progress: Optional[Callable[[Dict], None]] = None,
+                on_insert: Optional[Callable[[List[Dict]], None]] = None) -> Dict[str, Any]:
+    """Ingest ``path`` and return the run's counters.
+
+    ``classify_batch(texts)`` returns one ``{task: [(label, score), ...]}`` dict per
+    text, best first, for the 'urgency' and 'flood_type' tasks. ``progress`` is
+    called with the counters after every committed batch and ``on_insert`` with
+    the batch's new posts (as social_posts column dicts).
+    """
+    checkpoint_path = checkpoint_path or f"{path}.checkpoint"
+    checkpoint = None if restart else load_checkpoint(checkpoint_path, path)
+    stats = {
+        'path': os.path.abspath(path),
+        'size': os.path.getsize(path),
+        'offset': 0,
+        'records': 0,
+        'inserted': 0,
+        'duplicates': 0,
+        'invalid': 0,
+        'completed': False
+    }
+    if checkpoint:
+        stats.update({key: checkpoint.get(key, value) for key, value in stats.items() if key != 'size'})
+        # An NDJSON feed that grew since it was finished picks up the appended lines.
+        if stats['completed'] and checkpoint['size'] < stats['size'] and detect_format(path) == 'ndjson':
+            stats['completed'] = False
+        logger.info(f"Resuming {path} at byte {stats['offset']} ({stats['records']} records done)")
+    if stats['completed']:
+        return dict(stats, rows_per_second=0.0, elapsed_seconds=0.0)
+
+    source = source or os.path.basename(path)
+    started = time.monotonic()
+    run_records = 0
+
+    def flush(batch: Dict[str, Dict], offset: int):
+        existing = database.existing_social_hashes(batch)
+        fresh = [(h, r) for h, r in batch.items() if h not in existing]
+        scores = classify_batch([r['text'] for _, r in fresh]) if fresh else []
+        rows = []
+        for (content_hash, record), scored in zip(fresh, scores):
+            urgency, confidence = scored['urgency'][0]
+            rows.append((
+                content_hash, record.get('user'), record['text'], record.get('location'),
+                json.dumps(record.get('media_urls') or []), record.get('date'),
+                urgency, scored['flood_type'][0][0], round(float(confidence), 3), source
+            ))
+        inserted = database.insert_social_posts(rows)
+        if on_insert and rows:
+            on_insert([dict(zip(SOCIAL_POST_COLUMNS, row)) for row in rows])
+        stats['inserted'] += inserted
+        stats['duplicates'] += len(batch) - inserted
+        stats['offset'] = offset
+        save_checkpoint(checkpoint_path, stats)
+        elapsed = time.monotonic() - started
+        snapshot = dict(stats, rows_per_second=round(run_records / elapsed, 1) if elapsed else 0.0,
+                        elapsed_seconds=round(elapsed, 2))
+        if progress:
+            progress(snapshot)
+        return snapshot
+
+    batch: Dict[str, Dict] = {}
+    offset = stats['offset']
+    for record, offset in iter_records(path, stats['offset']):
+        stats['records'] += 1
+        run_records += 1
+        if not isinstance(record, dict) or not isinstance(record.get('text'), str) or not record['text'].strip():
+            stats['invalid'] += 1
+            continue
+        content_hash = record_hash(record)
+        if content_hash in batch:
+            stats['duplicates'] += 1
+            continue
+        batch[content_hash] = record
+        if len(batch) >= batch_size:
+            snapshot = flush(batch, offset)
+            logger.info(f"Ingested {stats['records']} records from {path} ({snapshot['rows_per_second']} rows/s)")
+            batch = {}
+
+    stats['completed'] = True
+    snapshot = flush(batch, offset)
+    logger.info(f"Finished {path}: {stats['inserted']} new, {stats['duplicates']} duplicates, "
+                f"{stats['invalid']} invalid ({snapshot['rows_per_second']} rows/s)")
+    return snapshot
+
+
+if __name__ == '__main__':
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description='Bulk-ingest a JSON array or NDJSON social media feed')
+    parser.add_argument('path')
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--checkpoint', help='checkpoint file (default: <path>.checkpoint)')
+    parser.add_argument('--restart', action='store_true', help='ignore an existing checkpoint')
+    args = parser.parse_args()
+
+    conn = database.get_connection()
+    database.create_schema(conn.cursor())
+    conn.commit()
+    conn.close()
+    database.run_migrations()
+
+    import app
+    if not app.initialize_models():
+        raise SystemExit(1)
+    result = ingest_file(args.path, app.score_texts, batch_size=args.batch_size,
+                         checkpoint_path=args.checkpoint, restart=args.restart)
+    print(json.dumps(result, indent=2))
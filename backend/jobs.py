@@ -0,0 +1,187 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class RetryLater(Exception):
+    """Raised by a task to be queued again after ``delay`` seconds while it has retries left."""
+
+    def __init__(self, reason: str, delay: float = 5.0):
+        super().__init__(reason)
+        self.delay = delay
+
+
+class Job:
+    """Progress record for one background task, updated by the task itself via ``stage``."""
+
+    def __init__(self, job_id: str, kind: str, stages: List[str], owner_id: Optional[int] = None, retries: int = 0,
+                 on_change: Optional[Callable[['Job'], None]] = None):
+        self.id = job_id
+        self.kind = kind
+        self.stages = list(stages)
+        self.owner_id = owner_id
+        self.retries = retries
+        self.attempts = 0
+        self.status = 'queued'
+        self.current_stage = None
+        self.completed_stages: List[str] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.details: Dict[str, Any] = {}
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._on_change = on_change
+        self._lock = threading.Lock()
+
+    def changed(self):
+        """Hand the record to the manager's store, if any; store errors never fail the task."""
+        if self._on_change is None:
+            return
+        try:
+            self._on_change(self)
+        except Exception as e:
+            logger.error(f"Could not store job {self.id}: {e}")
+
+    def stage(self, name: str):
+        with self._lock:
+            if self.current_stage and self.current_stage not in self.completed_stages:
+                self.completed_stages.append(self.current_stage)
+            self.current_stage = name
+        self.changed()
+
+    @property
+    def retries_left(self) -> int:
+        return max(0, self.retries - max(0, self.attempts - 1))
+
+    def restart(self):
+        """Clear stage progress before the task runs again."""
+        with self._lock:
+            self.current_stage = None
+            self.completed_stages = []
+
+    def update(self, **details):
+        """Attach task-specific progress (e.g. rows processed) to the job record."""
+        with self._lock:
+            self.details.update(details)
+        self.changed()
+
+    def progress(self) -> float:
+        if self.status == 'completed':
+            return 1.0
+        if not self.stages:
+            return 0.0
+        return round(len(self.completed_stages) / len(self.stages), 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'job_id': self.id,
+                'kind': self.kind,
+                'owner_id': self.owner_id,
+                'status': self.status,
+                'stage': self.current_stage,
+                'stages': self.stages,
+                'completed_stages': list(self.completed_stages),
+                'progress': self.progress(),
+                'details': dict(self.details),
+                'attempts': self.attempts,
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+
+class JobManager:
+    """Runs tasks on a bounded worker pool and keeps the most recent job records.
+
+    ``pool_sizes`` gives a job kind its own pool of that many workers, so slow
+    kinds (e.g. waiting on an external API) never hold up the shared workers.
+    ``store(record)`` is called with ``Job.to_dict()`` whenever a job changes, so
+    other processes can look it up after this one has evicted or never had it.
+    """
+
+    def __init__(self, max_workers: int = 4, max_jobs: int = 1000, pool_sizes: Optional[Dict[str, int]] = None,
+                 store: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._pools = {
+            kind: ThreadPoolExecutor(max_workers=size, thread_name_prefix=f'job-{kind}')
+            for kind, size in (pool_sizes or {}).items()
+        }
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.max_jobs = max_jobs
+        self._store = store
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, stages: List[str] = None,
+               owner_id: Optional[int] = None, retries: int = 0, **kwargs) -> str:
+        """Schedule ``fn(job, *args, **kwargs)`` and return the new job id.
+
+        A task that raises ``RetryLater`` is queued again up to ``retries`` times.
+        """
+        on_change = (lambda j: self._store(j.to_dict())) if self._store else None
+        job = Job(uuid.uuid4().hex, kind, stages or [], owner_id, retries, on_change)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        job.changed()
+        self._pools.get(kind, self._executor).submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _evict(self):
+        while len(self._jobs) > self.max_jobs:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if oldest.status in ('queued', 'running'):
+                break
+            del self._jobs[oldest_id]
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs):
+        job.status = 'running'
+        job.attempts += 1
+        job.started_at = job.started_at or time.time()
+        job.changed()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.stage(None)
+            job.error = None
+            job.status = 'completed'
+        except RetryLater as e:
+            if job.retries_left:
+                logger.warning(f"Job {job.id} ({job.kind}) retrying in {e.delay}s: {e}")
+                job.restart()
+                job.error = str(e)
+                job.status = 'queued'
+                job.changed()
+                timer = threading.Timer(e.delay, self._pools.get(job.kind, self._executor).submit,
+                                        (self._run, job, fn, args, kwargs))
+                timer.daemon = True
+                timer.start()
+                return
+            logger.error(f"Job {job.id} ({job.kind}) failed after {job.attempts} attempts: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.kind}) failed: {e}")
+            job.error = str(e)
+            job.status = 'failed'
+        job.finished_at = time.time()
+        job.changed()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+            return counts
@@ -0,0 +1,112 @@
+"""Upload preprocessing for report photos.
+
+An upload is identified by the SHA-256 of its bytes. The first time a photo
+is seen it is decoded once and three JPEG copies are written next to each
+other in the upload folder:
+
+    <digest>.jpg        display copy (longest side <= display_size)
+    <digest>.model.jpg  classifier input (shortest side == model_size)
+    <digest>.thumb.jpg  feed thumbnail (longest side <= thumbnail_size)
+
+The full-resolution original is not kept. A photo uploaded again (e.g. the
+same picture forwarded by many citizens) reuses the stored copies without
+being decoded.
+"""
+import io
+import os
+import threading
+from typing import Any, Dict
+
+from inference_cache import content_hash
+
+MODEL_SUFFIX = '.model.jpg'
+THUMBNAIL_SUFFIX = '.thumb.jpg'
+
+
+class ProcessedUpload:
+    """Stored copies of one uploaded photo, named after its content hash."""
+
+    def __init__(self, digest: str, folder: str, duplicate: bool, model_image: Any = None):
+        self.digest = digest
+        self.folder = folder
+        self.duplicate = duplicate
+        self._model_image = model_image
+
+    @property
+    def filename(self) -> str:
+        return f"{self.digest}.jpg"
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.folder, self.filename)
+
+    @property
+    def model_path(self) -> str:
+        return os.path.join(self.folder, f"{self.digest}{MODEL_SUFFIX}")
+
+    @property
+    def thumbnail_path(self) -> str:
+        return os.path.join(self.folder, f"{self.digest}{THUMBNAIL_SUFFIX}")
+
+    def model_image(self) -> Any:
+        """The decoded model-size RGB image, or the path of its stored copy for a duplicate upload."""
+        return self._model_image if self._model_image is not None else self.model_path
+
+
+class UploadProcessor:
+    """Dedupes uploads by content hash and writes their display, model and thumbnail copies."""
+
+    def __init__(self, folder: str, display_size: int = 1280, model_size: int = 224,
+                 thumbnail_size: int = 320, quality: int = 85):
+        self.folder = folder
+        self.display_size = display_size
+        self.model_size = model_size
+        self.thumbnail_size = thumbnail_size
+        self.quality = quality
+        self._stats = {'uploads': 0, 'duplicates': 0, 'bytes_received': 0, 'bytes_stored': 0}
+        self._lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+
+    def process(self, data: bytes) -> ProcessedUpload:
+        """Store the copies of an uploaded photo; raises ValueError if ``data`` is not an image."""
+        digest = content_hash(data)
+        upload = ProcessedUpload(digest, self.folder, duplicate=True)
+        with self._lock:
+            self._stats['uploads'] += 1
+            self._stats['bytes_received'] += len(data)
+        if all(os.path.exists(p) for p in (upload.path, upload.model_path, upload.thumbnail_path)):
+            with self._lock:
+                self._stats['duplicates'] += 1
+            return upload
+
+        from PIL import Image, ImageOps
+
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                # Let the JPEG decoder scale down by a power of two while decoding.
+                img.draft('RGB', (self.display_size, self.display_size))
+                display = ImageOps.exif_transpose(img).convert('RGB')
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            raise ValueError(f"Unsupported image: {e}")
+        display.thumbnail((self.display_size, self.display_size), Image.LANCZOS)
+
+        scale = self.model_size / min(display.size)
+        model = display.resize((max(1, round(display.width * scale)), max(1, round(display.height * scale))),
+                               Image.BICUBIC) if scale < 1 else display.copy()
+        thumbnail = display.copy()
+        thumbnail.thumbnail((self.thumbnail_size, self.thumbnail_size), Image.LANCZOS)
+
+        stored = 0
+        for image, path in ((display, upload.path), (model, upload.model_path), (thumbnail, upload.thumbnail_path)):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            image.save(tmp_path, 'JPEG', quality=self.quality, optimize=True)
+            stored += os.path.getsize(tmp_path)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._stats['bytes_stored'] += stored
+        return ProcessedUpload(digest, self.folder, duplicate=False, model_image=model)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
@@ -0,0 +1,259 @@
+"""Asyncio (ASGI) server for the SSE streaming endpoints.
+
+Each connected dashboard costs one coroutine and a bounded event buffer instead
+of a blocked Flask worker thread. It serves the same URL paths, JWT query-param
+auth and event frames as the Flask routes, and reads from the same EventHub, so
+it runs next to the Flask app in the same process (see ``start_in_background``).
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+from events import EventBuffer, EventHub, sse_frame
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_FRAME = sse_frame({'type': 'keepalive'})
+
+
+class StreamRoute:
+    """One SSE endpoint: hub channel, required role and snapshot/delta loaders."""
+
+    def __init__(self, channel: str, role: Optional[str], snapshot_loader: Callable, delta_loader: Callable):
+        self.channel = channel
+        self.role = role
+        self.snapshot_loader = snapshot_loader
+        self.delta_loader = delta_loader
+
+
+class AsyncSubscription(EventBuffer):
+    def __init__(self, channel: str, maxlen: int, policy: str, start_id: int):
+        super().__init__(maxlen, policy)
+        self.channel = channel
+        self.start_id = start_id
+        self.closed = False
+        self._ready = asyncio.Event()
+
+    def offer(self, event):
+        # Events already covered by the replay/snapshot were queued before we subscribed.
+        if self.closed or event.id <= self.start_id:
+            return
+        self.push(event)
+        self._ready.set()
+
+    async def get(self, timeout: float):
+        if not len(self) and not self.closed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.pop()
+
+    def close(self):
+        self.closed = True
+        self.clear()
+        self._ready.set()
+
+
+class AsyncBroadcaster:
+    """Bridges EventHub events from publisher threads onto one event loop and fans them out."""
+
+    def __init__(self, hub: EventHub, buffer_size: int):
+        self.hub = hub
+        self.buffer_size = buffer_size
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, set] = {}
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.hub.add_listener(self._on_event)
+
+    def stop(self):
+        self.hub.remove_listener(self._on_event)
+        for subscribers in self._subscribers.values():
+            for subscription in subscribers:
+                subscription.close()
+
+    def _on_event(self, event):
+        # Runs in the publishing thread under the hub lock: only schedule. Always
+        # schedule, even with no subscribers yet, so a subscriber registered right
+        # after its replay() cannot miss an event published in between.
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self._dispatch, event)
+
+    def _dispatch(self, event):
+        for subscription in list(self._subscribers.get(event.channel, ())):
+            subscription.offer(event)
+
+    def subscribe(self, channel: str, last_event_id: Optional[int]):
+        replay, position = self.hub.replay(channel, last_event_id)
+        subscription = AsyncSubscription(channel, self.buffer_size, self.hub.policy, position)
+        self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription, replay, position
+
+    def unsubscribe(self, subscription: AsyncSubscription):
+        subscription.close()
+        self._subscribers.get(subscription.channel, set()).discard(subscription)
+
+    def count(self) -> Dict[str, int]:
+        return {channel: len(subs) for channel, subs in self._subscribers.items()}
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get('headers', []):
+        if key.lower() == name:
+            return value.decode('latin-1')
+    return None
+
+
+async def _send_json(send, status: int, body: Dict, extra_headers=()):
+    payload = json.dumps(body).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode()), *extra_headers]
+    })
+    await send({'type': 'http.response.body', 'body': payload})
+
+
+def create_stream_app(hub: EventHub, routes: Dict[str, StreamRoute],
+                      authenticate: Callable[[str, Optional[str]], Tuple[Optional[Dict], Optional[Tuple[str, int]]]],
+                      parse_timestamp: Callable[[str], str],
+                      allowed_origins=(), buffer_size: int = 256, keepalive_seconds: float = 25):
+    """Build the ASGI application.
+
+    ``authenticate(token, role)`` returns ``(user, None)`` or ``(None, (error, status))``
+    and is run in a worker thread, as are the snapshot and delta loaders.
+    """
+    broadcaster = AsyncBroadcaster(hub, buffer_size)
+
+    async def lifespan(receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                broadcaster.start(asyncio.get_running_loop())
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                broadcaster.stop()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def app(scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        if broadcaster.loop is None:
+            broadcaster.start(asyncio.get_running_loop())
+
+        origin = _header(scope, b'origin')
+        cors = [(b'access-control-allow-origin', origin.encode())] if origin in allowed_origins else []
+
+        route = routes.get(scope['path'])
+        if route is None or scope['method'] != 'GET':
+            await _send_json(send, 404, {'error': 'Not found'}, cors)
+            return
+
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token = query.get('token', [None])[0]
+        if not token:
+            await _send_json(send, 401, {'error': 'No token provided'}, cors)
+            return
+        loop = asyncio.get_running_loop()
+        user, error = await loop.run_in_executor(None, authenticate, token, route.role)
+        if error:
+            await _send_json(send, error[1], {'error': error[0]}, cors)
+            return
+
+        raw_id = _header(scope, b'last-event-id') or query.get('last_event_id', [None])[0]
+        try:
+            last_event_id = int(raw_id) if raw_id else None
+        except ValueError:
+            last_event_id = None
+        try:
+            since = parse_timestamp(query['since'][0]) if query.get('since') else None
+        except ValueError as e:
+            await _send_json(send, 400, {'error': str(e)}, cors)
+            return
+
+        subscription, replay, position = broadcaster.subscribe(route.channel, last_event_id)
+
+        async def watch_disconnect():
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    subscription.close()
+                    return
+
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (b'content-type', b'text/event-stream'),
+                    (b'cache-control', b'no-cache'),
+                    (b'connection', b'keep-alive'),
+                    (b'x-accel-buffering', b'no'),
+                    *cors
+                ]
+            })
+            try:
+                if replay is not None:
+                    first = b''.join(event.frame for event in replay)
+                elif since:
+                    rows = await loop.run_in_executor(None, route.delta_loader, since)
+                    first = sse_frame({'type': 'delta', 'data': rows or []}, position)
+                else:
+                    rows = await loop.run_in_executor(None, route.snapshot_loader)
+                    first = sse_frame({'type': 'snapshot', 'data': rows or []}, position)
+            except Exception as e:
+                logger.error(f"Snapshot error on {route.channel}: {e}")
+                first = b''
+            if first:
+                await send({'type': 'http.response.body', 'body': first, 'more_body': True})
+
+            while not subscription.closed:
+                event = await subscription.get(keepalive_seconds)
+                if subscription.closed:
+                    break
+                await send({'type': 'http.response.body', 'body': event.frame if event else KEEPALIVE_FRAME, 'more_body': True})
+        except (OSError, asyncio.CancelledError):
+            pass
+        finally:
+            watcher.cancel()
+            broadcaster.unsubscribe(subscription)
+
+    app.broadcaster = broadcaster
+    return app
+
+
+def start_in_background(asgi_app, host: str, port: int) -> threading.Thread:
+    """Serve ``asgi_app`` with uvicorn on a daemon thread of the current process."""
+    import uvicorn
+
+    config = uvicorn.Config(asgi_app, host=host, port=port, log_level='info', lifespan='on')
+    server = uvicorn.Server(config)
+    server.install_signal_handlers = lambda: None
+    thread = threading.Thread(target=server.run, name='stream-server', daemon=True)
+    thread.start()
+    logger.info(f"Streaming server listening on http://{host}:{port}")
+    return thread
+
+
+if __name__ == '__main__':
+    # Standalone streaming process next to the Flask workers. It only sees their
+    # events when they share them through EVENT_BACKEND=sqlite.
+    import os
+    import uvicorn
+    from app import EVENT_BACKEND, STREAM_SERVER_HOST, stream_app
+
+    logging.basicConfig(level=logging.INFO)
+    if EVENT_BACKEND == 'memory':
+        logger.warning("EVENT_BACKEND=memory: events published by other processes will not reach this server")
+    uvicorn.run(stream_app, host=STREAM_SERVER_HOST, port=int(os.getenv("STREAM_SERVER_PORT") or 5001), lifespan='on')
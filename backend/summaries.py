@@ -0,0 +1,339 @@
+"""LLM situation summaries with hedged providers, request coalescing and a deadline.
+
+Providers are tried in order: the first one starts at once and the next one
+is fired when the previous one has not answered within ``hedge_after_seconds``
+(or failed). The first answer wins. When no provider answers before
+``deadline_seconds`` a deterministic template summary is returned instead, so
+a summary never takes longer than the deadline.
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from inference_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = (
+    "You are a disaster response analyst. Write a concise (≤90 words), "
+    "professional flood situation summary with: 1) Situation & severity, 2) Likely impact, "
+    "3) Immediate recommended actions. Avoid fluff, no emojis."
+)
+
+
+def summary_fields(citizen_data: Dict) -> Tuple[str, str, str, str]:
+    """(text, urgency, hazard, location) of a summary request."""
+    return (
+        citizen_data.get('text_report', ''),
+        citizen_data.get('urgency_classification', {}).get('class_name', 'Unknown'),
+        citizen_data.get('flood_classification', {}).get('class_name', 'Unknown'),
+        citizen_data.get('location', {}).get('address', 'Unknown')
+    )
+
+
+def build_prompt(citizen_data: Dict) -> str:
+    text, urgency, hazard, location = summary_fields(citizen_data)
+    image = citizen_data.get('image_classification') or {}
+    photo = f"Photo: {image['type']} (confidence: {image.get('confidence')})\n" if image.get('type') else ''
+    return (
+        f"Citizen text: {text}\n"
+        f"Urgency: {urgency}\n"
+        f"Hazard: {hazard}\n"
+        f"Location: {location}\n"
+        f"{photo}"
+        "Summarize clearly for decision-makers."
+    )
+
+
+def coalesce_key(citizen_data: Dict) -> str:
+    """Hash of the prompt with case, whitespace and punctuation ignored.
+
+    It covers every field that goes into the prompt and keeps every word, so
+    "not flooded" never shares a summary with "flooded".
+    """
+    prompt = normalize_text(re.sub(r'[^\w\s]', ' ', build_prompt(citizen_data)))
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+# flood type -> (situation phrase, likely impact, playbook actions)
+FLOOD_PLAYBOOKS = {
+    'Urban Flooding': (
+        'urban flooding',
+        'Waterlogged streets are likely to block traffic and strand pedestrians; ground-floor homes and shops may take in water.',
+        ('Divert traffic away from waterlogged roads', 'Deploy pumps to the lowest-lying streets')
+    ),
+    'River Overflow': (
+        'a river overflow',
+        'Riverside neighbourhoods face rising water and may lose access routes.',
+        ('Evacuate low-lying riverside homes', 'Close bridges and crossings at risk')
+    ),
+    'Flash Flood': (
+        'a flash flood',
+        'Fast-moving water can sweep away people and vehicles with little warning.',
+        ('Warn everyone to keep off flooded roads', 'Move people to higher ground')
+    ),
+    'Drainage Failure': (
+        'a drainage failure',
+        'Blocked drains will keep water standing and spread waterlogging to nearby streets.',
+        ('Send crews to clear blocked drains', 'Barricade waterlogged stretches')
+    ),
+    'Heavy Rain Accumulation': (
+        'heavy rain accumulation',
+        'Low-lying roads and underpasses are likely to flood while the rain continues.',
+        ('Close flooded underpasses', 'Pre-position pumps in low-lying areas')
+    ),
+    'Dam or Levee Breach': (
+        'a dam or levee breach',
+        'Downstream areas face sudden, deep flooding and a high risk to life.',
+        ('Order downstream evacuation', 'Close roads into the flood path')
+    ),
+    'Sewer Backup': (
+        'a sewer backup',
+        'Contaminated water poses health risks and may enter homes through drains.',
+        ('Dispatch sewer maintenance crews', 'Warn residents to avoid contact with floodwater')
+    ),
+    'Groundwater Rise': (
+        'rising groundwater',
+        'Basements and foundations may flood slowly and stay wet for days.',
+        ('Inspect basements and foundations', 'Cut power to flooded basements')
+    ),
+    'Landslide-Induced Flooding': (
+        'landslide-induced flooding',
+        'Mud and debris can block roads and drains and damage structures on slopes.',
+        ('Evacuate homes on and below unstable slopes', 'Clear debris from roads and drains')
+    ),
+    'Coastal Storm Surge': (
+        'a coastal storm surge',
+        'Seawater may flood coastal roads and homes, especially around high tide.',
+        ('Evacuate shoreline settlements', 'Close coastal roads')
+    )
+}
+DEFAULT_PLAYBOOK = (
+    'flooding',
+    'Disruption to movement and property near the reported location is likely.',
+    ('Verify the extent of flooding on the ground', 'Warn nearby residents')
+)
+
+# urgency -> (severity, first action)
+URGENCY_PLAYBOOKS = {
+    'Urgent Panic': ('high', 'Dispatch emergency responders now'),
+    'Alert Caution': ('moderate', 'Send a field team to assess'),
+    'Safe Normal': ('low', 'Keep the area under routine watch')
+}
+
+# Image classification results that say nothing about the scene.
+UNINFORMATIVE_IMAGE_TYPES = ('Pipeline Error', 'Unknown')
+
+
+def template_summary(citizen_data: Dict) -> str:
+    """Structured summary from the classifications alone; deterministic, no I/O."""
+    _, urgency, hazard, location = summary_fields(citizen_data)
+    phrase, impact, actions = FLOOD_PLAYBOOKS.get(hazard, DEFAULT_PLAYBOOK)
+    severity, first_action = URGENCY_PLAYBOOKS.get(urgency, ('unconfirmed', 'Send a field team to assess'))
+    situation = f"Citizen report of {phrase} at {location}; severity {severity} ({urgency})."
+    image = citizen_data.get('image_classification') or {}
+    if image.get('type') == 'No Flooding':
+        situation += ' The attached photo shows no visible flooding.'
+        first_action = 'Confirm the report on the ground before escalating'
+    elif image.get('type') and image['type'] not in UNINFORMATIVE_IMAGE_TYPES:
+        situation += f" Photo indicates {image['type']} ({float(image.get('confidence') or 0):.0%} confidence)."
+    return (
+        f"1) Situation & severity: {situation} "
+        f"2) Likely impact: {impact} "
+        f"3) Immediate recommended actions: {'; '.join((first_action,) + actions)}."
+    )
+
+
+class ChatCompletionsProvider:
+    """OpenAI-compatible chat completions endpoint (Groq) over a pooled ``requests.Session``."""
+
+    def __init__(self, name: str, url: str, api_key: str, model: str, pool_size: int = 8,
+                 temperature: float = 0.2, max_tokens: int = 180):
+        self.name = name
+        self.url = url
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Authorization': f'Bearer {api_key}', 'Content-Type': 'application/json'})
+
+    def generate(self, system_prompt: str, prompt: str, timeout: float) -> str:
+        resp = self.session.post(self.url, timeout=timeout, json={
+            'model': self.model,
+            'messages': [
+                {'role': 'system', 'content': system_prompt},
+                {'role': 'user', 'content': prompt}
+            ],
+            'temperature': self.temperature,
+            'max_tokens': self.max_tokens
+        })
+        if not resp.ok:
+            raise RuntimeError(f"{self.name} API error {resp.status_code}: {resp.text[:200]}")
+        content = resp.json().get('choices', [{}])[0].get('message', {}).get('content', '')
+        if not content:
+            raise RuntimeError(f"{self.name} response missing content")
+        return content.strip()
+
+
+class GeminiProvider:
+    """Google GenAI client, created once and reused (it keeps its own connection pool)."""
+
+    def __init__(self, api_key: str, model: str, base_url: Optional[str] = None, name: str = 'gemini'):
+        self.name = name
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google import genai
+                    from google.genai import types as genai_types
+
+                    http_options = genai_types.HttpOptions(base_url=self.base_url) if self.base_url else None
+                    self._client = genai.Client(api_key=self.api_key, http_options=http_options)
+        return self._client
+
+    def generate(self, system_prompt: str, prompt: str, timeout: float) -> str:
+        from google.genai import types as genai_types
+
+        response = self.client().models.generate_content(
+            model=self.model,
+            config=genai_types.GenerateContentConfig(
+                system_instruction=system_prompt,
+                http_options=genai_types.HttpOptions(timeout=int(timeout * 1000))
+            ),
+            contents=prompt
+        )
+        text = getattr(response, 'text', None)
+        if not text:
+            raise RuntimeError(f"{self.name} response missing text")
+        return text.strip()
+
+
+class SummaryService:
+    """Hedged, coalesced and deadline-bound summaries over a list of providers.
+
+    Each provider has ``name`` and ``generate(system_prompt, prompt, timeout) -> str``.
+    Concurrent requests with the same ``coalesce_key`` share one provider call.
+    """
+
+    def __init__(self, providers: Sequence, hedge_after_seconds: float = 3.0, deadline_seconds: float = 8.0,
+                 max_workers: int = 8):
+        self.providers = list(providers)
+        self.hedge_after_seconds = hedge_after_seconds
+        self.deadline_seconds = deadline_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary')
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {'requests': 0, 'coalesced': 0, 'hedged': 0, 'template': 0}
+        self._wins = {provider.name: 0 for provider in self.providers}
+        self._errors = {provider.name: 0 for provider in self.providers}
+        self._latencies_ms: deque = deque(maxlen=1000)
+
+    def summarize(self, citizen_data: Dict) -> Tuple[str, str]:
+        """``(summary, source)`` where source is a provider name or 'template'."""
+        started = time.monotonic()
+        key = coalesce_key(citizen_data)
+        with self._lock:
+            self._stats['requests'] += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self._stats['coalesced'] += 1
+        if not leader:
+            try:
+                return future.result(timeout=self.deadline_seconds)
+            except Exception:
+                return template_summary(citizen_data), 'template'
+
+        try:
+            result = self._race(citizen_data, started + self.deadline_seconds)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                self._latencies_ms.append((time.monotonic() - started) * 1000)
+
+    def _race(self, citizen_data: Dict, deadline: float) -> Tuple[str, str]:
+        prompt = build_prompt(citizen_data)
+        pending: Dict[Future, str] = {}
+        waiting = list(self.providers)
+
+        def launch():
+            provider = waiting.pop(0)
+            timeout = max(0.1, deadline - time.monotonic())
+            pending[self._executor.submit(provider.generate, SYSTEM_PROMPT, prompt, timeout)] = provider.name
+
+        if waiting:
+            launch()
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            timeout = deadline - now
+            if waiting:
+                timeout = min(timeout, self.hedge_after_seconds)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                if waiting:
+                    with self._lock:
+                        self._stats['hedged'] += 1
+                    launch()
+                continue
+            for finished in done:
+                name = pending.pop(finished)
+                try:
+                    text = finished.result()
+                except Exception as e:
+                    logger.error(f"Summary provider {name} failed: {e}")
+                    with self._lock:
+                        self._errors[name] += 1
+                    continue
+                with self._lock:
+                    self._wins[name] += 1
+                return text, name
+            # A failed provider hands over to the next one without waiting for the hedge delay.
+            if waiting and not pending:
+                launch()
+        # Calls still running finish in the background; their answers are dropped.
+        with self._lock:
+            self._stats['template'] += 1
+        return template_summary(citizen_data), 'template'
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies_ms)
+            def percentile(p):
+                if not latencies:
+                    return None
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 2)
+            return dict(
+                self._stats,
+                inflight=len(self._inflight),
+                providers={name: {'wins': self._wins[name], 'errors': self._errors[name]} for name in self._wins},
+                latency_ms_p50=percentile(0.50),
+                latency_ms_p99=percentile(0.99),
+                hedge_after_seconds=self.hedge_after_seconds,
+                deadline_seconds=self.deadline_seconds
+            )
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import time
+
+# The app test runs against a scratch database with no model loaded.
+TMP = tempfile.mkdtemp()
+os.environ['BLUESIGNAL_DB'] = os.path.join(TMP, 'auth.db')
+os.environ['MODEL_LOADING'] = 'lazy'
+os.environ['INFERENCE_CACHE_PATH'] = ''
+
+import jwt
+
+from auth import Authenticator, TTLCache
+
+SECRET = 'test-secret-with-at-least-32-bytes'
+
+
+def make_token(username, expires_in=3600):
+    return jwt.encode({'username': username, 'exp': int(time.time() + expires_in)}, SECRET, algorithm='HS256')
+
+
+def test_ttl_cache():
+    cache = TTLCache(max_entries=2, ttl_seconds=0.1)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    # 'a' was used last, so adding 'c' evicts 'b'.
+    cache.put('c', 3)
+    assert cache.get('b') is None and cache.get('a') == 1 and cache.get('c') == 3
+
+    cache.put('short', 4, ttl_seconds=0.02)
+    cache.put('expired', 5, ttl_seconds=0)
+    assert cache.get('expired') is None
+    time.sleep(0.05)
+    assert cache.get('short') is None
+    time.sleep(0.1)
+    assert cache.get('a') is None and cache.get('c') is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['hits'] == 3
+    print("✅ TTL cache test passed!")
+
+
+def test_authenticator_cache():
+    users = {'alice': {'id': 1, 'username': 'alice', 'role': 'citizen'}}
+    loads = []
+
+    def load_user(username):
+        loads.append(username)
+        return users.get(username)
+
+    authenticator = Authenticator(SECRET, load_user, ttl_seconds=60)
+    token = make_token('alice')
+    for _ in range(3):
+        user, error = authenticator.authenticate(token)
+        assert error is None and user['username'] == 'alice'
+    assert loads == ['alice'] and authenticator.stats()['tokens']['hits'] == 2
+
+    assert authenticator.authenticate(token, 'authority') == (None, ('Unauthorized', 403))
+    assert authenticator.authenticate(None) == (None, ('No token provided', 401))
+    assert authenticator.authenticate('not-a-token') == (None, ('Invalid token', 401))
+    assert authenticator.authenticate(make_token('alice', -10)) == (None, ('Invalid token', 401))
+
+    # A deleted user stays cached until invalidated.
+    del users['alice']
+    assert authenticator.authenticate(token)[1] is None
+    authenticator.invalidate_user('alice')
+    assert authenticator.authenticate(token) == (None, ('User not found', 401))
+    assert authenticator.authenticate_query(token) == (None, ('Unauthorized', 403))
+    print("✅ Authenticator cache test passed!")
+
+
+def test_deleted_user_endpoints():
+    import app
+    import database
+
+    database.init_db()
+    client = app.app.test_client()
+    client.post('/api/auth/register', json={'username': 'gone', 'email': 'gone@example.com',
+                                            'password': 'pw', 'role': 'authority'})
+    token = client.post('/api/auth/login', json={'username': 'gone', 'password': 'pw'}).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/api/auth/authority/hotspots', headers=headers).status_code == 200
+
+    conn = database.get_connection()
+    try:
+        with conn:
+            conn.execute('DELETE FROM users WHERE username = ?', ('gone',))
+    finally:
+        conn.close()
+    app.invalidate_user('gone')
+
+    response = client.get('/api/auth/authority/hotspots', headers=headers)
+    assert response.status_code == 401 and response.get_json()['error'] == 'User not found'
+    for path in ('/api/posts/stream', '/api/auth/authority/hotspots/stream', '/api/auth/authority/reports/export'):
+        response = client.get(path, query_string={'token': token})
+        assert response.status_code == 403 and response.get_json()['error'] == 'Unauthorized', path
+    print("✅ Deleted user endpoint test passed!")
+
+
+if __name__ == "__main__":
+    test_ttl_cache()
+    test_authenticator_cache()
+    test_deleted_user_endpoints()
@@ -0,0 +1,104 @@
+import threading
+import time
+
+from clustering import HotspotClusterIndex, cluster_reports
+
+REPORTS = [
+    {'id': 1, 'latitude': 19.0760, 'longitude': 72.8777, 'urgency_level': 'Urgent Panic',
+     'flood_type': 'Street Flooding', 'created_at': '2024-07-01 10:00:00'},
+    {'id': 2, 'latitude': 19.0765, 'longitude': 72.8780, 'urgency_level': 'Urgent Panic',
+     'flood_type': 'Flash Flood', 'created_at': '2024-07-01 11:00:00'},
+    {'id': 3, 'latitude': 19.0770, 'longitude': 72.8790, 'urgency_level': 'Alert Caution',
+     'flood_type': 'Street Flooding', 'created_at': '2024-07-01 09:00:00'},
+    {'id': 4, 'latitude': 28.6139, 'longitude': 77.2090, 'urgency_level': 'Alert Caution',
+     'flood_type': 'River Overflow', 'created_at': '2024-07-01 08:00:00'},
+]
+MUMBAI = (72.8, 19.0, 72.95, 19.15)
+
+
+def test_cluster_grid():
+    index = HotspotClusterIndex(cell_pixels=64)
+    for report in REPORTS:
+        assert index.add(report)
+    assert not index.add(REPORTS[0])
+    assert not index.add({'id': 5, 'latitude': None, 'longitude': 72.8})
+    assert index.stats()['reports'] == 4
+
+    # Zoom 0 cells span 90 degrees: Mumbai and Delhi share one cluster.
+    (world,) = index.clusters(0)
+    assert world['count'] == 4 and world['report'] is None
+    assert world['bbox'] == [72.8777, 19.0760, 77.2090, 28.6139]
+    assert world['urgency_counts'] == {'Urgent Panic': 2, 'Alert Caution': 2}
+
+    city = index.clusters(10)
+    assert sorted(c['count'] for c in city) == [1, 3]
+    mumbai = next(c for c in city if c['count'] == 3)
+    assert mumbai['urgency_level'] == 'Urgent Panic' and mumbai['flood_type'] == 'Street Flooding'
+    delhi = next(c for c in city if c['count'] == 1)
+    assert delhi['report']['id'] == 4 and delhi['latitude'] == 28.6139
+
+    # Past max_zoom the index answers with its finest level; every report is its own cell.
+    assert index.clusters(30) == index.clusters(18) and len(index.clusters(18)) == 4
+    print("✅ Cluster grid test passed!")
+
+
+def test_cluster_bbox():
+    index = HotspotClusterIndex()
+    for report in REPORTS:
+        index.add(report)
+    # A viewport smaller than the cell count walks its own cells, a larger one scans the cells.
+    assert [c['count'] for c in index.clusters(10, MUMBAI)] == [3]
+    assert sorted(c['count'] for c in index.clusters(10, (60.0, 10.0, 80.0, 30.0))) == [1, 3]
+    assert index.clusters(10, (0.0, -10.0, 1.0, -9.0)) == []
+    assert sorted(c['count'] for c in index.clusters(18, MUMBAI)) == [1, 1, 1]
+
+    # One-off clusters of a report subset match the index built from the same reports.
+    subset = REPORTS[:2] + REPORTS[3:]
+    subset_index = HotspotClusterIndex(min_zoom=10, max_zoom=10)
+    for report in subset:
+        subset_index.add(report)
+    assert cluster_reports(subset, 10) == subset_index.clusters(10)
+    assert [c['count'] for c in cluster_reports(subset, 10, MUMBAI)] == [2]
+    print("✅ Cluster bbox test passed!")
+
+
+def test_cluster_refresh():
+    index = HotspotClusterIndex()
+    for report in REPORTS:
+        index.add(report)
+    updated = dict(REPORTS[3], ai_summary='refined')
+    assert index.refresh(updated)
+    (delhi,) = index.clusters(10, (77.0, 28.5, 77.5, 28.7))
+    assert delhi['report']['ai_summary'] == 'refined' and delhi['count'] == 1
+    assert not index.refresh({'id': 99, 'latitude': 19.0, 'longitude': 72.0})
+    assert index.stats()['reports'] == 4
+    print("✅ Cluster refresh test passed!")
+
+
+def test_cluster_ensure_loaded():
+    index = HotspotClusterIndex()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.05)
+        return REPORTS
+
+    threads = [threading.Thread(target=index.ensure_loaded, args=(slow_loader,)) for _ in range(8)]
+    # A report the event listener indexed before the first load is not counted twice.
+    index.add(REPORTS[0])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [1] and index.stats()['reports'] == 4
+    index.ensure_loaded(slow_loader)
+    assert calls == [1] and index.clusters(0)[0]['count'] == 4
+    print("✅ Cluster load test passed!")
+
+
+if __name__ == "__main__":
+    test_cluster_grid()
+    test_cluster_bbox()
+    test_cluster_refresh()
+    test_cluster_ensure_loaded()
@@ -1,5 +1,18 @@
 import sqlite3
+import codecs
 import hashlib
+import io
+import json
+import os
+import tempfile
+import zlib
+
+import database
+import export
+import ingest
+from geocoding import Gazetteer, ReverseGeocoder
+from inference_cache import InferenceCache, content_hash, normalize_text
+from media import UploadProcessor
 
 def test_database():
     conn = sqlite3.connect('bluesignal.db')
@@ -29,5 +42,268 @@ def test_database():
     
     conn.close()
 
+def test_query_plans():
+    conn = database.get_connection()
+    database.create_schema(conn.cursor())
+    version = database.run_migrations(conn)
+    print(f"Schema version: {version}")
+    
+    regressions = database.check_query_plans(conn)
+    conn.close()
+    for name, details in regressions.items():
+        print(f"❌ {name} query plan regressed: {details}")
+    assert not regressions
+    print("✅ Hot queries use indexes!")
+
+def test_social_ingest():
+    conn = database.get_connection()
+    database.create_schema(conn.cursor())
+    database.run_migrations(conn)
+    conn.execute("DELETE FROM social_posts WHERE source = 'test_ingest'")
+    conn.commit()
+    conn.close()
+    
+    classify = lambda texts: [{'urgency': [('Severe Flooding', 0.9)], 'flood_type': [('Urban Flooding', 0.8)]} for _ in texts]
+    with tempfile.TemporaryDirectory() as tmp:
+        checkpoint = os.path.join(tmp, 'demo.checkpoint')
+        first = ingest.ingest_file('demo_social_media.json', classify, batch_size=2,
+                                   checkpoint_path=checkpoint, source='test_ingest')
+        again = ingest.ingest_file('demo_social_media.json', classify, checkpoint_path=checkpoint,
+                                   restart=True, source='test_ingest')
+    print(f"Ingested {first['inserted']} posts at {first['rows_per_second']} rows/s")
+    assert first['records'] == 5 and first['completed']
+    assert again['inserted'] == 0 and again['duplicates'] == first['records']
+    
+    # A UTF-8 BOM in front of the array must not hide the records inside it.
+    with open('demo_social_media.json', 'rb') as f:
+        records = json.load(f)
+    with tempfile.TemporaryDirectory() as tmp:
+        bom_path = os.path.join(tmp, 'bom_feed.json')
+        with open(bom_path, 'wb') as f:
+            f.write(codecs.BOM_UTF8 + json.dumps(records).encode('utf-8'))
+        bom = ingest.ingest_file(bom_path, classify, batch_size=2, source='test_ingest')
+    assert bom['records'] == len(records) and bom['invalid'] == 0 and bom['completed']
+    assert bom['duplicates'] == len(records)
+    
+    conn = database.get_connection()
+    conn.execute("DELETE FROM social_posts WHERE source = 'test_ingest'")
+    conn.commit()
+    conn.close()
+    print("✅ Social feed ingestion test passed!")
+
+def test_report_export():
+    total = len(database.get_all_reports())
+    chunks = list(database.iter_reports_for_export(chunk_size=2))
+    assert sum(len(rows) for rows in chunks) == total
+    assert all(len(rows) <= 2 for rows in chunks)
+    
+    exported = json.loads(b''.join(export.encode_json_array(database.EXPORT_COLUMNS, iter(chunks))))
+    assert len(exported) == total and (not exported or set(exported[0]) == set(database.EXPORT_COLUMNS))
+    lines = zlib.decompress(b''.join(export.gzip_stream(export.encode_csv(database.EXPORT_COLUMNS, iter(chunks)))), 47)
+    assert len(lines.decode().splitlines()) >= total + 1
+    
+    urgent = sum(len(rows) for rows in database.iter_reports_for_export(urgency=['Urgent Panic']))
+    print(f"Exported {total} reports ({urgent} urgent)")
+    assert urgent == sum(1 for r in database.get_all_reports() if r['urgency_level'] == 'Urgent Panic')
+    print("✅ Report export test passed!")
+
+def test_stream_deltas():
+    conn = database.get_connection()
+    conn.execute("INSERT OR IGNORE INTO users (username, email, password, role) VALUES ('delta_user', 'delta@example.com', 'x', 'citizen')")
+    user_id = conn.execute("SELECT id FROM users WHERE username = 'delta_user'").fetchone()[0]
+    conn.commit()
+    conn.close()
+    post_id = database.create_post(user_id, 'Delta', 'Old report', None, 19.07, 72.87, 'Andheri')
+    report_id = database.create_report(post_id, user_id, 'Alert Caution', 'Street Flooding', 0.7, 0, 'old', 19.07, 72.87, 'Andheri')
+    conn = database.get_connection()
+    conn.execute("UPDATE posts SET created_at = '2020-01-01 00:00:00', updated_at = '2020-01-01 00:00:00' WHERE id = ?", (post_id,))
+    conn.execute("UPDATE reports SET created_at = '2020-01-01 00:00:00', updated_at = '2020-01-01 00:00:00' WHERE id = ?", (report_id,))
+    conn.commit()
+    conn.close()
+    try:
+        since = '2021-01-01 00:00:00'
+        assert post_id not in {p['id'] for p in database.get_posts_since(since)}
+        database.vote_post(post_id, user_id, 'up')
+        database.update_report_summary(report_id, 'refined')
+        assert post_id in {p['id'] for p in database.get_posts_since(since)}
+        updated = {r['id']: r for r in database.get_reports_updated_since(since)}
+        assert updated[report_id]['ai_summary'] == 'refined'
+    finally:
+        conn = database.get_connection()
+        conn.execute('DELETE FROM reports_rtree WHERE id = ?', (report_id,))
+        conn.execute('DELETE FROM reports WHERE id = ?', (report_id,))
+        conn.execute('DELETE FROM votes WHERE post_id = ?', (post_id,))
+        conn.execute('DELETE FROM posts WHERE id = ?', (post_id,))
+        conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+        conn.commit()
+        conn.close()
+    print("✅ Stream delta test passed!")
+
+def test_vote_counters():
+    conn = database.get_connection()
+    for name in ('counter_author', 'counter_voter', 'counter_other'):
+        conn.execute("INSERT OR IGNORE INTO users (username, email, password, role) VALUES (?, ?, 'x', 'citizen')",
+                     (name, f'{name}@example.com'))
+    author, voter, other = [conn.execute('SELECT id FROM users WHERE username = ?', (name,)).fetchone()[0]
+                            for name in ('counter_author', 'counter_voter', 'counter_other')]
+    conn.commit()
+    conn.close()
+    post_id = database.create_post(author, 'Counters', 'Vote counter check', None, 19.07, 72.87, 'Andheri')
+
+    def counters():
+        post = database.get_post_by_id(post_id)
+        return post['upvotes'], post['downvotes']
+
+    try:
+        assert database._vote_deltas(None, 'up') == (1, 0)
+        assert database._vote_deltas('up', 'down') == (-1, 1)
+        assert database._vote_deltas('down', None) == (0, -1)
+        assert database._vote_deltas('down', 'down') == (0, 0)
+
+        database.vote_post(post_id, voter, 'up')
+        database.vote_post(post_id, other, 'up')
+        assert counters() == (2, 0)
+        database.vote_post(post_id, voter, 'down')
+        assert counters() == (1, 1)
+        database.vote_post(post_id, voter, 'down')
+        assert counters() == (1, 1)
+        # Votes cannot be cleared: the row is kept and the counters do not move.
+        assert not database.vote_post(post_id, voter, None)
+        assert counters() == (1, 1)
+        assert post_id not in {m['post_id'] for m in database.check_vote_counters()}
+
+        conn = database.get_connection()
+        conn.execute('UPDATE posts SET upvotes = 7, downvotes = 0 WHERE id = ?', (post_id,))
+        conn.commit()
+        conn.close()
+        mismatch = {m['post_id']: m for m in database.check_vote_counters()}[post_id]
+        assert (mismatch['actual_upvotes'], mismatch['actual_downvotes']) == (1, 1)
+        assert counters() == (7, 0)
+        database.check_vote_counters(fix=True)
+        assert counters() == (1, 1) and not database.check_vote_counters()
+
+        conn = database.get_connection()
+        conn.execute('UPDATE posts SET upvotes = 0, downvotes = 5 WHERE id = ?', (post_id,))
+        conn.commit()
+        conn.close()
+        assert database.backfill_vote_counters() >= 1
+        assert counters() == (1, 1)
+    finally:
+        conn = database.get_connection()
+        conn.execute('DELETE FROM votes WHERE post_id = ?', (post_id,))
+        conn.execute('DELETE FROM posts WHERE id = ?', (post_id,))
+        conn.execute("DELETE FROM users WHERE username IN ('counter_author', 'counter_voter', 'counter_other')")
+        conn.commit()
+        conn.close()
+    print("✅ Vote counter test passed!")
+
+def test_map_bbox_edges():
+    conn = database.get_connection()
+    conn.execute("INSERT OR IGNORE INTO users (username, email, password, role) VALUES ('bbox_user', 'bbox@example.com', 'x', 'citizen')")
+    user_id = conn.execute("SELECT id FROM users WHERE username = 'bbox_user'").fetchone()[0]
+    conn.commit()
+    conn.close()
+    lat, lng = 19.0760123, 72.8776543
+    post_id = database.create_post(user_id, 'Edge', 'On the viewport edge', None, lat, lng, 'Bandra')
+    report_id = database.create_report(post_id, user_id, 'Alert Caution', 'Street Flooding', 0.7, 0, '', lat, lng, 'Bandra')
+    try:
+        # float32 rtree bounds round past these exact coordinates.
+        edge = {r['id'] for r in database.get_reports_for_map(bbox=(lng, lat, lng + 0.01, lat + 0.01))}
+        assert report_id in edge
+        outside = {r['id'] for r in database.get_reports_for_map(bbox=(lng + 1e-6, lat, lng + 0.01, lat + 0.01))}
+        assert report_id not in outside
+        exported = [row[0] for rows in database.iter_reports_for_export(bbox=(lng - 0.01, lat - 0.01, lng, lat)) for row in rows]
+        assert report_id in exported
+    finally:
+        conn = database.get_connection()
+        conn.execute('DELETE FROM reports_rtree WHERE id = ?', (report_id,))
+        conn.execute('DELETE FROM reports WHERE id = ?', (report_id,))
+        conn.execute('DELETE FROM posts WHERE id = ?', (post_id,))
+        conn.execute('DELETE FROM users WHERE id = ?', (user_id,))
+        conn.commit()
+        conn.close()
+    print("✅ Map bbox edge test passed!")
+
+def test_offline_geocoding():
+    calls = []
+    def provider(lat, lng):
+        calls.append((lat, lng))
+        return {'address': 'Andheri East, Mumbai', 'latitude': lat, 'longitude': lng}
+    
+    gazetteer = Gazetteer.load('gazetteer.csv')
+    online = ReverseGeocoder(provider, InferenceCache(None), gazetteer)
+    assert online.reverse(19.11361, 72.86972)['source'] == 'nominatim'
+    assert online.reverse(19.11359, 72.86968)['address'] == 'Andheri East, Mumbai'
+    assert len(calls) == 1
+    
+    offline = ReverseGeocoder(None, InferenceCache(None), gazetteer)
+    assert offline.reverse(19.06, 72.83)['name'] == 'Bandra'
+    assert offline.reverse(0.0, 0.0) is None
+    print("✅ Offline geocoding test passed!")
+
+def test_inference_cache():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cache.db')
+        cache = InferenceCache(path, max_memory_entries=2)
+        digest = content_hash(normalize_text('Water  RISING near\nthe station').encode())
+        assert digest == content_hash(normalize_text('water rising near the station').encode())
+        cache.put('text', 'v1', digest, ('Urgent Panic', 0.9))
+        cache.put('text', 'v1', 'b', {'label': 'b'})
+        assert cache.get('text', 'v1', digest) == ['Urgent Panic', 0.9]
+        # 'b' is the least recently used entry, so 'c' pushes it out of memory but not off disk.
+        cache.put('text', 'v1', 'c', {'label': 'c'})
+        assert cache.get('text', 'v1', 'b') == {'label': 'b'}
+        assert cache.get('text', 'v2', digest) is None
+        counts = cache.stats()['namespaces']['text']
+        assert counts == {'memory_hits': 1, 'disk_hits': 1, 'misses': 1, 'hit_rate': 0.6667}
+        
+        calls = []
+        assert cache.get_or_compute('image', 'v1', 'img', lambda: calls.append(1) or [0.1, 0.9]) == [0.1, 0.9]
+        assert cache.get_or_compute('image', 'v1', 'img', lambda: calls.append(1) or [0.5, 0.5]) == [0.1, 0.9]
+        assert calls == [1]
+        
+        # A new instance on the same file (e.g. after a restart) reads what the first one wrote.
+        reopened = InferenceCache(path, max_memory_entries=2)
+        assert reopened.get('text', 'v1', digest) == ['Urgent Panic', 0.9]
+        assert reopened.get('image', 'v1', 'img') == [0.1, 0.9]
+        assert reopened.stats()['namespaces']['text']['disk_hits'] == 1
+        
+        reopened.retain('text', ['v2'])
+        assert reopened.get('text', 'v1', digest) is None and reopened.get('image', 'v1', 'img') == [0.1, 0.9]
+        assert InferenceCache(path).stats()['disk_entries'] == 1
+        
+        bounded = InferenceCache(os.path.join(tmp, 'bounded.db'), max_disk_entries=10)
+        for n in range(1000):
+            bounded.put('text', 'v1', str(n), n)
+        assert bounded.stats()['disk_entries'] == 10
+        assert bounded.stats()['memory_entries'] == 1000
+    print("✅ Inference cache test passed!")
+
+def test_upload_dedupe():
+    from PIL import Image
+    
+    buffer = io.BytesIO()
+    Image.new('RGB', (1600, 1200), (40, 90, 160)).save(buffer, 'JPEG')
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = UploadProcessor(tmp, display_size=800, model_size=224, thumbnail_size=160)
+        first = processor.process(buffer.getvalue())
+        again = processor.process(buffer.getvalue())
+        assert not first.duplicate and again.duplicate and first.digest == again.digest
+        assert min(first.model_image().size) == 224 and again.model_image() == first.model_path
+        assert Image.open(first.path).size == (800, 600)
+        assert max(Image.open(first.thumbnail_path).size) == 160
+        assert len(os.listdir(tmp)) == 3
+    print(f"Upload stats: {processor.stats()}")
+    print("✅ Upload dedupe test passed!")
+
 if __name__ == "__main__":
     test_database()
+    test_query_plans()
+    test_social_ingest()
+    test_report_export()
+    test_stream_deltas()
+    test_vote_counters()
+    test_map_bbox_edges()
+    test_offline_geocoding()
+    test_inference_cache()
+    test_upload_dedupe()
@@ -0,0 +1,161 @@
+import os
+import tempfile
+import threading
+import time
+
+# Stubbed classifiers only: no model is loaded and the database is a scratch file.
+TMP = tempfile.mkdtemp()
+os.environ['BLUESIGNAL_DB'] = os.path.join(TMP, 'enrichment.db')
+os.environ['MODEL_LOADING'] = 'lazy'
+os.environ['INFERENCE_CACHE_PATH'] = ''
+os.environ['SUMMARY_MODE'] = 'offline'
+
+import app
+import database
+from inference import ModelWarming
+
+database.init_db()
+client = app.app.test_client()
+
+
+def stub_text(text):
+    return (app.ClassificationResult(class_name='Urgent Panic', confidence=0.9),
+            app.ClassificationResult(class_name='Street Flooding', confidence=0.8))
+
+
+def login(username, role):
+    client.post('/api/auth/register', json={'username': username, 'email': f'{username}@example.com',
+                                            'password': 'pw', 'role': role})
+    response = client.post('/api/auth/login', json={'username': username, 'password': 'pw'})
+    return {'Authorization': f"Bearer {response.get_json()['token']}"}
+
+
+def submit(headers, **fields):
+    body = dict({'title': 'Flooded road', 'description': 'Water is knee deep near the station',
+                 'latitude': 19.07, 'longitude': 72.87, 'location_name': 'Current Location'}, **fields)
+    response = client.post('/api/auth/citizen/posts', json=body, headers=headers)
+    assert response.status_code == 202, response.get_json()
+    return response.get_json()
+
+
+def wait_for(job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = app.job_manager.get(job_id)
+        if job.status in ('completed', 'failed'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_enrichment_pipeline():
+    app.classify_text_report = stub_text
+    app.get_location_from_coordinates = lambda lat, lng: app.LocationInfo(address='Andheri, Mumbai',
+                                                                          latitude=lat, longitude=lng)
+    headers = login('enrich_citizen', 'citizen')
+    accepted = submit(headers)
+    assert database.get_post_by_id(accepted['post_id'])['status'] in ('processing', 'pending')
+
+    job = wait_for(accepted['job_id'])
+    assert job.status == 'completed', job.error
+    assert job.completed_stages == ['geocoding', 'text_classification', 'corroboration', 'summary', 'saving', 'notifying']
+    # Nothing recent corroborates the first report, so it waits for review.
+    assert job.result['corroboration'] == [] and not job.result['verified']
+    post = database.get_post_by_id(accepted['post_id'])
+    assert post['status'] == 'pending' and post['location_name'] == 'Andheri, Mumbai'
+    report = database.get_report_by_id(job.result['report_id'])
+    assert report['urgency_level'] == 'Urgent Panic' and report['flood_type'] == 'Street Flooding'
+    assert not report['verified']
+
+    # A second urgent street-flooding report nearby corroborates with the first.
+    other = login('enrich_neighbour', 'citizen')
+    accepted = submit(other, description='Street flooded, water knee deep at the station')
+    job = wait_for(accepted['job_id'])
+    (match,) = job.result['corroboration']
+    assert match['id'] == report['id'] and match['corroborates'] and job.result['verified']
+    assert database.get_post_by_id(accepted['post_id'])['status'] == 'verified'
+    assert database.get_report_by_id(job.result['report_id'])['verified']
+
+    # A weak match below the score threshold does not verify a report.
+    weak = [{'score': app.CORROBORATION_VERIFY_SCORE - 0.1, 'corroborates': False}]
+    assert not app.is_corroborated(weak)
+    assert app.is_corroborated(weak + [{'score': app.CORROBORATION_VERIFY_SCORE, 'corroborates': False}])
+    print("✅ Enrichment pipeline test passed!")
+
+
+def test_warming_requeue():
+    calls = []
+
+    def warming_then_ready(text):
+        calls.append(text)
+        if len(calls) == 1:
+            raise ModelWarming("Model 'nli' is still loading")
+        return stub_text(text)
+
+    app.classify_text_report = warming_then_ready
+    app.ENRICHMENT_RETRY_SECONDS = 0.05
+    headers = login('warming_citizen', 'citizen')
+    accepted = submit(headers)
+    job = wait_for(accepted['job_id'])
+    assert job.status == 'completed' and job.attempts == 2 and len(calls) == 2
+    assert database.get_post_by_id(accepted['post_id'])['status'] == 'verified'
+    assert database.get_report_by_id(job.result['report_id'])['urgency_level'] != 'Pipeline Error'
+
+    def always_warming(text):
+        raise ModelWarming("Model 'nli' is still loading")
+
+    app.classify_text_report = always_warming
+    app.ENRICHMENT_RETRIES = 1
+    accepted = submit(headers)
+    job = wait_for(accepted['job_id'])
+    assert job.status == 'failed' and job.attempts == 2
+    assert database.get_post_by_id(accepted['post_id'])['status'] == 'failed'
+    print("✅ Warming requeue test passed!")
+
+
+def test_job_status_endpoint():
+    app.classify_text_report = stub_text
+    owner = login('job_owner', 'citizen')
+    other = login('job_other', 'citizen')
+    authority = login('job_authority', 'authority')
+    accepted = submit(owner)
+    wait_for(accepted['job_id'])
+    status_url = accepted['status_url']
+
+    assert client.get(status_url, headers=owner).get_json()['job']['status'] == 'completed'
+    assert client.get(status_url, headers=other).status_code == 403
+    assert client.get(status_url, headers=authority).status_code == 200
+    assert client.get('/api/jobs/unknown', headers=owner).status_code == 404
+
+    # A worker that never ran the job answers from the shared jobs table.
+    app.job_manager._jobs.pop(accepted['job_id'])
+    response = client.get(status_url, headers=owner)
+    assert response.status_code == 200 and response.get_json()['job']['status'] == 'completed'
+    assert client.get(status_url, headers=other).status_code == 403
+    print("✅ Job status endpoint test passed!")
+
+
+def test_warming_responses():
+    release = threading.Event()
+    app.model_registry.register('nli', lambda: release.wait(5) and 'nli handle')
+    response = client.post('/api/classify/text', json={'text': 'Water rising fast'})
+    assert response.status_code == 503 and response.get_json()['status'] == 'warming'
+    assert response.headers['Retry-After'] == '5'
+    assert client.get('/api/ready').status_code == 503
+    release.set()
+    app.model_registry.wait('nli', timeout=5)
+
+    # A load that outlasts the inference timeout mid-request is still a 503, not a stored error.
+    def warming(text):
+        raise ModelWarming("Model 'nli' is still loading")
+    app.classify_text_report = warming
+    response = client.post('/api/classify/text', json={'text': 'Water rising fast'})
+    assert response.status_code == 503 and response.get_json()['status'] == 'warming'
+    print("✅ Warming response test passed!")
+
+
+if __name__ == "__main__":
+    test_enrichment_pipeline()
+    test_warming_requeue()
+    test_job_status_endpoint()
+    test_warming_responses()
@@ -0,0 +1,177 @@
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+
+from events import COALESCE, DROP_OLDEST, EventHub, SqliteEventTransport
+from stream_server import StreamRoute, create_stream_app
+
+
+def stream_request(asgi_app, path, query='', headers=()):
+    """Run one GET against ``asgi_app`` and disconnect after the first body chunk: (status, body)."""
+    async def run():
+        messages = []
+        first_body = asyncio.Event()
+
+        async def receive():
+            await first_body.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] == 'http.response.body':
+                first_body.set()
+
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query.encode(),
+                 'headers': [(name.encode(), value.encode()) for name, value in headers]}
+        await asyncio.wait_for(asgi_app(scope, receive, send), 5)
+        body = b''.join(m.get('body', b'') for m in messages if m['type'] == 'http.response.body')
+        return messages[0]['status'], body
+
+    return asyncio.run(run())
+
+
+def frames(body):
+    """(id, payload) of every SSE message in ``body``."""
+    result = []
+    for chunk in body.decode().split('\n\n'):
+        if not chunk:
+            continue
+        fields = dict(line.split(': ', 1) for line in chunk.split('\n'))
+        result.append((int(fields['id']) if 'id' in fields else None, json.loads(fields['data'])))
+    return result
+
+
+def test_event_fanout():
+    hub = EventHub(buffer_size=8)
+    first, _, _ = hub.subscribe('posts')
+    second, _, _ = hub.subscribe('posts')
+    other, _, _ = hub.subscribe('hotspots')
+
+    event = hub.publish('posts', {'type': 'new_post', 'data': {'id': 1}}, key=1)
+    received = [first.get(timeout=1), second.get(timeout=1)]
+    # Both subscribers share the frame encoded once at publish time.
+    assert received[0] is event and received[1] is event
+    assert received[0].frame is received[1].frame
+    assert event.frame == b'id: 1\ndata: ' + json.dumps(event.payload()).encode() + b'\n\n'
+    assert other.get(timeout=0) is None
+
+    first.close()
+    assert hub.stats()['posts']['subscribers'] == 1
+    print("✅ Event fan-out test passed!")
+
+
+def test_buffer_overflow():
+    hub = EventHub(buffer_size=3, policy=COALESCE)
+    subscription, _, _ = hub.subscribe('posts')
+    hub.publish('posts', {'id': 1, 'votes': 1}, key=1)
+    hub.publish('posts', {'id': 2, 'votes': 1}, key=2)
+    hub.publish('posts', {'id': 1, 'votes': 2}, key=1)
+    hub.publish('posts', {'id': 1, 'votes': 3}, key=1)
+    # Updates of post 1 replace the pending one instead of filling the buffer.
+    assert len(subscription) == 2 and subscription.coalesced == 2 and subscription.dropped == 0
+
+    hub.publish('posts', {'id': 3}, key=3)
+    hub.publish('posts', {'id': 4}, key=4)
+    assert subscription.dropped == 1
+    payloads = []
+    while True:
+        event = subscription.get(timeout=0)
+        if event is None:
+            break
+        payloads.append(event.payload())
+    assert payloads == [{'id': 1, 'votes': 3}, {'id': 3}, {'id': 4}]
+    assert hub.stats()['posts']['coalesced'] == 2 and hub.stats()['posts']['dropped'] == 1
+
+    dropping = EventHub(buffer_size=2, policy=DROP_OLDEST)
+    subscription, _, _ = dropping.subscribe('posts')
+    for votes in range(1, 5):
+        dropping.publish('posts', {'id': 1, 'votes': votes}, key=1)
+    assert subscription.dropped == 2 and subscription.coalesced == 0
+    assert [subscription.get(timeout=0).payload()['votes'] for _ in range(2)] == [3, 4]
+    print("✅ Event buffer overflow test passed!")
+
+
+def test_replay():
+    hub = EventHub(replay_size=3)
+    for n in range(1, 6):
+        hub.publish('posts' if n != 3 else 'hotspots', {'n': n})
+    # Replay log of 'posts' now holds ids 2, 4 and 5; id 1 was evicted.
+    replay, position = hub.replay('posts', 2)
+    assert [e.id for e in replay] == [4, 5] and position == 5
+    assert hub.replay('posts', 5) == ([], 5)
+    assert hub.replay('hotspots', 1)[0][0].id == 3
+    # No id, an evicted gap or an id from the future: the client needs a snapshot.
+    assert hub.replay('posts', None) == (None, 5)
+    assert hub.replay('posts', 0) == (None, 5)
+    assert hub.replay('posts', 9) == (None, 5)
+
+    restarted = EventHub()
+    restarted.reset_position(100)
+    assert restarted.replay('posts', 50) == (None, 100)
+    assert restarted.replay('posts', 100) == ([], 100)
+    print("✅ Replay log test passed!")
+
+
+def test_stream_resume():
+    hub = EventHub(replay_size=3)
+    loaded = []
+
+    def snapshot():
+        loaded.append('snapshot')
+        return [{'id': 1}]
+
+    def delta(since):
+        loaded.append(since)
+        return [{'id': 2}]
+
+    routes = {'/stream': StreamRoute('posts', None, snapshot, delta)}
+    asgi_app = create_stream_app(hub, routes, lambda token, role: ({'username': token}, None),
+                                 lambda value: value, keepalive_seconds=0.05)
+    for n in range(1, 6):
+        hub.publish('posts', {'n': n})
+
+    status, body = stream_request(asgi_app, '/stream', 'token=t', [('last-event-id', '3')])
+    assert status == 200 and frames(body) == [(4, {'n': 4}), (5, {'n': 5})] and loaded == []
+
+    # Id 1 fell out of the replay log: a full snapshot tagged with the current position.
+    status, body = stream_request(asgi_app, '/stream', 'token=t&last_event_id=1')
+    assert frames(body) == [(5, {'type': 'snapshot', 'data': [{'id': 1}]})] and loaded == ['snapshot']
+
+    status, body = stream_request(asgi_app, '/stream', 'token=t&since=2024-01-01T00:00:00')
+    assert frames(body) == [(5, {'type': 'delta', 'data': [{'id': 2}]})] and loaded[-1] == '2024-01-01T00:00:00'
+
+    assert stream_request(asgi_app, '/stream')[0] == 401
+    assert stream_request(asgi_app, '/missing', 'token=t')[0] == 404
+    print("✅ Stream resume test passed!")
+
+
+def test_sqlite_transport():
+    path = os.path.join(tempfile.mkdtemp(), 'events.db')
+    connect = lambda: sqlite3.connect(path)
+    # Two hubs on one database stand in for two worker processes.
+    worker_a = EventHub(transport=SqliteEventTransport(connect, poll_interval=0.02))
+    worker_b = EventHub(transport=SqliteEventTransport(connect, poll_interval=0.02))
+    on_a, _, _ = worker_a.subscribe('posts')
+    on_b, _, _ = worker_b.subscribe('posts')
+
+    assert worker_a.publish('posts', {'n': 1}, key=1) is None
+    worker_b.publish('posts', {'n': 2}, key=2)
+    for subscription in (on_a, on_b):
+        events = [subscription.get(timeout=2), subscription.get(timeout=2)]
+        assert [(e.id, e.payload(), e.key) for e in events] == [(1, {'n': 1}, 1), (2, {'n': 2}, 2)]
+
+    # A worker started later primes its replay log, so ids issued elsewhere resume there.
+    worker_c = EventHub(transport=SqliteEventTransport(connect, poll_interval=0.02))
+    replay, position = worker_c.replay('posts', 1)
+    assert [e.payload() for e in replay] == [{'n': 2}] and position == 2
+    print("✅ SQLite event transport test passed!")
+
+
+if __name__ == "__main__":
+    test_event_fanout()
+    test_buffer_overflow()
+    test_replay()
+    test_stream_resume()
+    test_sqlite_transport()
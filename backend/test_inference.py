@@ -0,0 +1,226 @@
+import threading
+import time
+
+from inference import ClipImageEngine, MicroBatcher, ModelRegistry, ModelWarming, ZeroShotTextEngine
+
+
+def run_concurrently(batcher, items):
+    """Submit every item from its own thread; returns {item: result or exception}."""
+    results = {}
+    def call(item):
+        try:
+            results[item] = batcher(item, timeout=5)
+        except Exception as e:
+            results[item] = e
+    threads = [threading.Thread(target=call, args=(item,)) for item in items]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_micro_batching():
+    seen = []
+    def double(items):
+        seen.append(len(items))
+        time.sleep(0.01)
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher('double', double, max_batch_size=8, max_wait_ms=20)
+    results = run_concurrently(batcher, list(range(40)))
+    assert results == {i: i * 2 for i in range(40)}, 'results must come back to their own callers'
+    assert max(seen) > 1 and max(seen) <= 8
+    metrics = batcher.metrics()
+    assert metrics['items'] == 40 and metrics['errors'] == 0
+    print(f"Batch sizes: {metrics['batch_size_histogram']}")
+    print("✅ Micro-batching test passed!")
+
+
+def test_batch_failure_isolation():
+    def parse(items):
+        if 'bad' in items:
+            raise ValueError('unparseable item')
+        return [item.upper() for item in items]
+
+    batcher = MicroBatcher('parse', parse, max_batch_size=8, max_wait_ms=50)
+    results = run_concurrently(batcher, ['a', 'b', 'bad', 'c'])
+    assert isinstance(results.pop('bad'), ValueError)
+    assert results == {'a': 'A', 'b': 'B', 'c': 'C'}
+
+    wrong_length = MicroBatcher('short', lambda items: items[:1], max_batch_size=4, max_wait_ms=50)
+    results = run_concurrently(wrong_length, ['x', 'y'])
+    assert results == {'x': 'x', 'y': 'y'}, 'retried one by one after a malformed batch'
+    print("✅ Batch failure isolation test passed!")
+
+
+class StubTokenizer:
+    """Whitespace tokenizer with the transformers methods ZeroShotTextEngine uses."""
+    model_max_length = 64
+
+    def __init__(self):
+        self.vocab = {}
+        self.encoded = []
+
+    def encode(self, text, add_special_tokens=False):
+        self.encoded.append(text)
+        return [self.vocab.setdefault(word, len(self.vocab) + 3) for word in text.lower().strip('.').split()]
+
+    def num_special_tokens_to_add(self, pair=True):
+        return 3
+
+    def build_inputs_with_special_tokens(self, premise, hypothesis):
+        return [1] + premise + [2] + hypothesis + [2]
+
+    def pad(self, sequences, return_tensors='pt'):
+        import torch
+
+        width = max(len(s['input_ids']) for s in sequences)
+        return {'input_ids': torch.tensor([s['input_ids'] + [0] * (width - len(s['input_ids'])) for s in sequences])}
+
+
+class StubNLI:
+    """Entails a hypothesis when its last word (the label) occurs in the premise."""
+
+    def __call__(self, input_ids):
+        import torch
+
+        rows = []
+        for ids in input_ids.tolist():
+            first_sep = ids.index(2)
+            premise, hypothesis = ids[1:first_sep], ids[first_sep + 1:ids.index(2, first_sep + 1)]
+            rows.append([0.0, 0.0, 5.0 if hypothesis[-1] in premise else 0.0])
+        return type('Output', (), {'logits': torch.tensor(rows)})()
+
+
+def stub_text_engine():
+    engine = object.__new__(ZeroShotTextEngine)
+    engine.model_name = 'stub-nli'
+    engine.hypothesis_template = "This example is {}."
+    engine.tokenizer = StubTokenizer()
+    engine.model = StubNLI()
+    engine.entailment_id = 2
+    engine._hypothesis_ids = {}
+    return engine
+
+
+def test_text_engine_batch():
+    engine = stub_text_engine()
+    label_sets = {'state': ['flooded', 'calm'], 'hazard': ['fire', 'storm']}
+    texts = ['The road is flooded', 'All calm here', 'A storm and the street flooded']
+    results = engine.classify_batch(texts, label_sets)
+    assert [r['state'][0][0] for r in results] == ['flooded', 'calm', 'flooded']
+    assert results[2]['hazard'][0][0] == 'storm'
+    assert all(abs(sum(score for _, score in r[task]) - 1) < 1e-6 for r in results for task in label_sets)
+    # Each hypothesis is tokenized once, however many texts are scored.
+    assert len(engine.tokenizer.encoded) == len(texts) + 4
+    assert engine.classify_batch(texts[::-1], label_sets) == results[::-1]
+    assert engine.classify(texts[1], label_sets) == results[1]
+    assert engine.classify_batch([], label_sets) == []
+    print("✅ Text engine batch test passed!")
+
+
+class StubClip:
+    """Text features are one-hot per label word; an image "shows" the label named by its colour."""
+    COLOURS = {'red': 0, 'green': 1, 'blue': 2}
+
+    def __init__(self):
+        import torch
+
+        self.text_passes = 0
+        self.logit_scale = torch.tensor(0.0)
+
+    def get_text_features(self, words):
+        import torch
+
+        self.text_passes += 1
+        return torch.stack([torch.nn.functional.one_hot(torch.tensor(self.COLOURS[w]), 3).float() + 0.01 for w in words])
+
+    def get_image_features(self, pixel_values):
+        return pixel_values
+
+
+class StubClipProcessor:
+    def __call__(self, text=None, images=None, return_tensors='pt', padding=False):
+        import torch
+
+        if text is not None:
+            return {'words': [prompt.split()[-1].strip('.') for prompt in text]}
+        return {'pixel_values': torch.tensor([[c / 255.0 for c in image.getpixel((0, 0))] for image in images])}
+
+
+def stub_clip_engine():
+    engine = object.__new__(ClipImageEngine)
+    engine.model_name = 'stub-clip'
+    engine.hypothesis_template = "This is a photo of {}."
+    engine.processor = StubClipProcessor()
+    engine.model = StubClip()
+    engine._lock = threading.Lock()
+    engine._labels = ()
+    engine._text_embeds = None
+    return engine
+
+
+def test_clip_label_cache():
+    from PIL import Image
+
+    engine = stub_clip_engine()
+    red, blue = Image.new('RGB', (4, 4), (255, 0, 0)), Image.new('RGB', (4, 4), (0, 0, 255))
+    engine.set_labels(['red', 'green'])
+    engine.set_labels(['red', 'green'])
+    first = engine.classify_batch([red, blue])
+    assert engine.model.text_passes == 1, 'unchanged labels reuse the cached embeddings'
+    assert [ranked[0][0] for ranked in first] == ['red', 'red'] and {l for l, _ in first[1]} == {'red', 'green'}
+
+    second = engine.classify_batch([red, blue], labels=['blue', 'red'])
+    assert engine.model.text_passes == 2, 'new labels re-run the text tower'
+    assert [ranked[0][0] for ranked in second] == ['red', 'blue'] and {l for l, _ in second[0]} == {'blue', 'red'}
+    engine.classify_batch([blue], labels=['blue', 'red'])
+    assert engine.model.text_passes == 2
+    print("✅ CLIP label cache test passed!")
+
+
+def test_model_registry():
+    attempts = []
+    def flaky_loader():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            raise OSError('download interrupted')
+        return 'handle'
+
+    registry = ModelRegistry(max_workers=2)
+    registry.register('flaky', flaky_loader)
+    try:
+        registry.load('flaky')
+        raise AssertionError('first load should fail')
+    except OSError:
+        pass
+    assert registry.state('flaky') == 'failed' and not registry.ready('flaky')
+    assert registry.wait('flaky', timeout=2) == 'handle', 'wait retries a failed load'
+    assert len(attempts) == 2 and registry.ready() and registry.stats()['flaky']['error'] is None
+
+    release = threading.Event()
+    registry.register('slow', lambda: release.wait(5) and 'slow handle')
+    try:
+        registry.wait('slow', timeout=0.05)
+        raise AssertionError('a loading model should raise ModelWarming')
+    except ModelWarming:
+        pass
+    assert registry.state('slow') == 'loading'
+    loads = []
+    waiters = [threading.Thread(target=lambda: loads.append(registry.wait('slow', timeout=5))) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    release.set()
+    for t in waiters:
+        t.join()
+    assert loads == ['slow handle'] * 3 and registry.get('slow') == 'slow handle'
+    print("✅ Model registry test passed!")
+
+
+if __name__ == "__main__":
+    test_micro_batching()
+    test_batch_failure_isolation()
+    test_text_engine_batch()
+    test_clip_label_cache()
+    test_model_registry()
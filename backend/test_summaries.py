@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from summaries import ChatCompletionsProvider, SummaryService, coalesce_key, template_summary
+
+CITIZEN_DATA = {
+    'text_report': 'Water is knee deep on the main road near the station',
+    'urgency_classification': {'class_name': 'Urgent Panic', 'confidence': 0.9},
+    'flood_classification': {'class_name': 'Street Flooding', 'confidence': 0.8},
+    'location': {'address': 'Andheri, Mumbai'}
+}
+
+
+def start_stub_server(reply: str, delay: float = 0.0, status: int = 200):
+    """Local OpenAI-compatible chat completions endpoint; returns (server, url)."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            server.calls += 1
+            server.clients.add(self.client_address)
+            time.sleep(server.delay)
+            body = json.dumps({'choices': [{'message': {'content': reply}}]}).encode()
+            self.send_response(server.status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.calls, server.clients, server.delay, server.status = 0, set(), delay, status
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+def provider(name: str, url: str) -> ChatCompletionsProvider:
+    return ChatCompletionsProvider(name, url, 'test-key', 'test-model')
+
+
+def test_primary_answers():
+    server, url = start_stub_server('primary summary')
+    service = SummaryService([provider('primary', url)], hedge_after_seconds=1, deadline_seconds=3)
+    for _ in range(3):
+        assert service.summarize(CITIZEN_DATA) == ('primary summary', 'primary')
+    assert len(server.clients) == 1, 'pooled session should reuse one connection'
+    server.shutdown()
+    print("✅ Primary provider test passed!")
+
+
+def test_hedging():
+    slow, slow_url = start_stub_server('slow summary', delay=2)
+    fast, fast_url = start_stub_server('fast summary')
+    service = SummaryService([provider('slow', slow_url), provider('fast', fast_url)],
+                             hedge_after_seconds=0.2, deadline_seconds=3)
+    started = time.monotonic()
+    summary, source = service.summarize(CITIZEN_DATA)
+    elapsed = time.monotonic() - started
+    print(f"Hedged summary from {source} in {elapsed:.2f}s")
+    assert source == 'fast' and elapsed < 1.5
+    assert service.stats()['hedged'] == 1
+
+    failing, failing_url = start_stub_server('', status=500)
+    service = SummaryService([provider('failing', failing_url), provider('fast', fast_url)],
+                             hedge_after_seconds=5, deadline_seconds=3)
+    assert service.summarize(CITIZEN_DATA)[1] == 'fast'
+    for server in (slow, fast, failing):
+        server.shutdown()
+    print("✅ Hedging test passed!")
+
+
+def test_deadline_and_coalescing():
+    server, url = start_stub_server('late summary', delay=1)
+    service = SummaryService([provider('slow', url)], hedge_after_seconds=0.1, deadline_seconds=0.3)
+    started = time.monotonic()
+    result = service.summarize(CITIZEN_DATA)
+    assert result == (template_summary(CITIZEN_DATA), 'template')
+    assert time.monotonic() - started < 0.8
+
+    server.delay = 0.3
+    service = SummaryService([provider('stub', url)], hedge_after_seconds=1, deadline_seconds=3)
+    calls_before = server.calls
+    near_identical = [dict(CITIZEN_DATA, text_report=text) for text in (
+        'Water is knee deep on the main road near the station',
+        'water is KNEE deep on the main road, near the station!',
+        'Water is knee deep on the main road near the station.'
+    )]
+    results = []
+    threads = [threading.Thread(target=lambda d=d: results.append(service.summarize(d))) for d in near_identical * 2]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert server.calls - calls_before == 1 and len(results) == 6
+    assert {r for r in results} == {('late summary', 'stub')}
+    assert service.stats()['coalesced'] == 5
+    
+    # Negations and photo results change the prompt, so they must not be coalesced away.
+    assert coalesce_key(CITIZEN_DATA) != coalesce_key(dict(CITIZEN_DATA, text_report='Water is not knee deep on the main road'))
+    assert coalesce_key(CITIZEN_DATA) != coalesce_key(
+        dict(CITIZEN_DATA, image_classification={'type': 'No Flooding', 'confidence': 0.9}))
+    server.shutdown()
+    print("✅ Deadline and coalescing test passed!")
+
+
+def test_template_summary():
+    summary = template_summary(dict(CITIZEN_DATA, flood_classification={'class_name': 'Coastal Storm Surge'},
+                                    image_classification={'type': 'Coastal Storm Surge', 'confidence': 0.71}))
+    assert 'coastal storm surge at Andheri, Mumbai' in summary and 'severity high' in summary
+    assert 'Photo indicates Coastal Storm Surge (71% confidence)' in summary
+    assert 'Close coastal roads' in summary
+    
+    no_flood = template_summary(dict(CITIZEN_DATA, image_classification={'type': 'No Flooding', 'confidence': 0.9}))
+    assert 'no visible flooding' in no_flood and no_flood == template_summary(
+        dict(CITIZEN_DATA, image_classification={'type': 'No Flooding', 'confidence': 0.9}))
+    assert '1) Situation & severity' in template_summary({})
+    
+    started = time.perf_counter()
+    for _ in range(1000):
+        template_summary(CITIZEN_DATA)
+    per_call_us = (time.perf_counter() - started) * 1000
+    print(f"Template summary in {per_call_us:.1f}us")
+    assert per_call_us < 1000
+    print("✅ Template summary test passed!")
+
+
+if __name__ == "__main__":
+    test_template_summary()
+    test_primary_answers()
+    test_hedging()
+    test_deadline_and_coalescing()
@@ -49,6 +49,11 @@ function AuthorityDashboard() {
               if (exists) return prev.map(r => (r.id === msg.data.id ? msg.data : r))
               return [msg.data, ...prev]
             })
+          } else if (msg.type === 'delta' && Array.isArray(msg.data)) {
+            setReports(prev => {
+              const changed = new Map(msg.data.map(r => [r.id, r]))
+              return [...msg.data, ...prev.filter(r => !changed.has(r.id))]
+            })
           }
         } catch (err) {
           console.error('SSE parse error', err)
@@ -1,6 +1,7 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import axios from 'axios'
+import { mergeFirstPage, appendPage } from '../utils/helpers'
 import '../styles/CitizenFeed.css'
 
 function CitizenFeed() {
@@ -12,6 +13,9 @@ function CitizenFeed() {
   const [imageFile, setImageFile] = useState(null)
   const [uploading, setUploading] = useState(false)
   const [message, setMessage] = useState('')
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const pollRef = useRef(null)
 
   useEffect(() => {
     const token = localStorage.getItem('token')
@@ -21,20 +25,43 @@ function CitizenFeed() {
       return
     }
     setUser(userData)
-    loadFeed()
-    const interval = setInterval(loadFeed, 5000)
-    return () => clearInterval(interval)
+    loadFeed(true)
+    const interval = setInterval(() => loadFeed(), 5000)
+    return () => {
+      clearInterval(interval)
+      clearTimeout(pollRef.current)
+    }
   }, [navigate])
 
-  const loadFeed = async () => {
+  // Refreshes only the newest page; older pages stay as loaded via "Load more".
+  const loadFeed = async (initial = false) => {
     try {
       const token = localStorage.getItem('token')
       const response = await axios.get('http://127.0.0.1:5000/api/auth/citizen/posts', {
         headers: { Authorization: `Bearer ${token}` }
       })
-      setPosts(response.data.posts || [])
+      setPosts(prev => mergeFirstPage(prev, response.data.posts || []))
+      if (initial) setNextCursor(response.data.next_cursor || null)
+    } catch (err) {
+      console.error(err)
+    }
+  }
+
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const token = localStorage.getItem('token')
+      const response = await axios.get('http://127.0.0.1:5000/api/auth/citizen/posts', {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: nextCursor }
+      })
+      setPosts(prev => appendPage(prev, response.data.posts || []))
+      setNextCursor(response.data.next_cursor || null)
     } catch (err) {
       console.error(err)
+    } finally {
+      setLoadingMore(false)
     }
   }
 
@@ -49,7 +76,6 @@ function CitizenFeed() {
       fd.append('description', formData.description)
       if (formData.latitude) fd.append('latitude', String(parseFloat(formData.latitude)))
       if (formData.longitude) fd.append('longitude', String(parseFloat(formData.longitude)))
-      fd.append('location_name', 'Current Location')
       if (imageFile) fd.append('image', imageFile)
 
       const response = await axios.post('http://127.0.0.1:5000/api/auth/citizen/posts', fd, {
@@ -58,16 +84,12 @@ function CitizenFeed() {
         }
       })
       
-      console.log('Response:', response.data)
       setMessage('Report submitted successfully! AI is processing your report.')
       setFormData({ title: '', description: '', latitude: '', longitude: '' })
       setImageFile(null)
       setShowModal(false)
-      
-      // Redirect to feed after successful submission
-      setTimeout(() => {
-        navigate('/feed')
-      }, 2000)
+      loadFeed()
+      pollJob(response.data.status_url)
       
     } catch (err) {
       console.error('Submission error:', err)
@@ -77,6 +99,38 @@ function CitizenFeed() {
     }
   }
 
+  // Follow the enrichment job until the report is stored, then go to the community feed.
+  const pollJob = (statusUrl) => {
+    clearTimeout(pollRef.current)
+    const poll = async () => {
+      try {
+        const token = localStorage.getItem('token')
+        const response = await axios.get(`http://127.0.0.1:5000${statusUrl}`, {
+          headers: { Authorization: `Bearer ${token}` }
+        })
+        const job = response.data.job
+        if (job.status === 'completed') {
+          setMessage(`Report processed: ${job.result?.urgency || 'classified'}, ${job.result?.flood_type || ''}`)
+          loadFeed()
+          pollRef.current = setTimeout(() => navigate('/feed'), 2000)
+          return
+        }
+        if (job.status === 'failed') {
+          setMessage('AI processing failed: ' + (job.error || 'Unknown error'))
+          loadFeed()
+          return
+        }
+        setMessage(job.status === 'queued' && job.attempts > 0
+          ? 'AI models are still loading; your report will be processed shortly.'
+          : `AI is processing your report${job.stage ? ` (${job.stage.replace('_', ' ')})` : ''}...`)
+      } catch (err) {
+        console.error('Job status error:', err)
+      }
+      pollRef.current = setTimeout(poll, 2000)
+    }
+    pollRef.current = setTimeout(poll, 1000)
+  }
+
   const handleLocation = () => {
     if (navigator.geolocation) {
       navigator.geolocation.getCurrentPosition((pos) => {
@@ -121,6 +175,11 @@ function CitizenFeed() {
             </div>
           ))
         )}
+        {nextCursor && (
+          <button onClick={loadMore} disabled={loadingMore} className="btn-secondary load-more">
+            {loadingMore ? 'LOADING...' : 'LOAD MORE'}
+          </button>
+        )}
       </div>
 
       {showModal && (
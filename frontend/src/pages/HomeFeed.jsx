@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react'
 import { useNavigate } from 'react-router-dom'
 import axios from 'axios'
+import { mergeFirstPage, appendPage } from '../utils/helpers'
 import '../styles/HomeFeed.css'
 
 function HomeFeed() {
@@ -9,6 +10,8 @@ function HomeFeed() {
   const [posts, setPosts] = useState([])
   const [loading, setLoading] = useState(true)
   const [userVotes, setUserVotes] = useState({})
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const esRef = useRef(null)
 
   useEffect(() => {
@@ -19,7 +22,7 @@ function HomeFeed() {
       return
     }
     setUser(userData)
-    loadPosts()
+    loadPosts(true)
     // SSE subscription for real-time updates
     try {
       const es = new EventSource(`http://127.0.0.1:5000/api/posts/stream?token=${encodeURIComponent(token)}`)
@@ -28,13 +31,18 @@ function HomeFeed() {
         try {
           const msg = JSON.parse(evt.data)
           if (msg.type === 'snapshot' && Array.isArray(msg.data)) {
-            setPosts(msg.data)
+            setPosts(prev => mergeFirstPage(prev, msg.data))
           } else if (msg.type === 'post' && msg.data) {
             setPosts(prev => {
               const exists = prev.some(p => p.id === msg.data.id)
               if (exists) return prev.map(p => (p.id === msg.data.id ? msg.data : p))
               return [msg.data, ...prev]
             })
+          } else if (msg.type === 'delta' && Array.isArray(msg.data)) {
+            setPosts(prev => {
+              const changed = new Map(msg.data.map(p => [p.id, p]))
+              return [...msg.data, ...prev.filter(p => !changed.has(p.id))]
+            })
           }
         } catch {}
       }
@@ -45,13 +53,15 @@ function HomeFeed() {
     }
   }, [navigate])
 
-  const loadPosts = async () => {
+  // Refreshes only the newest page; older pages stay as loaded via "Load more".
+  const loadPosts = async (initial = false) => {
     try {
       const token = localStorage.getItem('token')
       const response = await axios.get('http://127.0.0.1:5000/api/posts', {
         headers: { Authorization: `Bearer ${token}` }
       })
-      setPosts(response.data.posts || [])
+      setPosts(prev => mergeFirstPage(prev, response.data.posts || []))
+      if (initial) setNextCursor(response.data.next_cursor || null)
     } catch (err) {
       console.error('Error loading posts:', err)
     } finally {
@@ -59,6 +69,24 @@ function HomeFeed() {
     }
   }
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const token = localStorage.getItem('token')
+      const response = await axios.get('http://127.0.0.1:5000/api/posts', {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: nextCursor }
+      })
+      setPosts(prev => appendPage(prev, response.data.posts || []))
+      setNextCursor(response.data.next_cursor || null)
+    } catch (err) {
+      console.error('Error loading more posts:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const handleVote = async (postId, voteType) => {
     try {
       const token = localStorage.getItem('token')
@@ -192,6 +220,14 @@ function HomeFeed() {
         ))}
       </div>
 
+      {nextCursor && (
+        <div className="load-more">
+          <button onClick={loadMore} disabled={loadingMore} className="header-btn">
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
+
       {posts.length === 0 && (
         <div className="empty-feed">
           <p>No flood reports yet. Be the first to report!</p>
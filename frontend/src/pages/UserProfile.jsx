@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import axios from 'axios'
+import { appendPage } from '../utils/helpers'
 import '../styles/UserProfile.css'
 
 function UserProfile() {
@@ -9,6 +10,8 @@ function UserProfile() {
   const [user, setUser] = useState(null)
   const [loading, setLoading] = useState(true)
   const [currentUser, setCurrentUser] = useState(null)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
 
   useEffect(() => {
     const token = localStorage.getItem('token')
@@ -28,6 +31,7 @@ function UserProfile() {
         headers: { Authorization: `Bearer ${token}` }
       })
       setUser(response.data.user)
+      setNextCursor(response.data.next_cursor || null)
     } catch (err) {
       console.error('Error loading profile:', err)
       if (err.response?.status === 404) {
@@ -38,6 +42,24 @@ function UserProfile() {
     }
   }
 
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return
+    setLoadingMore(true)
+    try {
+      const token = localStorage.getItem('token')
+      const response = await axios.get(`http://127.0.0.1:5000/api/users/${username}`, {
+        headers: { Authorization: `Bearer ${token}` },
+        params: { cursor: nextCursor }
+      })
+      setUser(prev => ({ ...prev, posts: appendPage(prev.posts || [], response.data.user.posts || []) }))
+      setNextCursor(response.data.next_cursor || null)
+    } catch (err) {
+      console.error('Error loading more posts:', err)
+    } finally {
+      setLoadingMore(false)
+    }
+  }
+
   const formatTime = (timestamp) => {
     const date = new Date(timestamp)
     return date.toLocaleDateString('en-US', {
@@ -154,6 +176,11 @@ function UserProfile() {
                   </div>
                 </div>
               ))}
+              {nextCursor && (
+                <button className="back-btn load-more" onClick={loadMore} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load more'}
+                </button>
+              )}
             </div>
           ) : (
             <div className="no-posts">
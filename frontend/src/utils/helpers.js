@@ -224,3 +224,29 @@ export const exportToJSON = (data, filename = 'reports.json') => {
   URL.revokeObjectURL(url)
 }
 
+
+/**
+ * Refresh the newest page of a keyset-paginated list without dropping older pages already loaded
+ * @param {Array} current - Posts currently shown, newest first
+ * @param {Array} page - Freshly fetched first page, newest first
+ * @returns {Array} First page followed by the loaded posts older than it
+ */
+export const mergeFirstPage = (current, page) => {
+  if (page.length === 0) return current
+  const ids = new Set(page.map(p => p.id))
+  const oldest = page[page.length - 1]
+  const older = current.filter(p => !ids.has(p.id) && (p.created_at < oldest.created_at
+    || (p.created_at === oldest.created_at && p.id < oldest.id)))
+  return [...page, ...older]
+}
+
+/**
+ * Append the next page (from a `next_cursor` request) to a list, skipping posts already shown
+ * @param {Array} current - Posts currently shown
+ * @param {Array} page - Next page of posts
+ * @returns {Array} Combined list
+ */
+export const appendPage = (current, page) => {
+  const ids = new Set(current.map(p => p.id))
+  return [...current, ...page.filter(p => !ids.has(p.id))]
+}